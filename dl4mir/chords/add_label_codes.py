@@ -0,0 +1,52 @@
+"""Add integer label codes to the chord entities of existing Biggie Stashes.
+
+Stashes written by the importers already carry these codes; see
+`dl4mir.chords.label_codes`.
+"""
+
+import argparse
+import biggie
+import time
+
+from dl4mir.chords import label_codes
+
+
+def migrate_stash(stash, vocab_dims=label_codes.VOCAB_DIMS, verbose=True):
+    """Add label codes to every entity of a stash, in place.
+
+    Parameters
+    ----------
+    stash : biggie.Stash
+        Stash of chord entities, with at least a `chord_labels` field.
+    vocab_dims : list of ints
+        Vocabularies for which to store class codes.
+    verbose : bool, default=True
+        Toggle console printing.
+    """
+    keys = stash.keys()
+    total_count = len(keys)
+    for idx, key in enumerate(keys):
+        entity = label_codes.add_label_codes(stash.get(key), vocab_dims)
+        stash.add(str(key), entity, overwrite=True)
+        if verbose:
+            print "[%s] %12d / %12d: %s" % (time.asctime(), idx,
+                                            total_count, key)
+
+
+def main(args):
+    for stash_file in args.stash_files:
+        if args.verbose:
+            print "[%s] Updating: %s" % (time.asctime(), stash_file)
+        migrate_stash(biggie.Stash(stash_file), verbose=args.verbose)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Add integer label codes to existing chord stashes.")
+    parser.add_argument("stash_files",
+                        metavar="stash_files", type=str, nargs='+',
+                        help="Paths to biggie Stashes to update in place.")
+    parser.add_argument("--verbose",
+                        metavar="--verbose", type=bool, default=True,
+                        help="Toggle console printing.")
+    main(parser.parse_args())
@@ -4,6 +4,7 @@ import json
 import numpy as np
 import tabulate
 
+import dl4mir.chords.evaluate as EVAL
 import dl4mir.common.fileutil as futil
 
 
@@ -33,6 +34,43 @@ def collapse_results(scores):
     return dict(table=res, headers=metrics)
 
 
+def bootstrap_results(track_scores, num_resamples=1000, confidence=0.95):
+    """Bootstrap confidence intervals over the tracks of every fold.
+
+    Parameters
+    ----------
+    track_scores : list of dicts
+        Outputs of `score_jamsets`, with {metrics, score_annotations}.
+    num_resamples : int, default=1000
+        Number of bootstrap resamples.
+    confidence : scalar, default=0.95
+        Coverage of the intervals.
+
+    Returns
+    -------
+    data : dict
+        Table of intervals, with headers, and the raw {stat, metric} bounds.
+    """
+    metrics = sorted(track_scores[0]['metrics'])
+    scores, supports = [], []
+    for result in track_scores:
+        cols = [result['metrics'].index(m) for m in metrics]
+        track_score, track_support = result['score_annotations']
+        scores.append(np.asarray(track_score)[:, cols])
+        supports.append(np.asarray(track_support)[:, cols])
+
+    intervals = EVAL.bootstrap_intervals(
+        np.concatenate(scores), np.concatenate(supports), metrics,
+        num_resamples, confidence)
+    res = []
+    for s in sorted(intervals):
+        res.append([s])
+        for m in metrics:
+            res[-1].append("$[{0:0.3}, {1:0.3}]$".format(*intervals[s][m]))
+
+    return dict(table=res, headers=metrics, intervals=intervals)
+
+
 def main(args):
     """{param_file, statistic, metric}"""
     score_files = futil.load_textlist(args.score_textlist)
@@ -40,6 +78,14 @@ def main(args):
     data = collapse_results(scores)
     print(tabulate.tabulate(data['table'], headers=data['headers']))
 
+    if args.track_score_textlist:
+        track_files = futil.load_textlist(args.track_score_textlist)
+        track_scores = [json.load(open(f)) for f in track_files]
+        data['bootstrap'] = bootstrap_results(
+            track_scores, args.num_resamples, args.confidence)
+        print(tabulate.tabulate(data['bootstrap']['table'],
+                                headers=data['bootstrap']['headers']))
+
     with open(args.output_file, 'w') as fp:
         json.dump(data, fp)
 
@@ -55,4 +101,15 @@ if __name__ == "__main__":
     parser.add_argument("output_file",
                         metavar="output_file", type=str,
                         help="Path for saving the final output.")
+    parser.add_argument("--track_score_textlist",
+                        metavar="--track_score_textlist", type=str,
+                        default='',
+                        help="Optional list of `score_jamsets` outputs, for "
+                        "bootstrap intervals over the tracks of all folds.")
+    parser.add_argument("--num_resamples",
+                        metavar="--num_resamples", type=int, default=1000,
+                        help="Number of bootstrap resamples.")
+    parser.add_argument("--confidence",
+                        metavar="--confidence", type=float, default=0.95,
+                        help="Coverage of the bootstrap intervals.")
     main(parser.parse_args())
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 import itertools
 import numpy as np
 
@@ -5,7 +6,13 @@ import biggie
 import pescador
 import mir_eval
 from dl4mir.chords import labels as L
+import dl4mir.chords.label_codes as LC
 import dl4mir.chords.pipefxs as FX
+from dl4mir.common import framebank as FB
+from dl4mir.common.partition_index import PartitionIndex
+import dl4mir.common.partition_index as PI
+from dl4mir.common import sampling
+from dl4mir.common import throughput
 from dl4mir.common import util
 import dl4mir.chords.lexicon as lex
 
@@ -33,8 +40,9 @@ def slice_cqt_entity(entity, length, idx=None):
         The windowed chord observation.
     """
     idx = np.random.randint(entity.cqt.shape[1]) if idx is None else idx
-    cqt = np.array([util.slice_tile(x, idx, length) for x in entity.cqt])
-    return biggie.Entity(data=cqt, chord_label=entity.chord_labels[idx])
+    cqt = util.window_frames(entity.cqt, idx, length, axis=1)
+    return biggie.Entity(data=cqt, chord_label=entity.chord_labels[idx],
+                         **util.slice_codes(entity, idx))
 
 
 def slice_note_entity(entity, length, idx=None):
@@ -56,7 +64,7 @@ def slice_note_entity(entity, length, idx=None):
         The windowed chord observation.
     """
     idx = np.random.randint(entity.cqt.shape[1]) if idx is None else idx
-    cqt = np.array([util.slice_tile(x, idx, length) for x in entity.cqt])
+    cqt = util.window_frames(entity.cqt, idx, length, axis=1)
     return biggie.Entity(data=cqt, note_numbers=entity.note_numbers[idx])
 
 
@@ -79,9 +87,9 @@ def slice_chroma_entity(entity, length, idx=None):
         The windowed chord observation.
     """
     idx = np.random.randint(entity.cqt.shape[1]) if idx is None else idx
-    chroma = util.slice_tile(entity.chroma, idx, length)
-    # chroma = np.array([util.slice_tile(x, idx, length) for x in entity.chroma])
-    return biggie.Entity(data=chroma, chord_label=entity.chord_labels[idx])
+    chroma = util.window_frames(entity.chroma, idx, length)
+    return biggie.Entity(data=chroma, chord_label=entity.chord_labels[idx],
+                         **util.slice_codes(entity, idx))
 
 
 def chord_sampler(key, stash, win_length=20, index=None, max_samples=None,
@@ -187,6 +195,9 @@ def lazy_cqt_buffer(key, stash, win_length=20, index=None):
 
 
 def map_chord_labels(entity, lexicon):
+    codes = LC.lexicon_codes(entity, lexicon)
+    if codes is not None:
+        return codes
     if hasattr(entity, 'chord_label'):
         labels = entity.chord_label
     else:
@@ -198,6 +209,50 @@ def map_bigrams(entity, lexicon):
     return lexicon.label_to_index(entity.bigrams)
 
 
+def load_partition_index(stash_file, lexicon, index_mapper=map_chord_labels):
+    """Load the class partition of a stash file, building it if needed.
+
+    Parameters
+    ----------
+    stash_file : str
+        Path to a biggie Stash of chord entities.
+    lexicon : lexicon.Lexicon
+        Instantiated chord lexicon for mapping labels to indices.
+    index_mapper : function
+        Partition labeling function, called as `index_mapper(entity, lexicon)`.
+
+    Returns
+    -------
+    partition_index : PartitionIndex
+        May be passed as `partition_labels` to the chord streams.
+    """
+    tag = "{0}-{1}{2}".format(index_mapper.__name__,
+                              lexicon.__class__.__name__.lower(),
+                              lexicon.vocab_dim)
+    return PI.load_or_create(stash_file, tag, index_mapper,
+                             lexicon.num_classes, lexicon)
+
+
+def index_partition(partition_labels, label_set):
+    """Index the frames of each key belonging to a set of classes.
+
+    Parameters
+    ----------
+    partition_labels : dict, or PartitionIndex
+        Class indices of each frame, or a prebuilt partition index.
+    label_set : list
+        Set of labels for restricting the partition.
+
+    Returns
+    -------
+    subset_index : dict
+        Frame indices of each key that match `label_set`.
+    """
+    if isinstance(partition_labels, PartitionIndex):
+        return partition_labels.subindex(label_set)
+    return util.index_partition_arrays(partition_labels, label_set)
+
+
 def create_chord_index_stream(stash, win_length, lexicon,
                               index_mapper=map_chord_labels,
                               sample_func=slice_cqt_entity,
@@ -218,8 +273,8 @@ def create_chord_index_stream(stash, win_length, lexicon,
         Number of open streams at a time.
     pitch_shift : int
         Maximum number of semitones (+/-) to rotate an observation.
-    partition_labels : dict
-
+    partition_labels : dict, or PartitionIndex
+        Class indices of each frame; see `load_partition_index`.
 
     Returns
     -------
@@ -232,17 +287,70 @@ def create_chord_index_stream(stash, win_length, lexicon,
     if valid_idx is None:
         valid_idx = range(lexicon.num_classes)
 
-    chord_index = util.index_partition_arrays(partition_labels, valid_idx)
+    chord_index = index_partition(partition_labels, valid_idx)
     entity_pool = [pescador.Streamer(chord_sampler, key, stash,
                                      win_length, chord_index,
                                      sample_func=sample_func)
                    for key in stash.keys()]
 
-    stream = pescador.mux(entity_pool, None, working_size, lam=25)
+    stream = throughput.source(
+        'mux', pescador.mux(entity_pool, None, working_size, lam=25))
     if max_pitch_shift > 0:
-        stream = pitch_shift_func(stream, max_pitch_shift=max_pitch_shift)
+        stream = throughput.stage(pitch_shift_func.__name__, pitch_shift_func,
+                                  stream, max_pitch_shift=max_pitch_shift)
 
-    return FX.map_to_class_index(stream, index_mapper, lexicon)
+    return throughput.stage('map_to_class_index', FX.map_to_class_index,
+                            stream, index_mapper, lexicon)
+
+
+def create_chord_batch_stream(stash, win_length, lexicon, batch_size,
+                              index_mapper=map_chord_labels,
+                              partition_labels=None, valid_idx=None,
+                              seed=None):
+    """Return a stream of chord minibatches, sampled uniformly over frames.
+
+    A vectorized alternative to `create_chord_index_stream` followed by
+    `streams.minibatch`: the CQTs of all tracks are loaded into a single
+    frame bank, and each batch is drawn with one gather.
+
+    Parameters
+    ----------
+    stash : biggie.Stash
+        A collection of chord entities.
+    win_length : int
+        Length of a given tile slice.
+    lexicon : lexicon.Lexicon
+        Instantiated chord lexicon for mapping labels to indices.
+    batch_size : int
+        Number of observations per batch.
+    partition_labels : dict, or PartitionIndex
+        Class indices of each frame; see `load_partition_index`.
+    valid_idx : array_like
+        Class indices to sample from; defaults to all classes.
+    seed : int, default=None
+        Seed for sampling; see `framebank.BatchStream` for resuming.
+
+    Returns
+    -------
+    stream : framebank.BatchStream
+        Data stream of {data, class_idx} minibatches, with data shaped
+        (batch_size, num_channels, win_length, num_bins).
+    """
+    if partition_labels is None:
+        partition_labels = util.partition(stash, index_mapper, lexicon)
+
+    if valid_idx is None:
+        valid_idx = range(lexicon.num_classes)
+
+    if not isinstance(partition_labels, PartitionIndex):
+        partition_labels = PartitionIndex.from_labels(partition_labels,
+                                                      lexicon.num_classes)
+
+    key_ids, frames, classes = partition_labels.positions(valid_idx)
+    bank = FB.FrameBank.from_stash(stash, 'cqt', win_length,
+                                   partition_labels.keys, frame_axis=1)
+    return FB.batch_stream(bank, bank.rows(key_ids, frames),
+                           classes.astype(np.int32), batch_size, seed=seed)
 
 
 def create_target_stream(stash, win_length, working_size=50, max_pitch_shift=0,
@@ -281,14 +389,58 @@ def create_target_stream(stash, win_length, working_size=50, max_pitch_shift=0,
     return mapper(stream, bins_per_pitch)
 
 
+def class_sampler_stream(stash, sampler, win_length,
+                         sample_func=slice_cqt_entity, chunk_size=256,
+                         cache_size=64):
+    """Generator for windowed chord observations at the positions drawn by
+    a class sampler.
+
+    Parameters
+    ----------
+    stash : dict_like
+        Dict or biggie.Stash of chord entities.
+    sampler : sampling.ClassSampler
+        Sampler of (key id, frame) positions.
+    win_length : int
+        Length of centered observation window for the CQT.
+    sample_func : function
+        Slicing function, called as `sample_func(entity, win_length, idx)`.
+    chunk_size : int, default=256
+        Number of positions to draw at a time.
+    cache_size : int, default=64
+        Maximum number of entities to keep open; the least recently sampled
+        entity is dropped first.
+
+    Yields
+    ------
+    sample: biggie.Entity
+        The windowed chord observation, as returned by `sample_func`.
+    """
+    entities = OrderedDict()
+    while True:
+        key_ids, frames = sampler.sample(chunk_size)[:2]
+        for key_id, frame in zip(key_ids, frames):
+            entity = entities.pop(key_id, None)
+            if entity is None:
+                entity = stash.get(sampler.keys[key_id])
+                if len(entities) >= cache_size:
+                    entities.popitem(last=False)
+            entities[key_id] = entity
+            yield sample_func(entity, win_length, frame)
+
+
 def create_uniform_chord_index_stream(stash, win_length, lexicon,
                                       index_mapper=map_chord_labels,
                                       sample_func=slice_cqt_entity,
                                       pitch_shift_func=FX.pitch_shift_cqt,
                                       max_pitch_shift=0, working_size=4,
-                                      partition_labels=None, valid_idx=None):
+                                      partition_labels=None, valid_idx=None,
+                                      class_probs=None):
     """Return a stream of chord samples, with uniform quality presentation.
 
+    Classes are drawn from an alias table, then tracks uniformly within the
+    class, and frames uniformly within the track; see `sampling.ClassSampler`.
+
     Parameters
     ----------
     stash : biggie.Stash
@@ -298,11 +450,16 @@ def create_uniform_chord_index_stream(stash, win_length, lexicon,
     lexicon : lexicon.Lexicon
         Instantiated chord lexicon for mapping labels to indices.
     working_size : int
-        Number of open streams at a time.
+        Unused; retained for compatibility with the former, mux-based
+        implementation.
     pitch_shift : int
         Maximum number of semitones (+/-) to rotate an observation.
-    partition_labels : dict
-
+    partition_labels : dict, or PartitionIndex
+        Class indices of each frame; see `load_partition_index`.
+    valid_idx : array_like
+        Class indices to sample from; defaults to all classes.
+    class_probs : array_like, shape=(lexicon.num_classes,), default=None
+        Target distribution over classes; uniform if None.
 
     Returns
     -------
@@ -315,21 +472,12 @@ def create_uniform_chord_index_stream(stash, win_length, lexicon,
     if valid_idx is None:
         valid_idx = range(lexicon.num_classes)
 
-    chord_pool = []
-    for chord_idx in valid_idx:
-        subindex = util.index_partition_arrays(partition_labels, [chord_idx])
-        entity_pool = [pescador.Streamer(chord_sampler, key, stash,
-                                         win_length, subindex,
-                                         sample_func=sample_func)
-                       for key in subindex.keys()]
-        if len(entity_pool) == 0:
-            continue
-        stream = pescador.mux(
-            entity_pool, n_samples=None, k=working_size, lam=20)
-        chord_pool.append(pescador.Streamer(stream))
+    if not isinstance(partition_labels, PartitionIndex):
+        partition_labels = PartitionIndex.from_labels(partition_labels,
+                                                      lexicon.num_classes)
 
-    stream = pescador.mux(chord_pool, n_samples=None, k=lexicon.vocab_dim,
-                          lam=None, with_replacement=False)
+    sampler = sampling.ClassSampler(partition_labels, valid_idx, class_probs)
+    stream = class_sampler_stream(stash, sampler, win_length, sample_func)
     if max_pitch_shift > 0:
         stream = pitch_shift_func(stream, max_pitch_shift=max_pitch_shift)
 
@@ -353,8 +501,8 @@ def create_uniform_chroma_stream(stash, win_length, lexicon, working_size=5,
         Number of open streams at a time.
     pitch_shift : int
         Maximum number of semitones (+/-) to rotate an observation.
-    partition_labels : dict
-
+    partition_labels : dict, or PartitionIndex
+        Class indices of each frame; see `load_partition_index`.
 
     Returns
     -------
@@ -369,7 +517,7 @@ def create_uniform_chroma_stream(stash, win_length, lexicon, working_size=5,
 
     chord_pool = []
     for chord_idx in valid_idx:
-        subindex = util.index_partition_arrays(partition_labels, [chord_idx])
+        subindex = index_partition(partition_labels, [chord_idx])
         entity_pool = [pescador.Streamer(chord_sampler, key, stash,
                                          win_length, subindex,
                                          sample_func=slice_cqt_entity)
@@ -508,6 +656,81 @@ def create_contrastive_chord_stream(stash, win_length, valid_idx=None,
     return FX.unpack_contrastive_pairs(cstream, vocab_dim)
 
 
+def create_contrastive_batch_stream(stash, win_length, batch_size,
+                                    valid_idx=None, partition_labels=None,
+                                    vocab_dim=157, neg_probs=None,
+                                    min_val=0.0, max_val=1.0, seed=None):
+    """Return a stream of minibatches of positive and negative chord pairs.
+
+    A vectorized alternative to `create_contrastive_chord_stream` followed by
+    `streams.minibatch`: positive classes are drawn uniformly over the classes
+    with data, negative classes from an alias table per positive class, and
+    the windows of both from a single frame bank.
+
+    Parameters
+    ----------
+    stash : biggie.Stash
+        A collection of chord entities.
+    win_length : int
+        Length of a given tile slice.
+    batch_size : int
+        Number of pairs per batch.
+    valid_idx : array_like
+        Class indices to sample from; defaults to all classes.
+    partition_labels : dict, or PartitionIndex
+        Class indices of each frame; see `load_partition_index`.
+    vocab_dim : int
+        Size of the (strict) chord vocabulary.
+    neg_probs : np.ndarray, shape=(vocab_dim, vocab_dim), default=None
+        Weight of each negative class (column) given a positive class (row);
+        uniform over the other classes if None.
+    min_val, max_val : scalar
+        Targets of the negative and positive examples, respectively.
+    seed : int, default=None
+        Seed for the random number generator.
+
+    Yields
+    ------
+    batch : dict of np.ndarrays
+        Data stream of {cqt, chord_idx, target} minibatches, alternating
+        positive and negative examples, i.e. 2 * batch_size observations,
+        where `chord_idx` is the positive class of each pair.
+    """
+    if partition_labels is None:
+        partition_labels = util.partition(stash, map_chord_labels,
+                                          lex.Strict(vocab_dim))
+
+    if not isinstance(partition_labels, PartitionIndex):
+        partition_labels = PartitionIndex.from_labels(partition_labels,
+                                                      vocab_dim)
+
+    sampler = sampling.ClassSampler(partition_labels, valid_idx)
+    has_data = np.zeros(vocab_dim, dtype=bool)
+    has_data[sampler.classes] = True
+    if neg_probs is None:
+        neg_probs = np.ones([vocab_dim]*2)
+    neg_probs = np.array(neg_probs, dtype=float)
+    neg_probs[np.eye(vocab_dim, dtype=bool)] = 0.0
+    neg_probs *= has_data[np.newaxis, :]
+    # Only the rows of positive classes are needed.
+    neg_prob, neg_alias = sampling.alias_table(neg_probs[sampler.classes])
+
+    bank = FB.FrameBank.from_stash(stash, 'cqt', win_length,
+                                   partition_labels.keys, frame_axis=1)
+    rng = np.random.RandomState(seed)
+    target = np.array([max_val, min_val] * batch_size).reshape(-1, 1)
+    while True:
+        pos_ids, pos_frames, pos_idx = sampler.sample(batch_size, rng)
+        rows = np.searchsorted(sampler.classes, pos_idx)
+        neg_idx = sampling.alias_draw(neg_prob, neg_alias, rows=rows, rng=rng)
+        neg_ids, neg_frames = sampler.sample_classes(neg_idx, rng)
+        key_ids = np.array([pos_ids, neg_ids]).T.flatten()
+        frames = np.array([pos_frames, neg_frames]).T.flatten()
+        yield dict(cqt=bank.gather(bank.rows(key_ids, frames)),
+                   chord_idx=np.repeat(pos_idx, 2).astype(np.int32),
+                   target=target.copy())
+
+
 def chroma_stepper(key, stash, index=None):
     """writeme."""
     entity = stash.get(key)
@@ -689,8 +912,12 @@ def class_prior_v157(stash, lexicon):
     total_count = np.zeros(lexicon.num_classes, dtype=float)
     for k in stash.keys():
         entity = stash.get(k)
-        chord_idx = lexicon.label_to_index(entity.chord_labels)
-        y_true = chord_idx[np.not_equal(chord_idx, None)].astype(int)
+        chord_idx = LC.lexicon_codes(entity, lexicon)
+        if chord_idx is None:
+            chord_idx = lexicon.label_to_index(entity.chord_labels)
+            chord_idx[np.equal(chord_idx, None)] = LC.NO_CODE
+        chord_idx = np.asarray(chord_idx, dtype=int)
+        y_true = chord_idx[chord_idx >= 0]
         counts = np.bincount(y_true)
         total_count[:len(counts)] += counts
 
@@ -1,7 +1,10 @@
+from multiprocessing import Pool
 import numpy as np
 import sys
 import pyjams
+from dl4mir.common import segment
 from dl4mir.common import util
+from dl4mir.common.framestore import FrameStore
 
 
 if hasattr(sys, 'ps1'):
@@ -14,6 +17,9 @@ else:
 __interactive__ = Parallel is None
 NUM_CPUS = 1 if __interactive__ else None
 
+# Per-process arguments shared by all tasks of a decoding sweep.
+_SWEEP_ARGS = dict()
+
 
 def populate_annotation(intervals, labels, confidence, annot):
     """Fill in annotation data, in-place.
@@ -40,6 +46,29 @@ def populate_annotation(intervals, labels, confidence, annot):
         obs.label.confidence = conf
 
 
+def posterior_to_indices(posterior, penalty=None, **viterbi_args):
+    """Decode a posterior to class indices.
+
+    Parameters
+    ----------
+    posterior : np.ndarray, shape=(num_frames, num_classes)
+        Class posterior of each frame.
+    penalty : scalar, default=None
+        Self-transition penalty for Viterbi decoding; frames are decoded
+        independently (argmax) if None.
+    **viterbi_args : dict
+        Other arguments to pass to the Viterbi algorithm.
+
+    Returns
+    -------
+    indices : np.ndarray, shape=(num_frames,)
+        Estimated class index of each frame.
+    """
+    if penalty is None:
+        return posterior.argmax(axis=1)
+    return util.viterbi(posterior, penalty=penalty, **viterbi_args)
+
+
 def decode_posterior(entity, penalty, vocab, **viterbi_args):
     """Decode a posterior Entity to a RangeAnnotation.
 
@@ -63,13 +92,14 @@ def decode_posterior(entity, penalty, vocab, **viterbi_args):
     labels = vocab.index_to_label(y_idx)
 
     n_range = np.arange(len(y_idx))
-    idx_intervals = util.compress_samples_to_intervals(y_idx, n_range)[0]
+    idx_intervals = segment.compress_samples_to_intervals(y_idx, n_range)[0]
     boundaries = np.sort(np.unique(idx_intervals.flatten()))
     likelihoods = np.log(entity.posterior[n_range, y_idx])
-    confidence = util.boundary_pool(likelihoods, boundaries, pool_func='mean')
+    confidence = segment.boundary_pool(likelihoods, boundaries,
+                                       pool_func='mean')
     confidence[np.invert(np.isfinite(confidence))] = 0.0
 
-    intervals, labels = util.compress_samples_to_intervals(
+    intervals, labels = segment.compress_samples_to_intervals(
         labels, entity.time_points)
 
     annot = pyjams.RangeAnnotation()
@@ -104,11 +134,134 @@ def decode_posterior_parallel(entity, penalties, vocab, num_cpus=NUM_CPUS,
     return pool(decode(entity, p, vocab) for p in penalties)
 
 
+def decode_stash_key(stash, key, penalty, vocab, **viterbi_args):
+    """Decode the posterior under a key of a stash to a RangeAnnotation.
+
+    Parameters
+    ----------
+    stash : dict_like
+        Collection of posterior entities; see `decode_posterior`.
+    key : str
+        Key of the entity to decode.
+    penalty : scalar
+        Self-transition penalty to use for Viterbi decoding.
+    vocab : lexicon.Vocabulary
+        Vocabulary object; expects an `index_to_label` method.
+
+    Returns
+    -------
+    annot : pyjams.RangeAnnotation
+        Populated chord annotation.
+    """
+    return decode_posterior(stash.get(key), penalty, vocab, **viterbi_args)
+
+
 def decode_stash_parallel(stash, penalty, vocab, num_cpus=NUM_CPUS,
                           **viterbi_args):
+    """Apply Viterbi decoding to every entity in a stash, in parallel.
+
+    When `stash` is a FrameStore, only its path is sent to the workers, which
+    read each posterior from the shared memory-map; otherwise, every entity is
+    serialized along with its task.
+
+    Parameters
+    ----------
+    stash : dict_like
+        Collection of posterior entities; see `decode_posterior`.
+    penalty : scalar
+        Self-transition penalty to use for Viterbi decoding.
+    vocab : lexicon.Vocabulary
+        Map from posterior indices to labels.
+
+    Returns
+    -------
+    annotations : dict of pyjams.RangeAnnotations
+        Populated chord annotations, under the keys of the stash.
+    """
     assert not __interactive__
     keys = stash.keys()
     pool = Parallel(n_jobs=num_cpus)
-    decode = delayed(decode_posterior)
-    results = pool(decode(stash.get(k), penalty, vocab) for k in keys)
+    if isinstance(stash, FrameStore):
+        decode = delayed(decode_stash_key)
+        tasks = (decode(stash, k, penalty, vocab, **viterbi_args)
+                 for k in keys)
+    else:
+        decode = delayed(decode_posterior)
+        tasks = (decode(stash.get(k), penalty, vocab, **viterbi_args)
+                 for k in keys)
+    results = pool(tasks)
     return {k: r for k, r in zip(keys, results)}
+
+
+def _init_sweep_worker(stash, vocab, viterbi_args):
+    """Bind the arguments shared by every task of a sweep to this process."""
+    _SWEEP_ARGS.update(stash=stash, vocab=vocab, viterbi_args=viterbi_args)
+
+
+def _decode_sweep_task(task):
+    """Decode one (key, penalty) task of a sweep; see `decode_sweep`."""
+    key, penalty = task
+    annot = decode_stash_key(_SWEEP_ARGS['stash'], key, penalty,
+                             _SWEEP_ARGS['vocab'],
+                             **_SWEEP_ARGS['viterbi_args'])
+    return key, penalty, annot
+
+
+def _num_frames(stash, key):
+    """Return the length of a posterior in a stash, preferably without
+    reading it."""
+    if hasattr(stash, 'num_frames'):
+        return stash.num_frames(key)
+    return len(stash.get(key).posterior)
+
+
+def decode_sweep(stash, penalties, vocab, num_cpus=NUM_CPUS, completed=None,
+                 **viterbi_args):
+    """Decode every entity of a stash at every penalty, with one worker pool.
+
+    All (key, penalty) pairs are queued as a single flat set of tasks, longest
+    posteriors first, such that no worker sits idle waiting on the slowest
+    track of a given penalty. Results are yielded as soon as they finish,
+    in no particular order.
+
+    Parameters
+    ----------
+    stash : dict_like
+        Collection of posterior entities; see `decode_posterior`. Ideally a
+        FrameStore, such that workers share the memory-mapped posteriors.
+    penalties : array_like
+        Set of self-transition penalties to apply.
+    vocab : lexicon.Vocabulary
+        Map from posterior indices to labels.
+    num_cpus : int, default=NUM_CPUS
+        Number of worker processes; all available CPUs if None.
+    completed : set, default=None
+        Set of (key, penalty) pairs already decoded, which are skipped.
+
+    Yields
+    ------
+    key : str
+        Key of the decoded entity.
+    penalty : scalar
+        Penalty used for decoding.
+    annot : pyjams.RangeAnnotation
+        Populated chord annotation.
+    """
+    if __interactive__:
+        raise EnvironmentError(
+            "Parallelization is only kosher in non-interactive operation.")
+    completed = set() if completed is None else completed
+    keys = stash.keys()
+    num_frames = [_num_frames(stash, k) for k in keys]
+    tasks = [(keys[idx], p)
+             for idx in np.argsort(num_frames, kind='mergesort')[::-1]
+             for p in penalties if (keys[idx], p) not in completed]
+
+    pool = Pool(processes=num_cpus, initializer=_init_sweep_worker,
+                initargs=(stash, vocab, viterbi_args))
+    try:
+        for result in pool.imap_unordered(_decode_sweep_task, tasks):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
@@ -10,7 +10,6 @@ path/to/estimations \
 """
 
 import argparse
-import biggie
 import json
 import os
 import time
@@ -19,12 +18,14 @@ import pyjams
 
 from dl4mir.chords import PENALTY_VALUES
 from dl4mir.chords.lexicon import Strict
-from dl4mir.chords.decode import decode_stash_parallel
+from dl4mir.chords.decode import decode_sweep
 
-from dl4mir.common import util
 from dl4mir.common import fileutil as futils
+from dl4mir.common import jams_utils
+from dl4mir.common import framestore
 
 NUM_CPUS = 8
+FRAMESTORE_FIELDS = ['posterior', 'time_points']
 
 
 def posterior_stash_to_jams(stash, penalty_values, output_directory,
@@ -33,35 +34,75 @@ def posterior_stash_to_jams(stash, penalty_values, output_directory,
 
     Parameters
     ----------
-    stash : biggie.Stash
-        Posteriors to decode.
+    stash : dict_like
+        Posteriors to decode; a FrameStore is shared with the workers by path.
     penalty_values : array_like
         Collection of penalty values with which to run Viterbi.
     output_directory : str
-        Base path to write out JAMS files; each collection will be written as
-        {output_directory}/{penalty_values[i]}.jamset
+        Base path to write out JAMS files; each collection is streamed to
+        {output_directory}/{penalty_values[i]}.jamsl as it is decoded, and
+        packed to {output_directory}/{penalty_values[i]}.jamz when complete.
+        Penalties with a packed JAMSet are skipped, and keys already in a
+        stream are not decoded again.
     vocab : dl4mir.chords.lexicon.Vocab
         Map from posterior indices to string labels.
     model_params : dict
         Metadata to associate with the annotation.
     """
-    # Sweep over the default penalty values.
+    # Decode all (key, penalty) pairs in one pool, appending each result to
+    #   the stream of its penalty; an interrupted run resumes from the
+    #   streams, and each is packed once complete.
+    futils.create_directory(output_directory)
+    keys = set(stash.keys())
+    writers, completed = dict(), set()
     for penalty in penalty_values:
-        print "[{0}] \tStarting p = {1}".format(time.asctime(), penalty)
-        results = decode_stash_parallel(stash, penalty, vocab, NUM_CPUS)
-
-        output_file = os.path.join(
-            output_directory, "{0}.jamset".format(penalty))
-
-        jamset = dict()
-        for key, annot in results.iteritems():
+        output_file = os.path.join(output_directory, "{0}.{1}".format(
+            penalty, jams_utils.PACKED_EXT))
+        if os.path.exists(output_file):
+            completed.update([(k, penalty) for k in keys])
+            continue
+        stream_file = os.path.join(output_directory, "{0}.{1}".format(
+            penalty, jams_utils.STREAM_EXT))
+        done = jams_utils.jamset_stream_keys(stream_file) & keys
+        completed.update([(k, penalty) for k in done])
+        writers[penalty] = jams_utils.JAMSetWriter(stream_file)
+        if done:
+            print "[{0}] \tResuming p = {1} ({2} / {3})".format(
+                time.asctime(), penalty, len(done), len(keys))
+
+    num_done = dict([(p, 0) for p in penalty_values])
+    for key, penalty in completed:
+        num_done[penalty] += 1
+
+    def finish(penalty):
+        writer = writers.pop(penalty)
+        writer.close()
+        output_file = "{0}.{1}".format(
+            os.path.splitext(writer.filepath)[0], jams_utils.PACKED_EXT)
+        # Pack and rename, so that an interrupted pack is never mistaken for
+        #   a complete JAMSet on restart.
+        tmp_file = "{0}.tmp".format(output_file)
+        jams_utils.pack_jamset_stream(writer.filepath, tmp_file)
+        os.rename(tmp_file, output_file)
+        os.remove(writer.filepath)
+        print "[{0}] \tFinished p = {1}".format(time.asctime(), penalty)
+
+    for penalty in [p for p in writers if num_done[p] == len(keys)]:
+        finish(penalty)
+
+    try:
+        for key, penalty, annot in decode_sweep(stash, penalty_values, vocab,
+                                                NUM_CPUS, completed):
             annot.sandbox.update(timestamp=time.asctime(), **model_params)
             jam = pyjams.JAMS(chord=[annot])
             jam.sandbox.track_id = key
-            jamset[key] = jam
-
-        futils.create_directory(output_directory)
-        util.save_jamset(jamset, output_file)
+            writers[penalty].add(key, jam)
+            num_done[penalty] += 1
+            if num_done[penalty] == len(keys):
+                finish(penalty)
+    finally:
+        for writer in writers.values():
+            writer.close()
 
 
 def main(args):
@@ -73,11 +114,9 @@ def main(args):
     vocab = Strict(157)
     for f in futils.load_textlist(args.posterior_filelist):
         print "[{0}] Decoding {1}".format(time.asctime(), f)
-        # Read the whole stash to memory because the hdf5 reference doesn't
-        #   survive parallelization.
-        stash = biggie.Stash(f)
-        keys = stash.keys()
-        stash = {k: biggie.Entity(**stash.get(k).values()) for k in keys}
+        # The hdf5 reference doesn't survive parallelization, so decode from
+        #   a memory-mapped mirror of the stash that workers open by path.
+        stash = framestore.load_or_create(f, FRAMESTORE_FIELDS)
 
         # Parse the posterior stash filepath for its model's params
         parts = list(os.path.splitext(f)[0].split('outputs/')[-1].split('/'))
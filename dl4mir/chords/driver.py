@@ -2,6 +2,7 @@
 import argparse
 import biggie
 import optimus
+import os
 from os import path
 import numpy as np
 import json
@@ -9,6 +10,9 @@ import json
 import dl4mir.common.fileutil as futil
 import dl4mir.chords.data as D
 import dl4mir.common.streams as S
+from dl4mir.common import framestore
+from dl4mir.common import throughput
+from dl4mir.common.prefetch import prefetch
 from dl4mir.chords import DRIVER_ARGS
 from dl4mir.chords import models
 import dl4mir.chords.lexicon as lex
@@ -17,6 +21,27 @@ DRIVER_ARGS['max_iter'] = 500000
 VOCAB = lex.Strict(157)
 LEARNING_RATE = 0.02
 BATCH_SIZE = 50
+FRAMESTORE_FIELDS = ['cqt', 'chord_labels']
+
+
+def open_stash(training_file, use_framestore=False):
+    """Open a training stash, or the memory-mapped frame store mirroring it,
+    which concurrent training processes share through the page cache."""
+    if use_framestore:
+        return framestore.load_or_create(
+            training_file, FRAMESTORE_FIELDS, frame_axes=dict(cqt=1),
+            dtypes=dict(cqt=np.float32))
+    return biggie.Stash(training_file, cache=True)
+
+
+def chord_index_stream(training_file, time_dim, partition_labels,
+                       use_framestore=False):
+    """Open a training stash and stream its chord samples; called once in
+    each prefetching worker, such that each reads its own file handle."""
+    stash = open_stash(training_file, use_framestore)
+    return D.create_chord_index_stream(
+        stash, time_dim, max_pitch_shift=0, lexicon=VOCAB,
+        partition_labels=partition_labels)
 
 
 def main(args):
@@ -32,22 +57,61 @@ def main(args):
         trainer.load_param_values(args.init_param_file)
 
     print "Opening %s" % args.training_file
-    stash = biggie.Stash(args.training_file, cache=True)
-    stream = D.create_chord_index_stream(
-        stash, time_dim, max_pitch_shift=0, lexicon=VOCAB)
+    partition_labels = D.load_partition_index(args.training_file, VOCAB)
+    if args.framestore:
+        # Build (or validate) the frame store once, before any workers start.
+        open_stash(args.training_file, use_framestore=True)
+    stream_args = (args.training_file, time_dim, partition_labels,
+                   args.framestore)
+    if args.vectorized:
+        stash = open_stash(args.training_file, args.framestore)
+        stream = D.create_chord_batch_stream(
+            stash, time_dim, VOCAB, batch_size=BATCH_SIZE,
+            partition_labels=partition_labels)
+        get_state, set_state = stream.get_state, stream.set_state
+    elif args.num_workers:
+        stream = prefetch(chord_index_stream, stream_args,
+                          batch_size=BATCH_SIZE, num_workers=args.num_workers)
+        get_state = set_state = None
+    else:
+        stream = throughput.stage('minibatch', S.minibatch,
+                                  chord_index_stream(*stream_args),
+                                  batch_size=BATCH_SIZE)
+        # The pools and per-entity generators of the muxes cannot be
+        #   serialized, so sample-wise streams cannot be resumed.
+        get_state = set_state = None
+
+    output_directory = futil.create_directory(args.output_directory)
+    if get_state is None:
+        if args.init_stream_state:
+            raise ValueError("Stream state can only be restored with "
+                             "--vectorized.")
+        print "Stream state is only saved with --vectorized."
+    else:
+        if args.init_stream_state:
+            print "Loading stream state: %s" % args.init_stream_state
+            set_state(json.load(open(args.init_stream_state)))
+        state_fmt = path.join(output_directory, "%s-stream_state-{0:07d}.json"
+                              % args.trial_name)
+        stream = S.save_state(stream, get_state, state_fmt,
+                              DRIVER_ARGS['save_freq'])
 
     # Load prior
     stat_file = "%s.json" % path.splitext(args.training_file)[0]
     prior = np.array(json.load(open(stat_file))['prior'], dtype=float)
     trainer.nodes['prior'].weight.value = 1.0 / prior.reshape(1, -1)
 
-    stream = S.minibatch(stream, batch_size=BATCH_SIZE)
+    if args.stop_file:
+        if path.exists(args.stop_file):
+            print "Removing stale stop file: %s" % args.stop_file
+            os.remove(args.stop_file)
+        stream = S.stop_on_file(stream, args.stop_file)
 
     print "Starting '%s'" % args.trial_name
     driver = optimus.Driver(
         graph=trainer,
         name=args.trial_name,
-        output_directory=futil.create_directory(args.output_directory))
+        output_directory=output_directory)
 
     hyperparams = dict(learning_rate=LEARNING_RATE)
     if args.dropout:
@@ -86,4 +150,25 @@ if __name__ == "__main__":
                         metavar="--init_param_file", type=str, default='',
                         help="Path to a NPZ archive for initialization the "
                         "parameters of the graph.")
+    parser.add_argument("--init_stream_state",
+                        metavar="--init_stream_state", type=str, default='',
+                        help="Path to a JSON stream state saved alongside a "
+                        "parameter checkpoint, for resuming training; "
+                        "requires --vectorized.")
+    parser.add_argument("--vectorized",
+                        action="store_true",
+                        help="Draw minibatches from an in-memory frame bank, "
+                        "rather than sample by sample.")
+    parser.add_argument("--framestore",
+                        action="store_true",
+                        help="Read training data from a memory-mapped frame "
+                        "store, created alongside the training file.")
+    parser.add_argument("--num_workers",
+                        metavar="--num_workers", type=int, default=0,
+                        help="Number of processes sampling minibatches; "
+                        "samples in the training process if 0.")
+    parser.add_argument("--stop_file",
+                        metavar="--stop_file", type=str, default='',
+                        help="Path to a file which, once it exists, ends "
+                        "training; see `dl4mir.common.checkpoints`.")
     main(parser.parse_args())
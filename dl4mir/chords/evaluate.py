@@ -10,6 +10,210 @@ import dl4mir.chords.lexicon as lex
 STRICT = lex.Strict(157)
 
 
+class LabelIndex(object):
+    """Interned vocabulary of chord labels, mapped to dense integer codes.
+
+    Codes are assigned in order of first appearance and never change, so
+    they remain valid as the vocabulary grows.
+    """
+    def __init__(self):
+        self._codes = dict()
+        self.labels = list()
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _intern(self, label):
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def encode(self, labels):
+        """Map a sequence of labels to integer codes, interning new labels.
+
+        Parameters
+        ----------
+        labels : list, len=n
+            Chord labels.
+
+        Returns
+        -------
+        codes : np.ndarray, shape=(n,), dtype=int
+            Integer codes of the labels.
+        """
+        if len(labels) == 0:
+            return np.zeros(0, dtype=int)
+        uniques, first, inverse = np.unique(
+            labels, return_index=True, return_inverse=True)
+        codes = np.zeros(len(uniques), dtype=int)
+        for idx in np.argsort(first):
+            codes[idx] = self._intern(str(uniques[idx]))
+        return codes[inverse]
+
+    def decode(self, codes):
+        """Map integer codes back to a list of labels."""
+        return [self.labels[c] for c in codes]
+
+
+# Label vocabularies shared by all alignments and comparison tables in this
+#   process.
+REF_LABELS = LabelIndex()
+EST_LABELS = LabelIndex()
+
+
+def _adjust_intervals(intervals, codes, t_min, t_max, fill_code):
+    """Crop or pad labeled intervals to span [t_min, t_max].
+
+    Equivalent to `mir_eval.util.adjust_intervals`, on label codes.
+    """
+    if intervals.size == 0:
+        return np.array([[t_min, t_max]]), np.array([fill_code])
+
+    first_idx = np.flatnonzero(intervals[:, 1] >= t_min)
+    if len(first_idx):
+        intervals, codes = intervals[first_idx[0]:], codes[first_idx[0]:]
+    intervals = np.maximum(t_min, intervals)
+    if intervals.min() > t_min:
+        intervals = np.vstack([[t_min, intervals.min()], intervals])
+        codes = np.concatenate([[fill_code], codes])
+
+    last_idx = np.flatnonzero(intervals[:, 0] > t_max)
+    if len(last_idx):
+        intervals, codes = intervals[:last_idx[0]], codes[:last_idx[0]]
+    intervals = np.minimum(t_max, intervals)
+    if intervals.max() < t_max:
+        intervals = np.vstack([intervals, [intervals.max(), t_max]])
+        codes = np.concatenate([codes, [fill_code]])
+    return intervals, codes
+
+
+def _last_start_index(starts, times):
+    """Index of the last interval, in order, starting at or before each time.
+    """
+    order = np.argsort(starts, kind='mergesort')
+    latest = np.maximum.accumulate(order)
+    return latest[np.searchsorted(starts[order], times, side='right') - 1]
+
+
+def align_label_codes(ref_intervals, ref_codes, est_intervals, est_codes,
+                      ref_fill_code, est_fill_code):
+    """Align two sets of integer-coded labeled intervals.
+
+    The estimation is cropped or padded to the span of the reference, and
+    the segments of both are merged on the union of their boundaries.
+
+    Parameters
+    ----------
+    ref_intervals : np.ndarray, shape=(n, 2)
+        Reference start and end times.
+    ref_codes : np.ndarray, shape=(n,)
+        Reference label codes.
+    est_intervals : np.ndarray, shape=(n, 2)
+        Estimated start and end times.
+    est_codes : np.ndarray, shape=(n,)
+        Estimated label codes.
+    ref_fill_code, est_fill_code : int
+        Label codes for padded reference and estimated intervals.
+
+    Returns
+    -------
+    durations : np.ndarray, shape=(m,)
+        Time durations (weights) of each aligned interval.
+    ref_codes : np.ndarray, shape=(m,)
+        Reference label codes.
+    est_codes : np.ndarray, shape=(m,)
+        Estimated label codes.
+    """
+    t_min = ref_intervals.min()
+    t_max = ref_intervals.max()
+    ref_intervals, ref_codes = _adjust_intervals(
+        ref_intervals, ref_codes, t_min, t_max, ref_fill_code)
+    est_intervals, est_codes = _adjust_intervals(
+        est_intervals, est_codes, t_min, t_max, est_fill_code)
+
+    boundaries = np.union1d(ref_intervals.ravel(), est_intervals.ravel())
+    starts = boundaries[:-1]
+    ref_idx = _last_start_index(ref_intervals[:, 0], starts)
+    est_idx = _last_start_index(est_intervals[:, 0], starts)
+    return np.diff(boundaries), ref_codes[ref_idx], est_codes[est_idx]
+
+
+def align_annotations(ref_annots, est_annots, ref_fill_value=L.NO_CHORD,
+                      est_fill_value=L.NO_CHORD):
+    """Align many pairs of chord annotations, as flat integer-coded arrays.
+
+    Parameters
+    ----------
+    ref_annots : list, len=n
+        Reference annotations, or (intervals, labels) pairs.
+    est_annots : list, len=n
+        Estimated annotations, or (intervals, labels) pairs.
+
+    Returns
+    -------
+    durations : np.ndarray, shape=(m,)
+        Time durations (weights) of all aligned intervals.
+    ref_codes : np.ndarray, shape=(m,)
+        Reference label codes, in `REF_LABELS`.
+    est_codes : np.ndarray, shape=(m,)
+        Estimated label codes, in `EST_LABELS`.
+    offsets : np.ndarray, shape=(n + 1,)
+        Offsets of each annotation pair into the flat arrays, such that pair
+        `i` spans `offsets[i]:offsets[i + 1]`.
+    """
+    ref_fill_code = REF_LABELS.encode([ref_fill_value])[0]
+    est_fill_code = EST_LABELS.encode([est_fill_value])[0]
+    durations, ref_codes, est_codes = [np.zeros(0)], [], []
+    offsets = [0]
+    for ref_annot, est_annot in zip(ref_annots, est_annots):
+        ref_intervals, ref_labels = annotation_to_labeled_intervals(ref_annot)
+        est_intervals, est_labels = annotation_to_labeled_intervals(est_annot)
+        aligned = align_label_codes(
+            ref_intervals, REF_LABELS.encode(ref_labels),
+            est_intervals, EST_LABELS.encode(est_labels),
+            ref_fill_code, est_fill_code)
+        for values, output in zip(aligned,
+                                  [durations, ref_codes, est_codes]):
+            output.append(values)
+        offsets.append(offsets[-1] + len(aligned[0]))
+
+    return (np.concatenate(durations),
+            np.concatenate(ref_codes + [np.zeros(0, dtype=int)]),
+            np.concatenate(est_codes + [np.zeros(0, dtype=int)]),
+            np.array(offsets))
+
+
+def transpose_label_codes(ref_codes, est_codes):
+    """Rotate coded label pairs to the equivalent relationships in C.
+
+    Each distinct pair is transposed once; see `labels.relative_transpose`.
+
+    Parameters
+    ----------
+    ref_codes : np.ndarray, shape=(m,)
+        Reference label codes, in `REF_LABELS`.
+    est_codes : np.ndarray, shape=(m,)
+        Estimated label codes, in `EST_LABELS`.
+
+    Returns
+    -------
+    ref_codes, est_codes : np.ndarray, shape=(m,)
+        Codes of the transposed reference and estimated labels.
+    """
+    if len(ref_codes) == 0:
+        return ref_codes, est_codes
+    num_est = len(EST_LABELS)
+    pairs, inverse = np.unique(ref_codes * num_est + est_codes,
+                               return_inverse=True)
+    ref_labels, est_labels = L.relative_transpose(
+        REF_LABELS.decode(pairs // num_est),
+        EST_LABELS.decode(pairs % num_est))
+    return (REF_LABELS.encode(ref_labels)[inverse],
+            EST_LABELS.encode(est_labels)[inverse])
+
+
 def align_labeled_intervals(ref_intervals, ref_labels, est_intervals,
                             est_labels, ref_fill_value=L.NO_CHORD,
                             est_fill_value=L.NO_CHORD):
@@ -35,21 +239,36 @@ def align_labeled_intervals(ref_intervals, ref_labels, est_intervals,
     est_labels : list, shape=(m,)
         Estimated labels.
     """
-    t_min = ref_intervals.min()
-    t_max = ref_intervals.max()
-    ref_intervals, ref_labels = mir_eval.util.adjust_intervals(
-        ref_intervals, ref_labels, t_min, t_max,
-        ref_fill_value, ref_fill_value)
-
-    est_intervals, est_labels = mir_eval.util.adjust_intervals(
-        est_intervals, est_labels, t_min, t_max,
-        est_fill_value, est_fill_value)
-
-    # Merge the time-intervals
-    intervals, ref_labels, est_labels = mir_eval.util.merge_labeled_intervals(
-        ref_intervals, ref_labels, est_intervals, est_labels)
-    durations = mir_eval.util.intervals_to_durations(intervals)
-    return durations, ref_labels, est_labels
+    durations, ref_codes, est_codes = align_label_codes(
+        np.asarray(ref_intervals), REF_LABELS.encode(ref_labels),
+        np.asarray(est_intervals), EST_LABELS.encode(est_labels),
+        REF_LABELS.encode([ref_fill_value])[0],
+        EST_LABELS.encode([est_fill_value])[0])
+    return (durations, REF_LABELS.decode(ref_codes),
+            EST_LABELS.decode(est_codes))
+
+
+def annotation_to_labeled_intervals(annot):
+    """Return the intervals and labels of a chord annotation.
+
+    Parameters
+    ----------
+    annot : pyjams.RangeAnnotation, or tuple
+        Range Annotation, or an (intervals, labels) pair, which is passed
+        through as-is; see `jams_utils.chord_labeled_intervals`.
+
+    Returns
+    -------
+    intervals : np.ndarray, shape=(n, 2)
+        Start and end times.
+    labels : list, shape=(n,)
+        Chord labels.
+    """
+    if isinstance(annot, tuple):
+        intervals, labels = annot
+    else:
+        intervals, labels = annot.intervals, annot.labels.value
+    return np.asarray(intervals), list(labels)
 
 
 def align_chord_annotations(ref_annot, est_annot, transpose=False):
@@ -57,10 +276,12 @@ def align_chord_annotations(ref_annot, est_annot, transpose=False):
 
     Parameters
     ----------
-    ref_annot : pyjams.range_annotation
-        Range Annotation to use as a chord reference.
-    est_annot : pyjams.range_annotation
-        Range Annotation to use as a chord estimation.
+    ref_annot : pyjams.range_annotation, or tuple
+        Range Annotation to use as a chord reference, or its labeled
+        intervals as an (intervals, labels) pair.
+    est_annot : pyjams.range_annotation, or tuple
+        Range Annotation to use as a chord estimation, or its labeled
+        intervals as an (intervals, labels) pair.
     transpose : bool, default=False
         Transpose all chord pairs to the equivalent relationship in C.
 
@@ -73,11 +294,11 @@ def align_chord_annotations(ref_annot, est_annot, transpose=False):
     est_labels : list, shape=(m,)
         Estimated labels.
     """
+    ref_intervals, ref_labels = annotation_to_labeled_intervals(ref_annot)
+    est_intervals, est_labels = annotation_to_labeled_intervals(est_annot)
     durations, ref_labels, est_labels = align_labeled_intervals(
-        ref_intervals=np.asarray(ref_annot.intervals),
-        ref_labels=ref_annot.labels.value,
-        est_intervals=np.asarray(est_annot.intervals),
-        est_labels=est_annot.labels.value)
+        ref_intervals=ref_intervals, ref_labels=ref_labels,
+        est_intervals=est_intervals, est_labels=est_labels)
 
     if transpose:
         ref_labels, est_labels = L.relative_transpose(ref_labels, est_labels)
@@ -143,17 +364,98 @@ COMPARISONS = dict(
     v157_strict=v157_strict)
 
 
-def pairwise_score_labels(ref_labels, est_labels, weights, compare_func):
-    """Tabulate the score and weight for a pair of annotation labels.
+class ComparisonTable(object):
+    """Lazily computed (n_ref_labels x n_est_labels) matrix of scores.
+
+    Each distinct (reference, estimated) label pair is compared once, the
+    first time it is looked up; thereafter, scoring a sequence of label codes
+    is a single gather.
 
     Parameters
     ----------
-    ref_annot : pyjams.RangeAnnotation
-        Chord annotation to use as a reference.
-    est_annot : pyjams.RangeAnnotation
-        Chord annotation to use as a estimation.
-    compare_func : method
-        Function to use for comparing a pair of chord labels.
+    compare_func : function
+        Comparison function, as in `COMPARISONS`, mapping lists of reference
+        and estimated labels to an array of scores.
+    ref_index : LabelIndex, default=REF_LABELS
+        Vocabulary of reference labels.
+    est_index : LabelIndex, default=EST_LABELS
+        Vocabulary of estimated labels.
+    """
+    def __init__(self, compare_func, ref_index=None, est_index=None):
+        self.compare_func = compare_func
+        self.ref_index = REF_LABELS if ref_index is None else ref_index
+        self.est_index = EST_LABELS if est_index is None else est_index
+        self._scores = np.zeros([0, 0], dtype=float)
+        self._known = np.zeros([0, 0], dtype=bool)
+
+    def _grow(self):
+        """Resize the tables to cover the current label vocabularies."""
+        num_ref, num_est = self._scores.shape
+        if num_ref >= len(self.ref_index) and num_est >= len(self.est_index):
+            return
+        # Over-allocate, to amortize the cost of copying as the vocabularies
+        #   grow.
+        shape = (max(len(self.ref_index), 2 * num_ref),
+                 max(len(self.est_index), 2 * num_est))
+        scores = np.zeros(shape, dtype=float)
+        known = np.zeros(shape, dtype=bool)
+        scores[:num_ref, :num_est] = self._scores
+        known[:num_ref, :num_est] = self._known
+        self._scores, self._known = scores, known
+
+    def lookup(self, ref_codes, est_codes):
+        """Return the scores of aligned reference and estimated label codes.
+
+        Parameters
+        ----------
+        ref_codes : np.ndarray, shape=(n,)
+            Reference label codes, from `ref_index`.
+        est_codes : np.ndarray, shape=(n,)
+            Estimated label codes, from `est_index`.
+
+        Returns
+        -------
+        scores : np.ndarray, shape=(n,)
+            Comparison scores, in [0.0, 1.0], or -1 if out of gamut.
+        """
+        self._grow()
+        missing = np.invert(self._known[ref_codes, est_codes])
+        if missing.any():
+            num_est = self._scores.shape[1]
+            pairs = np.unique(ref_codes[missing] * num_est +
+                              est_codes[missing])
+            ref_idx, est_idx = pairs // num_est, pairs % num_est
+            self._scores[ref_idx, est_idx] = self.compare_func(
+                self.ref_index.decode(ref_idx),
+                self.est_index.decode(est_idx))
+            self._known[ref_idx, est_idx] = True
+        return self._scores[ref_codes, est_codes]
+
+    def score(self, ref_labels, est_labels):
+        """Return the scores of aligned reference and estimated labels."""
+        return self.lookup(self.ref_index.encode(ref_labels),
+                           self.est_index.encode(est_labels))
+
+
+_TABLES = dict()
+
+
+def comparison_table(compare_func):
+    """Return the shared ComparisonTable of a comparison function."""
+    if compare_func not in _TABLES:
+        _TABLES[compare_func] = ComparisonTable(compare_func)
+    return _TABLES[compare_func]
+
+
+def weighted_score(scores, weights):
+    """Average a set of comparison scores, ignoring those out of gamut.
+
+    Parameters
+    ----------
+    scores : np.ndarray, shape=(n,)
+        Comparison scores, in [0.0, 1.0], or -1 if out of gamut.
+    weights : np.ndarray, shape=(n,)
+        Weight (duration) of each comparison.
 
     Returns
     -------
@@ -162,7 +464,6 @@ def pairwise_score_labels(ref_labels, est_labels, weights, compare_func):
     weight : float
         Relative weight of the comparison, >= 0.
     """
-    scores = compare_func(ref_labels, est_labels)
     valid_idx = scores >= 0
     total_weight = weights[valid_idx].sum()
     correct_weight = np.dot(scores[valid_idx], weights[valid_idx])
@@ -170,40 +471,169 @@ def pairwise_score_labels(ref_labels, est_labels, weights, compare_func):
     return correct_weight / norm, total_weight
 
 
+def pairwise_score_labels(ref_labels, est_labels, weights, compare_func):
+    """Tabulate the score and weight for a pair of annotation labels.
+
+    Parameters
+    ----------
+    ref_labels : list, len=n
+        Aligned reference labels.
+    est_labels : list, len=n
+        Aligned estimated labels.
+    weights : np.ndarray, shape=(n,)
+        Weight (duration) of each label pair.
+    compare_func : method
+        Function to use for comparing a pair of chord labels; scores are
+        looked up in its `comparison_table`.
+
+    Returns
+    -------
+    score : float
+        Average score, in [0, 1].
+    weight : float
+        Relative weight of the comparison, >= 0.
+    """
+    scores = comparison_table(compare_func).score(ref_labels, est_labels)
+    return weighted_score(scores, weights)
+
+
+class LabelCounts(object):
+    """Sparse, mergeable accumulator of label-pair counts and supports.
+
+    Entries are kept as flat (COO) arrays over the codes of `REF_LABELS` and
+    `EST_LABELS`, one per distinct (reference, estimate) pair. Accumulators
+    merge by addition; they pickle by label, so that those computed in other
+    processes, with other codes, can be merged as well.
+    """
+    def __init__(self):
+        self.ref_codes = np.zeros(0, dtype=int)
+        self.est_codes = np.zeros(0, dtype=int)
+        self.counts = np.zeros(0, dtype=float)
+        self.supports = np.zeros(0, dtype=float)
+
+    @classmethod
+    def from_labels(cls, ref_labels, est_labels, counts, supports):
+        """Build an accumulator from aligned labels, counts and supports."""
+        label_counts = cls()
+        label_counts._accumulate(
+            REF_LABELS.encode(ref_labels), EST_LABELS.encode(est_labels),
+            np.asarray(counts, dtype=float), np.asarray(supports, dtype=float))
+        return label_counts
+
+    @classmethod
+    def from_dict(cls, label_counts):
+        """Build an accumulator from a nested map; see `to_dict`."""
+        entries = [(ref, est, v['count'], v['support'])
+                   for ref, estimations in label_counts.items()
+                   for est, v in estimations.items()]
+        return cls.from_labels(*[[e[n] for e in entries] for n in range(4)])
+
+    def __getstate__(self):
+        return dict(ref_labels=REF_LABELS.decode(self.ref_codes),
+                    est_labels=EST_LABELS.decode(self.est_codes),
+                    counts=self.counts, supports=self.supports)
+
+    def __setstate__(self, state):
+        self.__init__()
+        self._accumulate(REF_LABELS.encode(state['ref_labels']),
+                         EST_LABELS.encode(state['est_labels']),
+                         state['counts'], state['supports'])
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __add__(self, other):
+        result = LabelCounts()
+        result._accumulate(self.ref_codes, self.est_codes,
+                           self.counts, self.supports)
+        return result.merge(other)
+
+    def _accumulate(self, ref_codes, est_codes, counts, supports):
+        """Sum new entries into the accumulator, by label pair."""
+        num_est = max(len(EST_LABELS), 1)
+        pairs = np.concatenate([self.ref_codes * num_est + self.est_codes,
+                                ref_codes * num_est + est_codes])
+        counts = np.concatenate([self.counts, counts])
+        supports = np.concatenate([self.supports, supports])
+
+        pairs, inverse = np.unique(pairs, return_inverse=True)
+        self.counts, self.supports = np.zeros([2, len(pairs)])
+        np.add.at(self.counts, inverse, counts)
+        np.add.at(self.supports, inverse, supports)
+        self.ref_codes, self.est_codes = pairs // num_est, pairs % num_est
+
+    def add(self, ref_codes, est_codes, scores, weights):
+        """Accumulate scored label pairs, ignoring those out of gamut.
+
+        Parameters
+        ----------
+        ref_codes : np.ndarray, shape=(n,)
+            Reference label codes, in `REF_LABELS`.
+        est_codes : np.ndarray, shape=(n,)
+            Estimated label codes, in `EST_LABELS`.
+        scores : np.ndarray, shape=(n,)
+            Comparison scores, in [0.0, 1.0], or -1 if out of gamut.
+        weights : np.ndarray, shape=(n,)
+            Weight (duration) of each label pair.
+
+        Returns
+        -------
+        self : LabelCounts
+            The updated accumulator.
+        """
+        valid = scores >= 0
+        self._accumulate(ref_codes[valid], est_codes[valid],
+                         scores[valid] * weights[valid], weights[valid])
+        return self
+
+    def merge(self, other):
+        """Add the entries of another accumulator to this one, in-place."""
+        self._accumulate(other.ref_codes, other.est_codes,
+                         other.counts, other.supports)
+        return self
+
+    def to_dict(self):
+        """Return the entries as a nested {ref: {est: {count, support}}} map.
+        """
+        label_counts = dict()
+        for ref, est, count, support in zip(
+                REF_LABELS.decode(self.ref_codes),
+                EST_LABELS.decode(self.est_codes),
+                self.counts, self.supports):
+            label_counts.setdefault(ref, dict())[est] = dict(
+                count=count, support=support)
+        return label_counts
+
+
 def pairwise_reduce_labels(ref_labels, est_labels, weights, compare_func,
                            label_counts=None):
     """Accumulate estimated timed of a collection label pairs.
 
     Parameters
     ----------
-    ref_annot : pyjams.RangeAnnotation
-        Chord annotation to use as a reference.
-    est_annot : pyjams.RangeAnnotation
-        Chord annotation to use as a estimation.
+    ref_labels : list, len=n
+        Aligned reference labels.
+    est_labels : list, len=n
+        Aligned estimated labels.
+    weights : np.ndarray, shape=(n,)
+        Weight (duration) of each label pair.
     compare_func : method
         Function to use for comparing a pair of chord labels.
+    label_counts : LabelCounts, default=None
+        Accumulator to update in-place; a new one is created if None.
 
     Returns
     -------
-    label_counts : dict
-        Map of reference labels to estimated label counts and support.
+    label_counts : LabelCounts
+        Reference and estimated label counts and support.
     """
-    scores = compare_func(ref_labels, est_labels)
-
     if label_counts is None:
-        label_counts = dict()
-
-    for ref, est, s, w in zip(ref_labels, est_labels, scores, weights):
-        if s < 0:
-            continue
-        if not ref in label_counts:
-            label_counts[ref] = dict()
-        if not est in label_counts[ref]:
-            label_counts[ref][est] = dict(count=0.0, support=0.0)
-        label_counts[ref][est]['count'] += s*w
-        label_counts[ref][est]['support'] += w
-
-    return label_counts
+        label_counts = LabelCounts()
+    ref_codes = REF_LABELS.encode(ref_labels)
+    est_codes = EST_LABELS.encode(est_labels)
+    scores = comparison_table(compare_func).lookup(ref_codes, est_codes)
+    return label_counts.add(ref_codes, est_codes, scores,
+                            np.asarray(weights, dtype=float))
 
 
 def pair_annotations(ref_jams, est_jams, ref_pattern='*', est_pattern='*'):
@@ -244,7 +674,7 @@ def pair_annotations(ref_jams, est_jams, ref_pattern='*', est_pattern='*'):
     return ref_annots, est_annots
 
 
-def score_annotations(ref_annots, est_annots, metrics):
+def score_annotations(ref_annots, est_annots, metrics, alignment=None):
     """Tabulate overall scores for two sets of annotations.
 
     Parameters
@@ -255,6 +685,8 @@ def score_annotations(ref_annots, est_annots, metrics):
         Filepaths to a set of estimated annotations.
     metrics : list, len=k
         Metric names to compute overall scores.
+    alignment : tuple, default=None
+        Output of `align_annotations` for these annotations, if available.
 
     Returns
     -------
@@ -263,13 +695,27 @@ def score_annotations(ref_annots, est_annots, metrics):
     weights : np.ndarray
         Relative weight of each score.
     """
-    scores, support = np.zeros([2, len(ref_annots), len(metrics)])
-    for n, (ref_annot, est_annot) in enumerate(zip(ref_annots, est_annots)):
-        (weights, ref_labels,
-            est_labels) = align_chord_annotations(ref_annot, est_annot)
-        for k, metric in enumerate(metrics):
-            scores[n, k], support[n, k] = pairwise_score_labels(
-                ref_labels, est_labels, weights, COMPARISONS[metric])
+    if alignment is None:
+        alignment = align_annotations(ref_annots, est_annots)
+    return _score_codes(alignment, metrics)
+
+
+def _score_codes(alignment, metrics):
+    """Tabulate the weighted score of each span of aligned label codes."""
+    durations, ref_codes, est_codes, offsets = alignment
+    num_annots = len(offsets) - 1
+    annot_idx = np.repeat(np.arange(num_annots), np.diff(offsets))
+    scores, support = np.zeros([2, num_annots, len(metrics)])
+    for k, metric in enumerate(metrics):
+        values = comparison_table(COMPARISONS[metric]).lookup(
+            ref_codes, est_codes)
+        weights = durations * (values >= 0)
+        support[:, k] = np.bincount(annot_idx, weights, minlength=num_annots)
+        correct = np.bincount(annot_idx, weights * values,
+                              minlength=num_annots)
+        norm = support[:, k].copy()
+        norm[norm <= 0] = 1.0
+        scores[:, k] = correct / norm
 
     return scores, support
 
@@ -314,9 +760,71 @@ def score_annotations_parallel(ref_annots, est_annots, metrics, num_cpus=8):
     return scores, support
 
 
-def reduce_annotations(ref_annots, est_annots, metrics):
+FRAME_METRICS = ['v157_strict', 'majmin']
+_VOCAB_CODES = dict()
+
+
+def vocab_label_codes(vocab):
+    """Return the `EST_LABELS` code of each class index of a vocabulary.
+
+    Parameters
+    ----------
+    vocab : lexicon.Lexicon
+        Map from class indices to labels, with `num_classes` classes.
+
+    Returns
+    -------
+    codes : np.ndarray, shape=(vocab.num_classes,)
+        Label codes, indexed by class.
+    """
+    if vocab not in _VOCAB_CODES:
+        _VOCAB_CODES[vocab] = EST_LABELS.encode(
+            vocab.index_to_label(range(vocab.num_classes)))
+    return _VOCAB_CODES[vocab]
+
+
+def score_frames(ref_labels, est_indices, vocab, metrics=FRAME_METRICS,
+                 offsets=None):
+    """Tabulate frame-weighted scores of class estimates against labels.
+
+    No intervals are built or aligned: frames are compared directly, as
+    integer codes, through the comparison tables of each metric.
+
+    Parameters
+    ----------
+    ref_labels : array_like, shape=(m,)
+        Reference chord label of each frame.
+    est_indices : np.ndarray, shape=(m,)
+        Estimated class index of each frame, in `vocab`.
+    vocab : lexicon.Lexicon
+        Map from class indices to labels.
+    metrics : list, len=k, default=FRAME_METRICS
+        Metric names to compute overall scores.
+    offsets : array_like, shape=(n + 1,), default=None
+        Offsets of each track into the frames, such that track `i` spans
+        `offsets[i]:offsets[i + 1]`; all frames form one track if None.
+
+    Returns
+    -------
+    scores : np.ndarray, shape=(n, k)
+        Resulting track-wise scores.
+    weights : np.ndarray, shape=(n, k)
+        Number of frames in gamut, for each score.
+    """
+    if offsets is None:
+        offsets = [0, len(est_indices)]
+    ref_codes = REF_LABELS.encode(list(ref_labels))
+    est_codes = vocab_label_codes(vocab)[np.asarray(est_indices, dtype=int)]
+    durations = np.ones(len(est_codes), dtype=float)
+    return _score_codes((durations, ref_codes, est_codes, np.asarray(offsets)),
+                        metrics)
+
+
+def reduce_annotations(ref_annots, est_annots, metrics, alignment=None):
     """Collapse annotations to a sparse matrix of label estimation supports.
 
+    Label pairs are transposed to their equivalent relationships in C.
+
     Parameters
     ----------
     ref_annots : list, len=n
@@ -325,19 +833,25 @@ def reduce_annotations(ref_annots, est_annots, metrics):
         Filepaths to a set of estimated annotations.
     metrics : list, len=k
         Metric names to compute overall scores.
+    alignment : tuple, default=None
+        Output of `align_annotations` for these annotations, if available.
 
     Returns
     -------
-    all_label_counts : list of dicts
-        Sparse matrix mapping {metric, ref, est, support} values.
+    all_label_counts : dict of LabelCounts
+        Sparse matrix of {ref, est, count, support} values, by metric.
     """
-    label_counts = dict([(m, dict()) for m in metrics])
-    for ref_annot, est_annot in zip(ref_annots, est_annots):
-        weights, ref_labels, est_labels = align_chord_annotations(
-            ref_annot, est_annot, transpose=True)
-        for metric in metrics:
-            pairwise_reduce_labels(ref_labels, est_labels, weights,
-                                   COMPARISONS[metric], label_counts[metric])
+    if alignment is None:
+        alignment = align_annotations(ref_annots, est_annots)
+    durations, ref_codes, est_codes = alignment[:3]
+    ref_codes, est_codes = transpose_label_codes(ref_codes, est_codes)
+
+    label_counts = dict()
+    for metric in metrics:
+        scores = comparison_table(COMPARISONS[metric]).lookup(
+            ref_codes, est_codes)
+        label_counts[metric] = LabelCounts().add(
+            ref_codes, est_codes, scores, durations)
 
     return label_counts
 
@@ -347,8 +861,9 @@ def macro_average(label_counts, sort=True, min_support=0):
 
     Parameters
     ----------
-    label_counts : dict
-        Map of reference labels to estimations, containing a `support` count.
+    label_counts : LabelCounts, or dict
+        Accumulated label counts, or a map of reference labels to
+        estimations, containing `count` and `support` values.
     sort : bool, default=True
         Sort the results in descending order.
     min_support : scalar
@@ -363,16 +878,18 @@ def macro_average(label_counts, sort=True, min_support=0):
     support : np.ndarray, len=n
         Support values corresponding to labels and scores.
     """
-    N = len(label_counts)
-    labels = [''] * N
-    scores, supports = np.zeros([2, N], dtype=float)
-    for idx, (ref_label, estimations) in enumerate(label_counts.items()):
-        labels[idx] = ref_label
-        supports[idx] = sum([_['support'] for _ in estimations.values()])
-        scores[idx] = sum([_['count'] for _ in estimations.values()])
-        scores[idx] /= supports[idx] if supports[idx] > 0 else 1.0
-
-    labels = np.asarray(labels)
+    if isinstance(label_counts, dict):
+        label_counts = LabelCounts.from_dict(label_counts)
+
+    ref_codes, inverse = np.unique(label_counts.ref_codes,
+                                   return_inverse=True)
+    labels = np.asarray(REF_LABELS.decode(ref_codes))
+    supports = np.bincount(inverse, label_counts.supports,
+                           minlength=len(ref_codes))
+    scores = np.bincount(inverse, label_counts.counts,
+                         minlength=len(ref_codes))
+    scores /= np.where(supports > 0, supports, 1.0)
+
     if sort:
         sidx = np.argsort(supports)[::-1]
         labels, scores, supports = labels[sidx], scores[sidx], supports[sidx]
@@ -382,9 +899,23 @@ def macro_average(label_counts, sort=True, min_support=0):
     return labels[midx].tolist(), scores[midx], supports[midx]
 
 
-def tally_scores(ref_annots, est_annots, min_support, metrics=None):
+def _tally_shard(ref_annots, est_annots, metrics):
+    """Score and reduce one shard of annotation pairs."""
+    alignment = align_annotations(ref_annots, est_annots)
+    scores, supports = score_annotations(
+        ref_annots, est_annots, metrics, alignment)
+    label_counts = reduce_annotations(
+        ref_annots, est_annots, metrics, alignment)
+    return scores, supports, label_counts
+
+
+def tally_scores(ref_annots, est_annots, min_support, metrics=None,
+                 num_cpus=1):
     """Produce cumulative statistics over a paired set of annotations.
 
+    With several CPUs, annotation pairs are split into one shard per process;
+    the scores of each are concatenated, and their label counts summed.
+
     Parameters
     ----------
     ref_annots : list, len=n
@@ -395,6 +926,8 @@ def tally_scores(ref_annots, est_annots, min_support, metrics=None):
         Minimum support value for macro-quality measure.
     metrics : list, len=k, default=all
         Metric names to compute overall scores.
+    num_cpus : int, default=1
+        Number of processes across which to split the annotations.
 
     Returns
     -------
@@ -404,7 +937,43 @@ def tally_scores(ref_annots, est_annots, min_support, metrics=None):
     if metrics is None:
         metrics = COMPARISONS.keys()
 
-    scores, supports = score_annotations(ref_annots, est_annots, metrics)
+    if num_cpus == 1:
+        shards = [_tally_shard(ref_annots, est_annots, metrics)]
+    else:
+        bounds = np.linspace(0, len(ref_annots), num_cpus + 1).astype(int)
+        pool = Parallel(n_jobs=num_cpus)
+        shards = pool(delayed(_tally_shard)(ref_annots[start:end],
+                                            est_annots[start:end], metrics)
+                      for start, end in zip(bounds[:-1], bounds[1:]))
+
+    scores = np.concatenate([shard[0] for shard in shards])
+    supports = np.concatenate([shard[1] for shard in shards])
+    label_counts = dict([(m, sum([shard[2][m] for shard in shards],
+                                 LabelCounts()))
+                         for m in metrics])
+    return summarize_scores(scores, supports, label_counts, metrics,
+                            min_support)
+
+
+def summarize_scores(scores, supports, label_counts, metrics, min_support):
+    """Collapse annotation-wise scores and label counts to statistics.
+
+    Parameters
+    ----------
+    scores, supports : np.ndarray, shape=(n, k)
+        Annotation-wise scores and supports; see `score_annotations`.
+    label_counts : dict of LabelCounts
+        Label counts of each metric; see `reduce_annotations`.
+    metrics : list, len=k
+        Metric names corresponding to the columns of `scores`.
+    min_support : scalar
+        Minimum support value for macro-quality measure.
+
+    Returns
+    -------
+    results : dict
+        Score dictionary of {statistic, metric, value} results.
+    """
     scores_macro = scores.mean(axis=0)
     scores_micro = (supports * scores).sum(axis=0) / supports.sum(axis=0)
 
@@ -413,9 +982,76 @@ def tally_scores(ref_annots, est_annots, min_support, metrics=None):
         results['macro'][m] = smac
         results['micro'][m] = smic
 
-    label_counts = reduce_annotations(ref_annots, est_annots, metrics)
     for m in metrics:
         quality_scores = macro_average(
             label_counts[m], sort=True, min_support=min_support)[1]
         results['macro_quality'][m] = quality_scores.mean()
     return results
+
+
+def bootstrap_scores(scores, supports, num_resamples=1000, seed=None):
+    """Resample tracks with replacement, collapsing each resample to macro
+    and micro scores.
+
+    All resamples are drawn at once, as an (r, n) matrix counting how often
+    each track is drawn, such that the statistics of every resample reduce to
+    a matrix product with the track-wise scores; memory grows as `r * n`.
+
+    Parameters
+    ----------
+    scores, supports : np.ndarray, shape=(n, k)
+        Annotation-wise scores and supports; see `score_annotations`.
+    num_resamples : int, default=1000
+        Number of bootstrap resamples, r.
+    seed : int, default=None
+        Seed for the random number generator.
+
+    Returns
+    -------
+    scores_macro, scores_micro : np.ndarray, shape=(r, k)
+        Macro- and micro-averaged scores of each resample.
+    """
+    scores = np.asarray(scores, dtype=float)
+    supports = np.asarray(supports, dtype=float)
+    num_tracks = len(scores)
+    rng = np.random.RandomState(seed)
+    counts = rng.multinomial(num_tracks, np.ones(num_tracks) / num_tracks,
+                             size=num_resamples).astype(float)
+
+    scores_macro = np.dot(counts, scores) / float(num_tracks)
+    scalar = np.dot(counts, supports)
+    scores_micro = np.dot(counts, supports * scores) / np.where(
+        scalar == 0, 1.0, scalar)
+    return scores_macro, scores_micro
+
+
+def bootstrap_intervals(scores, supports, metrics, num_resamples=1000,
+                        confidence=0.95, seed=None):
+    """Compute bootstrap confidence intervals of macro and micro scores.
+
+    Parameters
+    ----------
+    scores, supports : np.ndarray, shape=(n, k)
+        Annotation-wise scores and supports; see `score_annotations`.
+    metrics : list, len=k
+        Metric names corresponding to the columns of `scores`.
+    num_resamples : int, default=1000
+        Number of bootstrap resamples.
+    confidence : scalar, default=0.95
+        Coverage of the (percentile) intervals, in (0, 1).
+    seed : int, default=None
+        Seed for the random number generator.
+
+    Returns
+    -------
+    results : dict
+        Score dictionary of {statistic, metric, [lower, upper]} results.
+    """
+    alpha = 50.0 * (1.0 - confidence)
+    results = dict()
+    for stat, resampled in zip(['macro', 'micro'], bootstrap_scores(
+            scores, supports, num_resamples, seed)):
+        bounds = np.percentile(resampled, [alpha, 100.0 - alpha], axis=0)
+        results[stat] = dict([(m, bounds[:, k].tolist())
+                              for k, m in enumerate(metrics)])
+    return results
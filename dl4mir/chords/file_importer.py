@@ -10,6 +10,7 @@ from os import path
 import time
 
 import dl4mir.common.fileutil as futils
+from dl4mir.chords import label_codes
 
 # fold / split
 FILE_FMT = "%s/%s.hdf5"
@@ -32,7 +33,8 @@ def create_chord_entity(npz_file, jams_file, dtype=np.float32):
     Returns
     -------
     entity: biggie.Entity
-        Populated chord entity, with {cqt, chord_labels, *time_points}.
+        Populated chord entity, with {cqt, chord_labels, *time_points,
+        *_codes}; see `label_codes`.
     """
     entity = biggie.Entity(**np.load(npz_file))
     jam = pyjams.load(jams_file)
@@ -41,7 +43,7 @@ def create_chord_entity(npz_file, jams_file, dtype=np.float32):
     entity.chord_labels = mir_eval.util.interpolate_intervals(
         intervals, labels, entity.time_points, fill_value='N')
     entity.cqt = entity.cqt.astype(dtype)
-    return entity
+    return label_codes.add_label_codes(entity)
 
 
 def populate_stash(keys, cqt_directory, jams_directory, stash,
@@ -0,0 +1,150 @@
+"""Integer codes of chord labels, computed once at import time.
+
+Chord entities store `chord_labels` as strings, which the mappers otherwise
+turn back into class indices (through a lexicon) or chroma (through mir_eval)
+for every sample. The importers therefore also store, for every frame:
+
+  * v{25,61,157}_codes : int16 class index under `lex.Strict(vocab_dim)`,
+    or -1 where the label has no class;
+  * chroma_codes : int16 bitmask of the chord's pitch classes, with bit `n`
+    set for pitch class `n`, or -1 where undefined.
+
+Being named '*_codes', these are carried through to windowed samples by the
+slicing functions (see `util.slice_codes`), and the mappers use them
+whenever present, falling back to the labels otherwise.
+"""
+
+import numpy as np
+
+import dl4mir.chords.labels as L
+import dl4mir.chords.lexicon as lex
+from dl4mir.common import util
+
+VOCAB_DIMS = (25, 61, 157)
+CLASS_FIELD_FMT = "v{0}" + util.CODE_SUFFIX
+CHROMA_FIELD = "chroma" + util.CODE_SUFFIX
+CODE_DTYPE = np.int16
+NO_CODE = -1
+
+
+def _encode(chord_labels, label_encoder):
+    """Apply a function from unique labels to codes over an array of labels,
+    preserving its shape."""
+    chord_labels = np.asarray(chord_labels)
+    unique_labels, inverse = np.unique(chord_labels, return_inverse=True)
+    codes = np.array(label_encoder([str(l) for l in unique_labels]),
+                     dtype=CODE_DTYPE)
+    return codes[inverse].reshape(chord_labels.shape)
+
+
+def class_codes(chord_labels, vocab_dim):
+    """Encode chord labels as class indices of a strict vocabulary.
+
+    Parameters
+    ----------
+    chord_labels : array_like of str
+        Chord labels, of any shape.
+    vocab_dim : int
+        Size of the vocabulary; one of VOCAB_DIMS.
+
+    Returns
+    -------
+    codes : np.ndarray of int16, shape=chord_labels.shape
+        Class index of each label, or NO_CODE if undefined.
+    """
+    vocab = lex.Strict(vocab_dim)
+
+    def encoder(labels):
+        return [NO_CODE if idx is None else idx
+                for idx in vocab.label_to_index(labels)]
+    return _encode(chord_labels, encoder)
+
+
+def chroma_codes(chord_labels):
+    """Encode chord labels as pitch class bitmasks.
+
+    Parameters
+    ----------
+    chord_labels : array_like of str
+        Chord labels, of any shape.
+
+    Returns
+    -------
+    codes : np.ndarray of int16, shape=chord_labels.shape
+        Bitmask of the pitch classes of each chord, or NO_CODE if undefined.
+    """
+    def encoder(labels):
+        chroma = L.chord_label_to_chroma(labels)
+        codes = np.dot(chroma > 0, 2 ** np.arange(12))
+        codes[(chroma < 0).any(axis=1)] = NO_CODE
+        return codes
+    return _encode(chord_labels, encoder)
+
+
+def decode_chroma(codes, bins_per_pitch=1):
+    """Expand chroma codes to chroma vectors, as `L.chord_label_to_chroma`.
+
+    Parameters
+    ----------
+    codes : array_like of ints
+        Chroma codes, of any shape.
+    bins_per_pitch : int, default=1
+        Number of bins per pitch class in the output.
+
+    Returns
+    -------
+    chroma : np.ndarray, shape=codes.shape + (12*bins_per_pitch,)
+        Chroma vectors; rows of undefined codes are filled with -1.
+    """
+    codes = np.asarray(codes, dtype=int)[..., np.newaxis]
+    chroma = np.zeros(codes.shape[:-1] + (12 * bins_per_pitch,))
+    chroma[..., ::bins_per_pitch] = (codes >> np.arange(12)) & 1
+    chroma[(codes < 0)[..., 0]] = -1
+    return chroma
+
+
+def add_label_codes(entity, vocab_dims=VOCAB_DIMS):
+    """Add the label code fields to a chord entity, in place.
+
+    Parameters
+    ----------
+    entity : biggie.Entity
+        Chord entity, with at least a `chord_labels` field.
+    vocab_dims : list of ints
+        Vocabularies for which to store class codes.
+
+    Returns
+    -------
+    entity : biggie.Entity
+        The same entity, with the code fields set.
+    """
+    for vocab_dim in vocab_dims:
+        setattr(entity, CLASS_FIELD_FMT.format(vocab_dim),
+                class_codes(entity.chord_labels, vocab_dim))
+    setattr(entity, CHROMA_FIELD, chroma_codes(entity.chord_labels))
+    return entity
+
+
+def lexicon_codes(entity, lexicon):
+    """Return the stored class codes of an entity under a lexicon, if any.
+
+    Parameters
+    ----------
+    entity : biggie.Entity
+        Chord entity or sample, which may have class code fields.
+    lexicon : lex.Lexicon
+        Lexicon the codes should index into.
+
+    Returns
+    -------
+    codes : int, np.ndarray, or None
+        For a single sample, the class index, or None if undefined; for an
+        entity, its array of codes, with NO_CODE where undefined. None if the
+        entity has no codes for this lexicon.
+    """
+    if type(lexicon) is not lex.Strict or lexicon.vocab_dim not in VOCAB_DIMS:
+        return None
+    codes = getattr(entity, CLASS_FIELD_FMT.format(lexicon.vocab_dim), None)
+    if codes is None or np.ndim(codes):
+        return codes
+    return None if codes < 0 else int(codes)
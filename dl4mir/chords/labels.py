@@ -2,7 +2,7 @@ import mir_eval
 import json
 import os
 import numpy as np
-import dl4mir.common.util as util
+import dl4mir.common.segment as segment
 
 
 ROOTS = ['C', 'C#', 'D', 'Eb', 'E', 'F', 'F#', 'G', 'Ab', 'A', 'Bb', 'B']
@@ -217,14 +217,7 @@ def compress_labeled_intervals(intervals, labels):
     labels : list, len=N
         Labels corresponding to the given time intervals.
     """
-    intervals = np.asarray(intervals)
-    new_labels, new_intervals = list(), list()
-    idx = 0
-    for label, step in util.run_length_encode(labels):
-        new_labels.append(label)
-        new_intervals.append([intervals[idx, 0], intervals[idx + step - 1, 1]])
-        idx += step
-    return np.asarray(new_intervals), new_labels
+    return segment.compress_labeled_intervals(intervals, labels)
 
 
 def load_labeled_intervals(label_file, compress=True):
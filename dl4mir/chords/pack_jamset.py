@@ -0,0 +1,33 @@
+"""Convert a JSON JAMSet to a packed, columnar JAMSet for fast scoring.
+
+Example Call:
+
+$ python dl4mir/chords/pack_jamset.py \
+references.jamset \
+references.jamz
+"""
+import argparse
+import os
+import time
+
+from dl4mir.common import jams_utils
+import dl4mir.common.fileutil as futil
+
+
+def main(args):
+    print "[{0}] Loading {1}".format(time.asctime(), args.jamset_file)
+    jamset = jams_utils.load_jamset(args.jamset_file)
+    futil.create_directory(os.path.split(args.output_file)[0])
+    jams_utils.pack_jamset(jamset, args.output_file)
+    print "[{0}] Saved {1}".format(time.asctime(), args.output_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("jamset_file",
+                        metavar="jamset_file", type=str,
+                        help="Path to a JSON JAMSet.")
+    parser.add_argument("output_file",
+                        metavar="output_file", type=str,
+                        help="Path for the packed JAMSet (*.jamz).")
+    main(parser.parse_args())
@@ -1,5 +1,6 @@
 import numpy as np
 from dl4mir.chords import labels
+from dl4mir.chords import label_codes
 
 import biggie
 
@@ -8,19 +9,29 @@ import dl4mir.common.util as util
 from scipy.spatial.distance import cdist
 
 
+def _shift_label(chord_label, pitch_shift):
+    """Transpose a chord label by a number of semitones; labels without a
+    harmonic root (no-chord, skip) are returned unchanged."""
+    if chord_label in [labels.NO_CHORD, labels.SKIP_CHORD]:
+        return chord_label
+    root, quality, exts, bass = labels.split(chord_label)
+    root = (labels.pitch_class_to_semitone(root) + pitch_shift) % 12
+    new_root = labels.semitone_to_pitch_class(root)
+    return labels.join(new_root, quality, exts, bass)
+
+
+def _drop_codes(values):
+    """Remove label codes from entity values, as they no longer match a
+    shifted chord label; mappers then fall back to the label itself."""
+    return dict([(key, value) for key, value in values.items()
+                 if not key.endswith(util.CODE_SUFFIX)])
+
+
 def _circshift(entity, pitch_shift, bins_per_pitch):
-    values = entity.values()
+    values = _drop_codes(entity.values())
     data, chord_label = values.pop('data'), str(values.pop('chord_label'))
 
-    # Change the chord label if it has a harmonic root.
-    if chord_label not in [labels.NO_CHORD, labels.SKIP_CHORD]:
-        root, quality, exts, bass = labels.split(chord_label)
-        root = (labels.pitch_class_to_semitone(root) + pitch_shift) % 12
-        new_root = labels.semitone_to_pitch_class(root)
-        new_label = labels.join(new_root, quality, exts, bass)
-        # print "Input %12s // Shift: %3s // Output %12s" % \
-        #     (chord_label, pitch_shift, new_label)
-        chord_label = new_label
+    chord_label = _shift_label(chord_label, pitch_shift)
 
     # Always rotate the CQT.
     data = util.circshift(data, 0, pitch_shift)
@@ -32,18 +43,10 @@ def _padshift(entity, pitch_shift, bins_per_pitch, fill_value=0.0):
     entity : Entity
         CQT entity to shift; must have fields {data, chord_label}.
     """
-    values = entity.values()
+    values = _drop_codes(entity.values())
     data, chord_label = values.pop('data'), str(values.pop('chord_label'))
 
-    # Change the chord label if it has a harmonic root.
-    if chord_label not in [labels.NO_CHORD, labels.SKIP_CHORD]:
-        root, quality, exts, bass = labels.split(chord_label)
-        root = (labels.pitch_class_to_semitone(root) + pitch_shift) % 12
-        new_root = labels.semitone_to_pitch_class(root)
-        new_label = labels.join(new_root, quality, exts, bass)
-        # print "Input %12s // Shift: %3s // Output %12s" % \
-        #     (chord_label, pitch_shift, new_label)
-        chord_label = new_label
+    chord_label = _shift_label(chord_label, pitch_shift)
 
     # Always rotate the CQT.
     bin_shift = pitch_shift*bins_per_pitch
@@ -77,6 +80,126 @@ def pitch_shift_chroma(stream, max_pitch_shift=12):
         yield _circshift(entity, shift, 1)
 
 
+def pitch_shift_table(lexicon):
+    """Tabulate the class index of every chord class under every pitch shift.
+
+    Parameters
+    ----------
+    lexicon : lex.Lexicon
+        Lexicon mapping class indices to chord labels, and back.
+
+    Returns
+    -------
+    table : np.ndarray, shape=(lexicon.num_classes, 12)
+        Class index of each class (row) when shifted by `n` semitones
+        (column `n % 12`), or -1 if the shifted chord has no class.
+    """
+    table = np.zeros([lexicon.num_classes, 12], dtype=np.int32) - 1
+    for class_idx in range(lexicon.num_classes):
+        chord_label = str(lexicon.index_to_label(class_idx))
+        for shift in range(12):
+            new_idx = lexicon.label_to_index(_shift_label(chord_label, shift))
+            if new_idx is not None:
+                table[class_idx, shift] = new_idx
+    return table
+
+
+def shift_batch(data, bin_shifts, circular=False, fill_value=0.0):
+    """Shift each array of a batch along its last axis, with a single gather.
+
+    Parameters
+    ----------
+    data : np.ndarray, shape=(batch_size, ..., num_bins)
+        Batch of arrays, e.g. CQT windows shaped (B, C, W, F).
+    bin_shifts : array_like of ints, shape=(batch_size,)
+        Number of bins to shift each array by, upward if positive.
+    circular : bool, default=False
+        If True, rotate the bins, as `util.circshift`; otherwise, translate
+        them and fill the vacated bins, as `util.translate`.
+    fill_value : scalar, default=0.0
+        Value of vacated bins, for non-circular shifts.
+
+    Returns
+    -------
+    shifted : np.ndarray, shape=data.shape
+        The shifted arrays.
+    """
+    num_bins = data.shape[-1]
+    index_shape = [len(data)] + [1] * (data.ndim - 2) + [num_bins]
+    src_idx = (np.arange(num_bins)[np.newaxis, :] -
+               np.asarray(bin_shifts, dtype=int)[:, np.newaxis])
+    src_idx = src_idx.reshape(index_shape)
+    # Open index grids over the leading axes, broadcasting against the
+    #   source bins of each array.
+    grids = [np.arange(n).reshape([-1] + [1] * (data.ndim - 1 - axis))
+             for axis, n in enumerate(data.shape[:-1])]
+    if circular:
+        return data[tuple(grids + [src_idx % num_bins])]
+
+    shifted = data[tuple(grids + [np.clip(src_idx, 0, num_bins - 1)])]
+    np.copyto(shifted, fill_value,
+              where=(src_idx < 0) | (src_idx >= num_bins))
+    return shifted
+
+
+def pitch_shift_batches(stream, shift_table, max_pitch_shift=6,
+                        bins_per_pitch=3, circular=False, data_key='data',
+                        label_key='class_idx', fill_value=0.0):
+    """Apply a random pitch shift to each sample of a stream of batches.
+
+    The batch counterpart of `pitch_shift_cqt` (translation) and
+    `pitch_shift_chroma` (circular, with `bins_per_pitch=1`), operating on
+    class indices rather than chord labels.
+
+    Parameters
+    ----------
+    stream : iterable
+        Stream of batches, as dicts of arrays.
+    shift_table : np.ndarray, shape=(num_classes, 12)
+        Class index of each class under each shift; see `pitch_shift_table`.
+    max_pitch_shift : int, default=6
+        Shifts are drawn uniformly from [-max_pitch_shift, max_pitch_shift).
+    bins_per_pitch : int, default=3
+        Number of bins per semitone along the last axis of the data.
+    circular : bool, default=False
+        Rotate, rather than translate, the data; see `shift_batch`.
+    data_key, label_key : str
+        Keys of the data and class indices in each batch.
+    fill_value : scalar, default=0.0
+        Value of vacated bins, for non-circular shifts.
+
+    Yields
+    ------
+    batch : dict of np.ndarrays
+        Batch with shifted data and class indices; other fields are passed
+        through as-is. Samples whose shifted chord has no class are dropped,
+        as `map_to_class_index` drops them sample-wise, and None is yielded
+        if none remain.
+    """
+    for batch in stream:
+        if batch is None:
+            yield batch
+            continue
+        batch = dict(batch)
+        class_idx = np.asarray(batch[label_key])
+        shifts = np.random.randint(low=-max_pitch_shift,
+                                   high=max_pitch_shift, size=len(class_idx))
+        new_idx = shift_table[class_idx, shifts % 12]
+        valid = new_idx >= 0
+        if not valid.all():
+            if not valid.any():
+                yield None
+                continue
+            batch = dict([(key, value[valid] if np.shape(value)[:1] ==
+                           (len(class_idx),) else value)
+                          for key, value in batch.items()])
+            shifts, new_idx = shifts[valid], new_idx[valid]
+        batch[data_key] = shift_batch(
+            batch[data_key], shifts * bins_per_pitch, circular, fill_value)
+        batch[label_key] = new_idx.astype(class_idx.dtype)
+        yield batch
+
+
 def map_to_class_index(stream, index_mapper, *args, **kwargs):
     """
     vocab_dim: int
@@ -130,7 +253,11 @@ def map_to_chroma(stream, bins_per_pitch=1):
             continue
         values = entity.values()
         data, chord_label = values.pop('data'), str(values.pop('chord_label'))
-        chroma = labels.chord_label_to_chroma(chord_label, bins_per_pitch)
+        if label_codes.CHROMA_FIELD in values:
+            chroma = label_codes.decode_chroma(
+                values[label_codes.CHROMA_FIELD], bins_per_pitch)
+        else:
+            chroma = labels.chord_label_to_chroma(chord_label, bins_per_pitch)
         if (chroma < 0).any():
             yield None
         yield biggie.Entity(data=data, target=chroma)
@@ -2,6 +2,7 @@
 
 import argparse
 import dl4mir.common.fileutil as futils
+from dl4mir.chords import label_codes
 import mir_eval
 import dl4mir.chords.labels as L
 import numpy as np
@@ -30,7 +31,8 @@ def create_chord_entity(npz_file, lab_files, dtype=np.float32):
     Returns
     -------
     entity: biggie.Entity
-        Populated chord entity, with {cqt, chord_labels, time_points}.
+        Populated chord entity, with {cqt, chord_labels, time_points,
+        *_codes}; see `label_codes`.
     """
     entity = biggie.Entity(**np.load(npz_file))
     chord_labels = []
@@ -42,7 +44,7 @@ def create_chord_entity(npz_file, lab_files, dtype=np.float32):
 
     entity.chord_labels = np.array(chord_labels).T
     entity.cqt = entity.cqt.astype(dtype)
-    return entity
+    return label_codes.add_label_codes(entity)
 
 
 def populate_stash(keys, cqt_directory, lab_directory, stash,
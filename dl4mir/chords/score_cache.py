@@ -0,0 +1,179 @@
+"""Persistent, content-addressed cache of annotation-wise chord scores.
+
+Scores are stored in an SQLite file under the hashes of the reference and
+estimated annotations and the name of the metric, such that re-running an
+evaluation sweep only scores the (reference, estimate, metric) triples it
+hasn't seen before, regardless of which file an estimate came from.
+
+Example
+-------
+>>> cache = ScoreCache("scores.sqlite")
+>>> results = tally_scores(ref_annots, est_annots, 60.0, METRICS, cache)
+>>> cache.stats()
+{'hits': 1200, 'misses': 0}
+"""
+
+import hashlib
+import json
+import numpy as np
+import sqlite3
+
+import dl4mir.chords.evaluate as EVAL
+
+
+def annotation_hash(annot):
+    """Return a hex digest of the labeled intervals of a chord annotation.
+
+    Parameters
+    ----------
+    annot : pyjams.RangeAnnotation, or tuple
+        Range Annotation, or an (intervals, labels) pair.
+
+    Returns
+    -------
+    digest : str
+        SHA-1 digest of the intervals and labels.
+    """
+    intervals, labels = EVAL.annotation_to_labeled_intervals(annot)
+    digest = hashlib.sha1(np.asarray(intervals, dtype=float).tostring())
+    digest.update("\n".join([str(l) for l in labels]))
+    return digest.hexdigest()
+
+
+class ScoreCache(object):
+    """Scores of (reference, estimate, metric) triples, backed by SQLite.
+
+    The cache may be shared by several processes; each opens its own
+    connection, and pickles by path.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the SQLite database; created if it doesn't exist.
+    timeout : scalar, default=60.0
+        Seconds to wait for a lock held by another process.
+    """
+    def __init__(self, filepath, timeout=60.0):
+        self.filepath = filepath
+        self.timeout = timeout
+        self._conn = sqlite3.connect(filepath, timeout=timeout)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS scores (ref TEXT, est TEXT, "
+                "metric TEXT, value TEXT, PRIMARY KEY (ref, est, metric))")
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        return dict(filepath=self.filepath, timeout=self.timeout)
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def get(self, ref_hash, est_hash, metric):
+        """Return the cached value of a triple, or None if missing."""
+        row = self._conn.execute(
+            "SELECT value FROM scores WHERE ref=? AND est=? AND metric=?",
+            (ref_hash, est_hash, metric)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, entries):
+        """Store a collection of (ref_hash, est_hash, metric, value) entries.
+        """
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)",
+                [(r, e, m, json.dumps(v)) for r, e, m, v in entries])
+
+    def stats(self):
+        """Return the number of lookups that hit and missed the cache."""
+        return dict(hits=self.hits, misses=self.misses)
+
+    def close(self):
+        self._conn.close()
+
+
+def _score_pairs(ref_annots, est_annots, metrics):
+    """Score a set of annotation pairs, as cacheable values per metric."""
+    alignment = EVAL.align_annotations(ref_annots, est_annots)
+    scores, supports = EVAL.score_annotations(
+        ref_annots, est_annots, metrics, alignment)
+    durations, ref_codes, est_codes, offsets = alignment
+    ref_codes, est_codes = EVAL.transpose_label_codes(ref_codes, est_codes)
+
+    values = []
+    for n, (start, end) in enumerate(zip(offsets[:-1], offsets[1:])):
+        ref_labels = EVAL.REF_LABELS.decode(ref_codes[start:end])
+        est_labels = EVAL.EST_LABELS.decode(est_codes[start:end])
+        values.append([])
+        for k, metric in enumerate(metrics):
+            label_counts = EVAL.pairwise_reduce_labels(
+                ref_labels, est_labels, durations[start:end],
+                EVAL.COMPARISONS[metric])
+            counts = zip(EVAL.REF_LABELS.decode(label_counts.ref_codes),
+                         EVAL.EST_LABELS.decode(label_counts.est_codes),
+                         label_counts.counts.tolist(),
+                         label_counts.supports.tolist())
+            values[-1].append(dict(score=scores[n, k],
+                                   support=supports[n, k], counts=counts))
+    return values
+
+
+def tally_scores(ref_annots, est_annots, min_support, metrics, cache):
+    """Produce cumulative statistics over annotation pairs, through a cache.
+
+    Equivalent to `evaluate.tally_scores`, but only pairs with a metric
+    missing from the cache are aligned and scored, and their results stored.
+
+    Parameters
+    ----------
+    ref_annots : list, len=n
+        Reference annotations, or (intervals, labels) pairs.
+    est_annots : list, len=n
+        Estimated annotations, or (intervals, labels) pairs.
+    min_support : scalar
+        Minimum support value for macro-quality measure.
+    metrics : list, len=k
+        Metric names to compute overall scores.
+    cache : ScoreCache
+        Cache of previously computed scores.
+
+    Returns
+    -------
+    results : dict
+        Score dictionary of {statistic, metric, value} results.
+    """
+    hashes = [(annotation_hash(r), annotation_hash(e))
+              for r, e in zip(ref_annots, est_annots)]
+    values = [[cache.get(ref_hash, est_hash, m) for m in metrics]
+              for ref_hash, est_hash in hashes]
+
+    missing = [n for n, v in enumerate(values) if None in v]
+    if missing:
+        new_values = _score_pairs([ref_annots[n] for n in missing],
+                                  [est_annots[n] for n in missing], metrics)
+        entries = []
+        for n, pair_values in zip(missing, new_values):
+            values[n] = pair_values
+            entries.extend([hashes[n] + (m, v)
+                            for m, v in zip(metrics, pair_values)])
+        cache.put(entries)
+
+    scores, supports = np.zeros([2, len(values), len(metrics)])
+    entries = dict([(m, list()) for m in metrics])
+    for n, pair_values in enumerate(values):
+        for k, (metric, value) in enumerate(zip(metrics, pair_values)):
+            scores[n, k], supports[n, k] = value['score'], value['support']
+            entries[metric].extend(value['counts'])
+
+    label_counts = dict()
+    for metric in metrics:
+        columns = [[e[n] for e in entries[metric]] for n in range(4)]
+        label_counts[metric] = EVAL.LabelCounts.from_labels(*columns)
+
+    return EVAL.summarize_scores(scores, supports, label_counts, metrics,
+                                 min_support)
@@ -1,37 +1,88 @@
 import argparse
 import json
+from multiprocessing import Pool, cpu_count
 import os
-from sklearn.externals.joblib import Parallel, delayed
 import time
 
 import dl4mir.common.fileutil as futil
 
-from dl4mir.common import jams_util
+from dl4mir.common import jams_utils
 import dl4mir.chords.evaluate as EVAL
+from dl4mir.chords import score_cache
 
 
 METRICS = EVAL.COMPARISONS.keys()
 METRICS_ENUM = dict([(k, i) for i, k in enumerate(METRICS)])
 
+# Per-process reference annotations and scoring arguments, set once by
+#   `_init_worker` so that tasks only carry an estimation filepath.
+_WORKER_ARGS = dict()
 
-def score_one(ref_jamset, jamset_file, min_support):
-    est_jamset = jams_util.load_jamset(jamset_file)
+
+def _init_worker(ref_file, min_support, cache_file):
+    _WORKER_ARGS.update(ref_jamset=jams_utils.open_jamset(ref_file),
+                        ref_annots=dict(), min_support=min_support,
+                        cache_file=cache_file)
+
+
+def _ref_annot(key):
+    """Return the labeled intervals of a reference key, loading them once."""
+    ref_annots = _WORKER_ARGS['ref_annots']
+    if key not in ref_annots:
+        ref_annots[key] = jams_utils.chord_labeled_intervals(
+            _WORKER_ARGS['ref_jamset'], key)
+    return ref_annots[key]
+
+
+def score_one(jamset_file):
+    est_jamset = jams_utils.open_jamset(jamset_file)
     keys = est_jamset.keys()
     keys.sort()
 
-    ref_annots = [ref_jamset[k].chord[0] for k in keys]
-    est_annots = [est_jamset[k].chord[0] for k in keys]
+    ref_annots = [_ref_annot(k) for k in keys]
+    est_annots = [jams_utils.chord_labeled_intervals(est_jamset, k)
+                  for k in keys]
     print "[{0}] {1}".format(time.asctime(), jamset_file)
-    return EVAL.tally_scores(ref_annots, est_annots, METRICS)
+    min_support = _WORKER_ARGS['min_support']
+    cache_file = _WORKER_ARGS['cache_file']
+    if not cache_file:
+        return EVAL.tally_scores(ref_annots, est_annots, min_support, METRICS)
+
+    cache = score_cache.ScoreCache(cache_file)
+    results = score_cache.tally_scores(
+        ref_annots, est_annots, min_support, METRICS, cache)
+    cache.close()
+    print "[{0}] {1} - cache {2}".format(
+        time.asctime(), jamset_file, cache.stats())
+    return results
 
 
 def main(args):
-    ref_jamset = jams_util.load_jamset(args.ref_jamset)
     jamset_files = futil.load_textlist(args.jamset_textlist)
+    if args.cache_file:
+        futil.create_directory(os.path.split(args.cache_file)[0])
 
-    pool = Parallel(n_jobs=args.num_cpus)
-    fx = delayed(score_one)
-    results = pool(fx(ref_jamset, f, args.min_support) for f in jamset_files)
+    # Each worker opens the reference once, rather than receiving a copy of
+    #   it with every task.
+    init_args = (args.ref_jamset, args.min_support, args.cache_file)
+    # As joblib's n_jobs: -1 is all CPUs, -2 all but one, and so on; zero
+    #   is taken to mean all CPUs as well.
+    num_cpus = args.num_cpus
+    if num_cpus < 0:
+        num_cpus = max(cpu_count() + 1 + num_cpus, 1)
+    elif num_cpus == 0:
+        num_cpus = cpu_count()
+    if num_cpus == 1:
+        _init_worker(*init_args)
+        results = map(score_one, jamset_files)
+    else:
+        pool = Pool(processes=num_cpus, initializer=_init_worker,
+                    initargs=init_args)
+        try:
+            results = pool.map(score_one, jamset_files, chunksize=1)
+        finally:
+            pool.terminate()
+            pool.join()
 
     results = {f: r for f, r in zip(jamset_files, results)}
     output_dir = os.path.split(args.output_file)[0]
@@ -60,5 +111,10 @@ if __name__ == "__main__":
                         help="Minimum label duration for macro-quality stats.")
     parser.add_argument("--num_cpus",
                         metavar="--num_cpus", type=int, default=8,
-                        help="Number of CPUs to use.")
+                        help="Number of CPUs to use; -1 for all, -2 for "
+                        "all but one, and so on.")
+    parser.add_argument("--cache_file",
+                        metavar="--cache_file", type=str, default='',
+                        help="Optional SQLite file for caching scores across "
+                        "runs.")
     main(parser.parse_args())
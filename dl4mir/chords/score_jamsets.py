@@ -3,7 +3,7 @@ import json
 import os
 import tabulate
 
-from dl4mir.common import jams_util
+from dl4mir.common import jams_utils
 import dl4mir.common.fileutil as futil
 import dl4mir.chords.evaluate as EVAL
 
@@ -13,15 +13,19 @@ METRICS_ENUM = dict([(k, i) for i, k in enumerate(METRICS)])
 
 
 def main(args):
-    ref_jamset = jams_util.load_jamset(args.ref_jamset)
-    est_jamset = jams_util.load_jamset(args.est_jamset)
+    ref_jamset = jams_utils.open_jamset(args.ref_jamset)
+    est_jamset = jams_utils.open_jamset(args.est_jamset)
     keys = est_jamset.keys()
     keys.sort()
 
-    ref_annots = [ref_jamset[k].chord[0] for k in keys]
-    est_annots = [est_jamset[k].chord[0] for k in keys]
+    ref_annots = [jams_utils.chord_labeled_intervals(ref_jamset, k)
+                  for k in keys]
+    est_annots = [jams_utils.chord_labeled_intervals(est_jamset, k)
+                  for k in keys]
 
-    scores, supports = EVAL.score_annotations(ref_annots, est_annots, METRICS)
+    alignment = EVAL.align_annotations(ref_annots, est_annots)
+    scores, supports = EVAL.score_annotations(
+        ref_annots, est_annots, METRICS, alignment)
     results = dict(metrics=METRICS,
                    score_annotations=(scores.tolist(), supports.tolist()))
     scores_macro = scores.mean(axis=0)
@@ -33,7 +37,17 @@ def main(args):
         [['macro'] + scores_macro.tolist(), ['micro'] + scores_micro.tolist()],
         headers=[''] + METRICS)
 
-    label_counts = EVAL.reduce_annotations(ref_annots, est_annots, METRICS)
+    if args.num_resamples:
+        intervals = EVAL.bootstrap_intervals(
+            scores, supports, METRICS, args.num_resamples, args.confidence)
+        results.update(bootstrap=intervals)
+        print tabulate.tabulate(
+            [[s] + ["[{0:0.3}, {1:0.3}]".format(*intervals[s][m])
+                    for m in METRICS] for s in ['macro', 'micro']],
+            headers=[''] + METRICS)
+
+    label_counts = EVAL.reduce_annotations(
+        ref_annots, est_annots, METRICS, alignment)
 
     mac_aves = []
     for m in METRICS:
@@ -67,4 +81,11 @@ if __name__ == "__main__":
     parser.add_argument("--min_support",
                         metavar="--min_support", type=float, default=0.0,
                         help="Minimum label duration for macro-quality stats.")
+    parser.add_argument("--num_resamples",
+                        metavar="--num_resamples", type=int, default=1000,
+                        help="Number of bootstrap resamples over tracks for "
+                        "confidence intervals; skipped if 0.")
+    parser.add_argument("--confidence",
+                        metavar="--confidence", type=float, default=0.95,
+                        help="Coverage of the bootstrap intervals.")
     main(parser.parse_args())
@@ -0,0 +1,120 @@
+"""Score posterior stashes frame-wise against their chord labels.
+
+A fast alternative to decoding to JAMS and scoring intervals, intended for
+checkpoint selection: posteriors are argmax- or Viterbi-decoded to class
+indices, and compared frame by frame to the `chord_labels` of each entity.
+
+Example Call:
+
+$ python dl4mir/chords/score_posteriors.py \
+path/to/posterior_filelist.txt \
+path/to/results.json \
+--config=viterbi_params.json
+"""
+
+import argparse
+import biggie
+import json
+import numpy as np
+import os
+import time
+
+import dl4mir.chords.evaluate as EVAL
+from dl4mir.chords import decode
+from dl4mir.chords.lexicon import Strict
+from dl4mir.common import fileutil as futils
+
+
+def score_posteriors(stash, vocab, penalty=None, metrics=EVAL.FRAME_METRICS,
+                     label_field='chord_labels', **viterbi_args):
+    """Decode and score a collection of posteriors, frame-wise.
+
+    Parameters
+    ----------
+    stash : dict_like
+        Dict or biggie.Stash of entities, with {posterior, `label_field`}.
+    vocab : lexicon.Lexicon
+        Map from posterior indices to labels.
+    penalty : scalar, default=None
+        Self-transition penalty for Viterbi decoding; argmax if None.
+    metrics : list, len=k, default=FRAME_METRICS
+        Metric names to compute.
+    label_field : str, default='chord_labels'
+        Name of the field holding the reference label of each frame.
+    **viterbi_args : dict
+        Other arguments to pass to the Viterbi algorithm.
+
+    Returns
+    -------
+    keys : list, len=n
+        Sorted keys of the stash.
+    scores : np.ndarray, shape=(n, k)
+        Track-wise, frame-weighted scores.
+    supports : np.ndarray, shape=(n, k)
+        Number of frames in gamut, for each score.
+    """
+    keys = sorted(stash.keys())
+    labels, indices, offsets = [], [], [0]
+    for key in keys:
+        entity = stash.get(key)
+        indices.append(decode.posterior_to_indices(
+            entity.posterior, penalty, **viterbi_args))
+        labels.extend(getattr(entity, label_field))
+        offsets.append(offsets[-1] + len(indices[-1]))
+
+    scores, supports = EVAL.score_frames(
+        labels, np.concatenate(indices + [np.zeros(0, dtype=int)]), vocab,
+        metrics, offsets)
+    return keys, scores, supports
+
+
+def summarize(scores, supports, metrics):
+    """Collapse track-wise scores to macro and micro statistics."""
+    scalar = supports.sum(axis=0)
+    scalar[scalar == 0] = 1.0
+    return dict(
+        macro=dict(zip(metrics, scores.mean(axis=0).tolist())),
+        micro=dict(zip(metrics,
+                       ((supports * scores).sum(axis=0) / scalar).tolist())))
+
+
+def main(args):
+    penalty_values = [None]
+    if args.config:
+        config = json.load(open(args.config))
+        penalty_values = [float(_) for _ in config['penalty_values']]
+
+    vocab = Strict(157)
+    results = dict()
+    for f in futils.load_textlist(args.posterior_filelist):
+        stash = biggie.Stash(f)
+        for penalty in penalty_values:
+            keys, scores, supports = score_posteriors(
+                stash, vocab, penalty, EVAL.FRAME_METRICS)
+            key = os.path.join(os.path.splitext(f)[0], str(penalty))
+            results[key] = summarize(scores, supports, EVAL.FRAME_METRICS)
+            print "[{0}] {1}: {2}".format(
+                time.asctime(), key, results[key]['micro'])
+        stash.close()
+
+    futils.create_directory(os.path.split(args.output_file)[0])
+    with open(args.output_file, 'w') as fp:
+        json.dump(results, fp, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="")
+
+    # Inputs
+    parser.add_argument("posterior_filelist",
+                        metavar="posterior_filelist", type=str,
+                        help="Textlist of posterior stashes.")
+    # Outputs
+    parser.add_argument("output_file",
+                        metavar="output_file", type=str,
+                        help="Path for saving the results as JSON.")
+    parser.add_argument("--config", default='',
+                        metavar="--config", type=str,
+                        help="Optional JSON file of Viterbi penalties; "
+                        "posteriors are argmax-decoded otherwise.")
+    main(parser.parse_args())
@@ -1,7 +1,10 @@
 import unittest
+import biggie
 import numpy as np
 import numpy.testing as nptest
 import dl4mir.chords.data as D
+import dl4mir.common.partition_index as PI
+from dl4mir.common import sampling
 
 class DataTests(unittest.TestCase):
 
@@ -34,6 +37,56 @@ class DataTests(unittest.TestCase):
             D.extract_tile(x_in, 9, 5),
             np.array([7, 8, 9, 0, 0])[:, np.newaxis])
 
+    def test_create_contrastive_batch_stream(self):
+        stash = dict(
+            a=biggie.Entity(cqt=np.arange(6.).reshape(1, 6, 1) + 0,
+                            chord_labels=['N'] * 3 + ['C:maj'] * 3),
+            b=biggie.Entity(cqt=np.arange(4.).reshape(1, 4, 1) + 100,
+                            chord_labels=['A:min'] * 4))
+        neg_probs = np.zeros([157, 157])
+        neg_probs[0, 156] = neg_probs[156, 9 + 12] = 1.0
+        neg_probs[9 + 12, 0] = 1.0
+        stream = D.create_contrastive_batch_stream(
+            stash, 1, batch_size=100, neg_probs=neg_probs, seed=4)
+        batch = next(stream)
+
+        self.assertEqual(batch['cqt'].shape, (200, 1, 1, 1))
+        nptest.assert_array_equal(batch['target'][:4, 0], [1, 0, 1, 0])
+        pos_idx = batch['chord_idx'][::2]
+        nptest.assert_array_equal(batch['chord_idx'][1::2], pos_idx)
+        self.assertEqual(set(pos_idx), set([0, 21, 156]))
+        # Negatives: C:maj -> N (0-2), N -> A:min (100+), A:min -> C:maj (3-5)
+        values = batch['cqt'].flatten()
+        nptest.assert_array_equal(
+            np.floor(values[1::2] / 3)[pos_idx == 0], 0)
+        nptest.assert_array_equal(
+            values[1::2][pos_idx == 156] >= 100, True)
+        nptest.assert_array_equal(
+            np.floor(values[1::2] / 3)[pos_idx == 21], 1)
+
+    def test_class_sampler_stream(self):
+        labels = dict([(k, np.array([k] * 4)) for k in 'abcd'])
+        stash = dict([(k, biggie.Entity(cqt=np.zeros([1, 4, 2]),
+                                        chord_labels=labels[k]))
+                      for k in labels])
+        loaded = []
+
+        class Stash(dict):
+            def get(self, key):
+                loaded.append(key)
+                return dict.get(self, key)
+
+        index = PI.PartitionIndex.from_labels(
+            dict([(k, np.arange(4) % 2) for k in 'abcd']), 2)
+        sampler = sampling.ClassSampler(index)
+        stream = D.class_sampler_stream(Stash(stash), sampler, 3,
+                                        chunk_size=10, cache_size=2)
+        samples = [next(stream) for n in range(200)]
+        self.assertEqual(samples[0].data.shape, (1, 3, 2))
+        # Evicted entities are reloaded; an unbounded cache loads each once.
+        self.assertGreater(len(loaded), 4)
+        self.assertEqual(set(loaded), set('abcd'))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,84 @@
+import numpy as np
+import pickle
+
+import dl4mir.chords.evaluate as E
+
+
+def test_label_index():
+    index = E.LabelIndex()
+    codes = index.encode(['C:maj', 'N', 'C:maj', 'A:min'])
+    np.testing.assert_array_equal(codes, [0, 1, 0, 2])
+    np.testing.assert_array_equal(index.encode(['A:min', 'G:7']), [2, 3])
+    assert index.decode([3, 1]) == ['G:7', 'N']
+
+
+def test_comparison_table():
+    ref_labels = ['C:maj', 'C:maj', 'A:min', 'N', 'X', 'Eb:7']
+    est_labels = ['C:maj', 'C:min', 'A:min7', 'N', 'C:maj', 'Eb:maj']
+    for metric, compare_func in E.COMPARISONS.items():
+        table = E.ComparisonTable(compare_func, E.LabelIndex(),
+                                  E.LabelIndex())
+        for n in range(2):
+            np.testing.assert_array_equal(
+                table.score(ref_labels, est_labels),
+                compare_func(ref_labels, est_labels))
+
+
+def test_align_annotations():
+    ref_annots = [(np.array([[0.0, 1.0], [1.0, 3.0]]), ['C:maj', 'G:maj']),
+                  (np.array([[0.0, 2.0]]), ['A:min'])]
+    est_annots = [(np.array([[0.0, 2.0], [2.0, 4.0]]), ['C:maj', 'G:maj']),
+                  (np.array([[0.5, 2.0]]), ['A:min'])]
+    durations, ref_codes, est_codes, offsets = E.align_annotations(
+        ref_annots, est_annots)
+
+    np.testing.assert_array_equal(offsets, [0, 3, 5])
+    np.testing.assert_array_equal(durations, [1.0, 1.0, 1.0, 0.5, 1.5])
+    assert E.REF_LABELS.decode(ref_codes) == ['C:maj', 'G:maj', 'G:maj',
+                                              'A:min', 'A:min']
+    assert E.EST_LABELS.decode(est_codes) == ['C:maj', 'C:maj', 'G:maj',
+                                              'N', 'A:min']
+
+
+def test_label_counts():
+    ref_codes = E.REF_LABELS.encode(['C:maj', 'C:maj', 'C:min', 'X'])
+    est_codes = E.EST_LABELS.encode(['C:maj', 'C:min', 'C:min', 'C:maj'])
+    scores = np.array([1.0, 0.0, 1.0, -1.0])
+    weights = np.array([1.0, 2.0, 4.0, 8.0])
+    label_counts = E.LabelCounts().add(ref_codes, est_codes, scores, weights)
+    label_counts = label_counts + pickle.loads(pickle.dumps(label_counts))
+
+    assert len(label_counts) == 3
+    labels, scores, supports = E.macro_average(label_counts)
+    assert labels == ['C:min', 'C:maj']
+    np.testing.assert_array_equal(scores, [1.0, 1.0 / 3])
+    np.testing.assert_array_equal(supports, [8.0, 6.0])
+    assert label_counts.to_dict()['C:maj']['C:min'] == dict(count=0.0,
+                                                            support=4.0)
+
+
+def test_score_frames():
+    from dl4mir.chords.lexicon import Strict
+    vocab = Strict(157)
+    ref_labels = ['C:maj', 'C:maj', 'A:min', 'X', 'N']
+    est_indices = vocab.label_to_index(['C:maj', 'C:min', 'A:min7', 'C:maj',
+                                        'N'])
+    scores, weights = E.score_frames(ref_labels, est_indices, vocab,
+                                     ['majmin'], offsets=[0, 2, 5])
+
+    np.testing.assert_array_equal(scores, [[0.5], [1.0]])
+    np.testing.assert_array_equal(weights, [[2.0], [2.0]])
+
+
+def test_bootstrap_intervals():
+    scores = np.array([[1.0, 0.5], [0.0, 0.5], [0.5, 0.5]])
+    supports = np.array([[10.0, 2.0], [30.0, 0.0], [20.0, 2.0]])
+    macro, micro = E.bootstrap_scores(scores, supports, 200, seed=0)
+    assert macro.shape == micro.shape == (200, 2)
+    np.testing.assert_array_equal(macro[:, 1], 0.5)
+    assert macro[:, 0].min() >= 0.0 and macro[:, 0].max() <= 1.0
+
+    intervals = E.bootstrap_intervals(scores, supports, ['a', 'b'], 200,
+                                      seed=0)
+    lower, upper = intervals['micro']['a']
+    assert lower <= (10.0 + 10.0) / 60.0 <= upper
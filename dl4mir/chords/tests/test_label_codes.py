@@ -0,0 +1,48 @@
+import biggie
+import numpy as np
+
+import dl4mir.chords.data as D
+import dl4mir.chords.label_codes as LC
+import dl4mir.chords.labels as L
+import dl4mir.chords.lexicon as lex
+import dl4mir.chords.pipefxs as FX
+
+LABELS = ['N', 'X', 'C:maj', 'A:min', 'G:7', 'E:dim7', 'C#:maj/3', 'C:maj']
+
+
+def test_class_codes():
+    for vocab_dim in LC.VOCAB_DIMS:
+        codes = LC.class_codes(LABELS, vocab_dim)
+        assert codes.dtype == np.int16
+        expected = [LC.NO_CODE if idx is None else idx for idx in
+                    lex.Strict(vocab_dim).label_to_index(LABELS)]
+        np.testing.assert_array_equal(codes, expected)
+
+    labels_2d = np.array([LABELS, LABELS[::-1]]).T
+    assert LC.class_codes(labels_2d, 157).shape == labels_2d.shape
+
+
+def test_chroma_codes():
+    codes = LC.chroma_codes(LABELS)
+    for bins_per_pitch in [1, 3]:
+        np.testing.assert_array_equal(
+            LC.decode_chroma(codes, bins_per_pitch),
+            L.chord_label_to_chroma(LABELS, bins_per_pitch))
+
+
+def test_mappers_use_codes():
+    entity = LC.add_label_codes(biggie.Entity(
+        cqt=np.random.normal(size=(1, len(LABELS), 6)),
+        chord_labels=np.array(LABELS)))
+    vocab = lex.Strict(157)
+    np.testing.assert_array_equal(D.map_chord_labels(entity, vocab),
+                                  LC.class_codes(LABELS, 157))
+    for idx, label in enumerate(LABELS):
+        sample = D.slice_cqt_entity(entity, 3, idx)
+        assert D.map_chord_labels(sample, vocab) == \
+            vocab.label_to_index(label)
+
+    # Shifting the label invalidates its codes.
+    shifted = FX._padshift(D.slice_cqt_entity(entity, 3, 2), 2, 1)
+    assert D.map_chord_labels(shifted, vocab) == \
+        vocab.label_to_index('D:maj')
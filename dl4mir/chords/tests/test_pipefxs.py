@@ -0,0 +1,91 @@
+import biggie
+import numpy as np
+
+import dl4mir.chords.lexicon as lex
+import dl4mir.chords.pipefxs as FX
+import dl4mir.common.util as util
+
+
+def test_pitch_shift_table():
+    vocab = lex.Strict(157)
+    table = FX.pitch_shift_table(vocab)
+    assert table.shape == (157, 12)
+    for class_idx in [0, 5, 30, 156]:
+        label = vocab.index_to_label(class_idx)
+        for shift in [-5, 0, 3, 11]:
+            entity = biggie.Entity(data=np.zeros([1, 2, 36]),
+                                   chord_label=label)
+            expected = FX._padshift(entity, shift, 3).chord_label
+            assert vocab.index_to_label(table[class_idx, shift % 12]) == \
+                expected
+
+
+def test_shift_batch():
+    data = np.random.normal(size=(4, 1, 3, 12))
+    shifts = [-4, 0, 2, 7]
+    padded = FX.shift_batch(data, shifts, fill_value=-1.0)
+    circular = FX.shift_batch(data, shifts, circular=True)
+    for x, x_pad, x_circ, shift in zip(data, padded, circular, shifts):
+        np.testing.assert_array_equal(
+            x_pad[0], util.translate(x[0], 0, shift, -1.0))
+        np.testing.assert_array_equal(
+            x_circ[0], util.circshift(x[0], 0, shift))
+
+
+def test_pitch_shift_batches():
+    vocab = lex.Strict(157)
+    table = FX.pitch_shift_table(vocab)
+    batch = dict(data=np.random.normal(size=(50, 1, 3, 36)),
+                 class_idx=np.random.randint(157, size=50).astype(np.int32))
+    np.random.seed(123)
+    shifted = next(FX.pitch_shift_batches(iter([batch]), table))
+    np.random.seed(123)
+    shifts = np.random.randint(low=-6, high=6, size=50)
+
+    assert shifted['class_idx'].dtype == np.int32
+    np.testing.assert_array_equal(
+        shifted['class_idx'], table[batch['class_idx'], shifts % 12])
+    np.testing.assert_array_equal(
+        shifted['data'], FX.shift_batch(batch['data'], shifts * 3))
+
+
+class _PartialLexicon(object):
+    """Lexicon of two major chords, a whole tone apart, and no-chord."""
+    labels = ['C:maj', 'D:maj', 'N']
+    num_classes = len(labels)
+
+    def index_to_label(self, index):
+        return self.labels[index]
+
+    def label_to_index(self, label):
+        return self.labels.index(label) if label in self.labels else None
+
+
+def test_pitch_shift_batches_drops_unmapped():
+    table = FX.pitch_shift_table(_PartialLexicon())
+    np.testing.assert_array_equal(table[0, [0, 1, 2]], [0, -1, 1])
+    assert (table[2] == 2).all()
+
+    class_idx = np.array([0, 1, 2] * 20, dtype=np.int32)
+    batch = dict(data=np.arange(60.)[:, np.newaxis, np.newaxis, np.newaxis] +
+                 np.zeros([1, 1, 1, 12]), class_idx=class_idx, scale=2.0)
+    np.random.seed(7)
+    shifted = next(FX.pitch_shift_batches(iter([batch]), table,
+                                          max_pitch_shift=3,
+                                          bins_per_pitch=1, circular=True))
+    np.random.seed(7)
+    shifts = np.random.randint(low=-3, high=3, size=60)
+    expected = table[class_idx, shifts % 12]
+    valid = expected >= 0
+    assert 0 < valid.sum() < 60
+
+    assert (shifted['class_idx'] >= 0).all()
+    np.testing.assert_array_equal(shifted['class_idx'], expected[valid])
+    np.testing.assert_array_equal(shifted['data'][:, 0, 0, 0],
+                                  np.arange(60.)[valid])
+    assert shifted['scale'] == 2.0
+
+    batch = dict(data=np.zeros([2, 1, 1, 12]),
+                 class_idx=np.array([0, 0], dtype=np.int32))
+    table[0, :] = -1
+    assert next(FX.pitch_shift_batches(iter([batch]), table)) is None
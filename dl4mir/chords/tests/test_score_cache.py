@@ -0,0 +1,26 @@
+import numpy as np
+import os
+
+import dl4mir.common.fileutil as futil
+import dl4mir.chords.evaluate as E
+import dl4mir.chords.score_cache as SC
+
+
+def test_tally_scores():
+    ref_annots = [(np.array([[0.0, 1.0], [1.0, 3.0]]), ['C:maj', 'G:maj']),
+                  (np.array([[0.0, 2.0]]), ['A:min'])]
+    est_annots = [(np.array([[0.0, 2.0], [2.0, 4.0]]), ['C:maj', 'G:7']),
+                  (np.array([[0.5, 2.0]]), ['A:min'])]
+    metrics = ['triads', 'sevenths']
+    tmpdir = futil.TempDir()
+    cache_file = os.path.join(tmpdir.path, "scores.sqlite")
+
+    expected = E.tally_scores(ref_annots, est_annots, 0.0, metrics)
+    for num_misses in 4, 0:
+        cache = SC.ScoreCache(cache_file)
+        results = SC.tally_scores(ref_annots, est_annots, 0.0, metrics, cache)
+        assert cache.stats() == dict(hits=4 - num_misses, misses=num_misses)
+        for stat in expected:
+            for m in metrics:
+                np.testing.assert_almost_equal(results[stat][m],
+                                               expected[stat][m])
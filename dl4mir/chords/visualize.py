@@ -5,6 +5,7 @@ from matplotlib import gridspec
 import mir_eval
 from scipy.spatial import distance
 import dl4mir.chords.labels as L
+import dl4mir.common.segment as segment
 import dl4mir.common.util as util
 
 
@@ -141,12 +142,13 @@ def plot_validation_sweep(validation_stats, pvals, iter_idx=-4, ax=None,
 
 
 def draw_chord_boundaries(entity, ax, ymin, ymax):
-    labels = np.array(util.run_length_encode(entity.chord_labels))
-    boundaries = np.array([0] + np.cumsum(labels[:, 1].astype(int)).tolist())
+    starts = segment.run_starts(entity.chord_labels)
+    boundaries = np.append(starts, len(entity.chord_labels))
     ax.vlines(boundaries, ymin=ymin, ymax=ymax, linewidth=3,
               color='k', alpha=0.66)
     ax.set_xticks((boundaries[:-1] + (np.diff(boundaries) / 2)).tolist())
-    ax.set_xticklabels(labels[:, 0].tolist(), rotation=-45.0)
+    ax.set_xticklabels(np.asarray(entity.chord_labels)[starts].tolist(),
+                       rotation=-45.0)
     return ax
 
 
@@ -0,0 +1,185 @@
+"""Incremental evaluation of parameter checkpoints, with early stopping.
+
+While `optimus.Driver.fit` writes a parameter archive every `save_freq`
+iterations, a watcher scores each new archive as it appears and keeps a
+running record of the best one. When `patience` consecutive checkpoints
+fail to improve on the best score, the watcher writes a stop file; a
+trainer reading its data through `streams.stop_on_file` then runs out of
+data and returns.
+
+Example
+-------
+>>> watcher = CheckpointWatcher("models/0", evaluate, "models/0/best.json",
+                                patience=10, stop_file="models/0/STOP")
+>>> watcher.run(poll_interval=60.0)
+>>> watcher.best_param_file
+'models/0/ace_deepnet-0042000.npz'
+"""
+
+import glob
+import json
+import os
+import time
+
+
+def request_stop(stop_file, message=''):
+    """Signal, through the filesystem, that training should stop.
+
+    Parameters
+    ----------
+    stop_file : str
+        Path of the stop file to write.
+    message : str, default=''
+        Reason for stopping, stored in the file for posterity.
+    """
+    with open(stop_file, 'w') as fp:
+        fp.write(message)
+
+
+def stop_requested(stop_file):
+    """Return True if a stop has been requested through `stop_file`."""
+    return bool(stop_file) and os.path.exists(stop_file)
+
+
+class CheckpointWatcher(object):
+    """Evaluate parameter archives as they are written to a directory.
+
+    Progress is saved to `record_file` after every checkpoint, such that a
+    restarted watcher picks up where the last one left off.
+
+    Parameters
+    ----------
+    param_dir : str
+        Directory to which parameter archives are written.
+    evaluate : callable
+        Function mapping a parameter file to a scalar score; higher is better.
+    record_file : str
+        JSON file for keeping the scores and the best checkpoint.
+    pattern : str, default='*.npz'
+        Glob pattern of parameter archives, relative to `param_dir`.
+    patience : int, default=None
+        Number of consecutive checkpoints without improvement after which to
+        stop; never stops if None.
+    min_delta : scalar, default=0.0
+        Minimum increase over the best score that counts as an improvement.
+    stop_file : str, default=None
+        Path of the stop file to write when patience runs out.
+    settle_time : scalar, default=5.0
+        Seconds since the last modification of an archive before it is
+        considered completely written.
+    """
+    def __init__(self, param_dir, evaluate, record_file, pattern='*.npz',
+                 patience=None, min_delta=0.0, stop_file=None,
+                 settle_time=5.0):
+        self.param_dir = param_dir
+        self.evaluate = evaluate
+        self.record_file = record_file
+        self.pattern = pattern
+        self.patience = patience
+        self.min_delta = min_delta
+        self.stop_file = stop_file
+        self.settle_time = settle_time
+
+        self.scores = dict()
+        self.best_param_file = None
+        self.best_score = None
+        self.num_stale = 0
+        if os.path.exists(record_file):
+            with open(record_file) as fp:
+                self.__dict__.update(json.load(fp))
+
+    def save(self):
+        """Write the current record to disk."""
+        record = dict(scores=self.scores,
+                      best_param_file=self.best_param_file,
+                      best_score=self.best_score,
+                      num_stale=self.num_stale)
+        with open(self.record_file, 'w') as fp:
+            json.dump(record, fp, indent=2)
+
+    @property
+    def stalled(self):
+        """True if patience has run out."""
+        return self.patience is not None and self.num_stale >= self.patience
+
+    def pending(self):
+        """Return the complete, unscored parameter files, oldest first."""
+        now = time.time()
+        param_files = []
+        for f in glob.glob(os.path.join(self.param_dir, self.pattern)):
+            mtime = os.path.getmtime(f)
+            if f not in self.scores and now - mtime >= self.settle_time:
+                param_files.append((mtime, f))
+        return [f for mtime, f in sorted(param_files)]
+
+    def add(self, param_file, score):
+        """Record the score of a checkpoint, updating the best.
+
+        Returns
+        -------
+        improved : bool
+            True if the checkpoint is the new best.
+        """
+        self.scores[param_file] = score
+        improved = (self.best_score is None or
+                    score > self.best_score + self.min_delta)
+        if improved:
+            self.best_param_file, self.best_score = param_file, score
+            self.num_stale = 0
+        else:
+            self.num_stale += 1
+        self.save()
+        return improved
+
+    def update(self):
+        """Evaluate all pending parameter files, stopping early if stalled.
+
+        Returns
+        -------
+        param_files : list
+            Parameter files evaluated in this call.
+        """
+        param_files = []
+        for param_file in self.pending():
+            if self.stalled:
+                break
+            self.add(param_file, float(self.evaluate(param_file)))
+            param_files.append(param_file)
+        return param_files
+
+    def run(self, poll_interval=30.0, max_idle=None, verbose=False):
+        """Poll for new checkpoints until patience runs out.
+
+        Parameters
+        ----------
+        poll_interval : scalar, default=30.0
+            Seconds to wait between polls of `param_dir`.
+        max_idle : scalar, default=None
+            Seconds without a new checkpoint after which to give up, e.g.
+            because the trainer has finished; waits forever if None.
+        verbose : bool, default=False
+            Print each score as it is computed.
+
+        Returns
+        -------
+        stalled : bool
+            True if the watcher stopped because validation stalled.
+        """
+        last_update = time.time()
+        while not self.stalled:
+            for param_file in self.update():
+                last_update = time.time()
+                if verbose:
+                    print "[{0}] {1}: {2} (best: {3})".format(
+                        time.asctime(), param_file, self.scores[param_file],
+                        self.best_score)
+            if self.stalled:
+                break
+            if max_idle is not None and time.time() - last_update > max_idle:
+                return False
+            time.sleep(poll_interval)
+
+        if self.stop_file:
+            request_stop(self.stop_file, "Best checkpoint: {0}".format(
+                self.best_param_file))
+        return True
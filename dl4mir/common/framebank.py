@@ -0,0 +1,217 @@
+"""Vectorized sampling of windowed minibatches from a bank of tracks.
+
+The arrays of every track are zero-padded and concatenated once, along their
+frame axis, into a single "frame bank", such that each (track, frame) pair
+maps to one row of a strided view over all windows. A minibatch is then a
+single gather of random rows into a preallocated array, without building an
+Entity for every sample.
+
+Example
+-------
+>>> bank = FrameBank.from_stash(stash, 'cqt', win_length=20, frame_axis=1)
+>>> rows = bank.rows(np.zeros(10, dtype=int), np.arange(10))
+>>> stream = batch_stream(bank, rows, labels, batch_size=50)
+>>> batch = next(stream)
+>>> batch['data'].shape, batch['class_idx'].dtype
+((50, 1, 20, 252), dtype('int32'))
+"""
+
+import numpy as np
+
+from dl4mir.common import streams
+from dl4mir.common import util
+
+
+class FrameBank(object):
+    """Padded, concatenated frames of a collection of tracks.
+
+    Parameters
+    ----------
+    arrays : list of np.ndarrays
+        Arrays of each track, with equal shapes other than along `frame_axis`.
+    win_length : int
+        Length of the windows to draw.
+    frame_axis : int, default=0
+        Axis along which frames are indexed.
+    dtype : type, default=np.float32
+        Data type of the bank, and of the batches drawn from it.
+    """
+    def __init__(self, arrays, win_length, frame_axis=0, dtype=np.float32):
+        self.win_length = win_length
+        self.frame_axis = frame_axis
+        self.num_frames = np.array([x.shape[frame_axis] for x in arrays],
+                                   dtype=int)
+        padded_frames = self.num_frames + win_length - 1
+        self.offsets = np.concatenate([[0], np.cumsum(padded_frames)[:-1]])
+
+        shape = list(arrays[0].shape)
+        shape[frame_axis] = int(padded_frames.sum())
+        self.bank = np.zeros(shape, dtype=dtype)
+        index = [slice(None)] * len(shape)
+        for x_in, offset, num_frames in zip(arrays, self.offsets,
+                                            self.num_frames):
+            start = offset + win_length / 2
+            index[frame_axis] = slice(start, start + num_frames)
+            self.bank[tuple(index)] = x_in
+
+        self.windows = util.frame_windows(self.bank, win_length, frame_axis)
+
+    @classmethod
+    def from_stash(cls, stash, field, win_length, keys=None, **kwargs):
+        """Create a frame bank from a field of the entities in a stash.
+
+        Parameters
+        ----------
+        stash : dict_like
+            Dict or biggie.Stash of entities.
+        field : str
+            Name of the field to window.
+        win_length : int
+            Length of the windows to draw.
+        keys : list, default=None
+            Keys of the tracks, in order; defaults to all keys in the stash.
+        **kwargs
+            Further arguments passed through to ``FrameBank()``.
+
+        Returns
+        -------
+        bank : FrameBank
+            Frame bank, with an attribute `keys` for the order of tracks.
+        """
+        keys = list(stash.keys()) if keys is None else list(keys)
+        bank = cls([getattr(stash.get(k), field) for k in keys],
+                   win_length, **kwargs)
+        bank.keys = keys
+        return bank
+
+    @property
+    def dtype(self):
+        return self.bank.dtype
+
+    @property
+    def window_shape(self):
+        """Shape of a single window."""
+        return self.windows.shape[1:]
+
+    def rows(self, track_idx, frame_idx):
+        """Map (track, frame) index pairs to rows of the bank's windows.
+
+        Parameters
+        ----------
+        track_idx, frame_idx : array_like of ints
+            Track and (centered) frame index of each window.
+
+        Returns
+        -------
+        rows : np.ndarray
+            Row of each window.
+        """
+        return self.offsets[track_idx] + np.asarray(frame_idx, dtype=int)
+
+    def gather(self, rows, out=None):
+        """Copy a set of windows into an array.
+
+        Parameters
+        ----------
+        rows : array_like, shape=(n,)
+            Rows of the windows to copy; see `rows`.
+        out : np.ndarray, shape=(n,) + window_shape, default=None
+            Array to fill; allocated if None.
+
+        Returns
+        -------
+        data : np.ndarray, shape=(n,) + window_shape
+            The gathered windows.
+        """
+        rows = np.asarray(rows, dtype=int)
+        if out is None:
+            out = np.empty((len(rows),) + self.window_shape, dtype=self.dtype)
+
+        # Take frames from the contiguous bank, rather than the (overlapping)
+        #   windows view, which np.take would first copy whole, and write them
+        #   into `out` through a view in the axis order of np.take's output.
+        out_view = np.rollaxis(out, 0, self.frame_axis + 1)
+        if out_view.flags.c_contiguous and out.dtype == self.dtype:
+            frames = rows[:, np.newaxis] + np.arange(self.win_length)
+            np.take(self.bank, frames, axis=self.frame_axis, out=out_view,
+                    mode='clip')
+        else:
+            for n, row in enumerate(rows):
+                out[n] = self.windows[row]
+        return out
+
+
+class BatchStream(object):
+    """Stream of minibatches of windows, sampled uniformly over rows.
+
+    Sampling is driven by a private random number generator, so the stream
+    can be checkpointed with `get_state` and resumed with `set_state`.
+
+    The batch arrays are allocated once and refilled for every batch; copy
+    them to keep a batch past the next one.
+
+    Parameters
+    ----------
+    bank : FrameBank
+        Frame bank to sample.
+    rows : array_like, shape=(n,)
+        Rows of the windows available for sampling.
+    labels : array_like of ints, shape=(n,)
+        Class index of each row.
+    batch_size : int
+        Number of windows per batch.
+    data_key, label_key : str
+        Keys of the windows and class indices in each batch.
+    seed : int, default=None
+        Seed for the random number generator.
+    """
+    def __init__(self, bank, rows, labels, batch_size, data_key='data',
+                 label_key='class_idx', seed=None):
+        self.bank = bank
+        self.rows = np.asarray(rows, dtype=int)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.data_key = data_key
+        self.label_key = label_key
+        self.rng = np.random.RandomState(seed)
+        self.num_batches = 0
+        self._data = np.empty((batch_size,) + bank.window_shape,
+                              dtype=bank.dtype)
+        self._class_idx = np.empty(batch_size, dtype=np.int32)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        idx = self.rng.randint(0, len(self.rows), size=len(self._class_idx))
+        self.bank.gather(self.rows[idx], out=self._data)
+        np.take(self.labels, idx, out=self._class_idx)
+        self.num_batches += 1
+        return {self.data_key: self._data, self.label_key: self._class_idx}
+
+    __next__ = next
+
+    def get_state(self):
+        """Return the sampling state of the stream, as a JSON object."""
+        return dict(rng=streams.get_rng_state(self.rng),
+                    num_batches=self.num_batches)
+
+    def set_state(self, state):
+        """Resume sampling from a state returned by `get_state`."""
+        streams.set_rng_state(state['rng'], self.rng)
+        self.num_batches = state['num_batches']
+
+
+def batch_stream(bank, rows, labels, batch_size, data_key='data',
+                 label_key='class_idx', seed=None):
+    """Stream minibatches of windows, sampled uniformly over rows.
+
+    See `BatchStream` for parameters.
+
+    Returns
+    -------
+    stream : BatchStream
+        Iterator over batches of windows, shaped (batch_size,) +
+        bank.window_shape, and int32 class indices.
+    """
+    return BatchStream(bank, rows, labels, batch_size, data_key, label_key,
+                       seed)
@@ -0,0 +1,283 @@
+"""Contiguous, memory-mapped storage for collections of framewise arrays.
+
+A frame store is a directory holding one `.npy` file per field, in which the
+frames of every entity are concatenated along the first axis, and an index
+mapping each key to its (start, stop) frame offsets. Arrays are opened with
+`mmap_mode='r'`, so any number of processes can read the same store without
+copying it into memory, and a store pickles to nothing more than its path.
+
+Fields of strings, such as chord labels, are stored as int16 codes into a
+table of unique values, kept in the index; entities decode them back to
+strings, while samplers can read the codes directly with `get_codes`.
+
+Example
+-------
+>>> store = create_framestore(biggie.Stash("posteriors.hdf5"),
+                              "posteriors.frames",
+                              fields=['posterior', 'time_points'])
+>>> entity = store.get(store.keys()[0])
+"""
+
+import biggie
+import json
+import numpy as np
+import os
+
+INDEX_FILE = "index.json"
+FILE_FMT = "{0}.npy"
+CODE_DTYPE = np.int16
+
+
+def _stash_fingerprint(filepath):
+    """Return a (size, mtime) pair identifying the state of a file."""
+    stat = os.stat(filepath)
+    return [stat.st_size, int(stat.st_mtime)]
+
+
+def create_framestore(stash, directory, fields, frame_axes=None, dtypes=None,
+                      keys=None, source=None):
+    """Write the entities of a stash to a new frame store.
+
+    Entities are read one at a time, twice: once to size the output arrays,
+    and once to fill them. Memory use is therefore bounded by the largest
+    entity, not the size of the collection.
+
+    Parameters
+    ----------
+    stash : dict_like
+        Dict or biggie.Stash of entities to write.
+    directory : str
+        Path for the output frame store; created if it doesn't exist.
+    fields : list of str
+        Names of the entity fields to write; fields of strings are encoded
+        as label codes.
+    frame_axes : dict, default=None
+        Map of field names to the axis along which frames are indexed;
+        defaults to the first axis.
+    dtypes : dict, default=None
+        Map of field names to output data types; defaults to the input type.
+        Ignored for label fields.
+    keys : list, default=None
+        Subset of keys to write, in order; defaults to all keys in the stash.
+    source : str, default=None
+        Path of the file backing `stash`, recorded to detect stale stores.
+
+    Returns
+    -------
+    store : FrameStore
+        The populated frame store, opened for reading.
+    """
+    frame_axes = dict() if frame_axes is None else frame_axes
+    dtypes = dict() if dtypes is None else dtypes
+    keys = list(stash.keys()) if keys is None else list(keys)
+
+    num_frames = np.zeros(len(keys), dtype=int)
+    shapes, field_dtypes, label_sets = dict(), dict(), dict()
+    for n, key in enumerate(keys):
+        entity = stash.get(key)
+        for name in fields:
+            value = np.asarray(getattr(entity, name))
+            axis = frame_axes.get(name, 0)
+            shape = list(value.shape)
+            length = shape.pop(axis)
+            if name == fields[0]:
+                num_frames[n] = length
+            elif length != num_frames[n]:
+                raise ValueError(
+                    "Field '{0}' of '{1}' has {2} frames; expected {3}."
+                    "".format(name, key, length, num_frames[n]))
+            if shapes.setdefault(name, shape) != shape:
+                raise ValueError(
+                    "Field '{0}' of '{1}' has inconsistent shape {2}; "
+                    "expected {3}.".format(name, key, shape, shapes[name]))
+            if value.dtype.kind in 'SUO':
+                label_sets.setdefault(name, set()).update(value.flat)
+            field_dtypes.setdefault(name, dtypes.get(name, value.dtype))
+
+    label_codes = dict()
+    for name in fields:
+        if name in label_sets:
+            table = sorted(label_sets[name])
+            if len(table) > np.iinfo(CODE_DTYPE).max + 1:
+                raise ValueError(
+                    "Field '{0}' has {1} unique labels; too many for {2} "
+                    "codes.".format(name, len(table), CODE_DTYPE.__name__))
+            label_codes[name] = dict([(y, n) for n, y in enumerate(table)])
+            field_dtypes[name] = CODE_DTYPE
+        elif not np.issubdtype(np.dtype(field_dtypes[name]), np.number):
+            raise ValueError(
+                "Field '{0}' is neither numerical nor labels ({1})."
+                "".format(name, field_dtypes[name]))
+
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    # Remove a previous index first so that an interrupted write is never
+    #   mistaken for a complete store.
+    index_file = os.path.join(directory, INDEX_FILE)
+    if os.path.exists(index_file):
+        os.remove(index_file)
+
+    stops = np.cumsum(num_frames)
+    starts = stops - num_frames
+    total_frames = int(stops[-1]) if len(stops) else 0
+    outputs = dict()
+    for name in fields:
+        outputs[name] = np.lib.format.open_memmap(
+            os.path.join(directory, FILE_FMT.format(name)), mode='w+',
+            dtype=field_dtypes[name],
+            shape=tuple([total_frames] + shapes[name]))
+
+    for key, start, stop in zip(keys, starts, stops):
+        entity = stash.get(key)
+        for name in fields:
+            value = np.asarray(getattr(entity, name))
+            if name in label_codes:
+                value = np.array([label_codes[name][y] for y in value.flat],
+                                 dtype=CODE_DTYPE).reshape(value.shape)
+            outputs[name][start:stop] = np.rollaxis(
+                value, frame_axes.get(name, 0), 0)
+
+    for name in fields:
+        outputs[name].flush()
+    del outputs
+
+    field_info = dict([(name, dict(frame_axis=frame_axes.get(name, 0)))
+                       for name in fields])
+    for name, codes in label_codes.items():
+        field_info[name]['labels'] = sorted(codes, key=codes.get)
+
+    index = dict(
+        keys=keys,
+        offsets=np.array([starts, stops]).T.tolist(),
+        fields=field_info,
+        source=None if source is None else _stash_fingerprint(source))
+
+    with open(index_file, 'w') as fp:
+        json.dump(index, fp)
+
+    return FrameStore(directory)
+
+
+def load_or_create(stash_file, fields, directory=None, **kwargs):
+    """Open the frame store mirroring a stash file, (re)building it if stale.
+
+    Parameters
+    ----------
+    stash_file : str
+        Path to a biggie Stash.
+    fields : list of str
+        Names of the entity fields to store.
+    directory : str, default=None
+        Path of the frame store; defaults to "{stash_file base}.frames".
+    **kwargs
+        Further arguments passed through to ``create_framestore()``.
+
+    Returns
+    -------
+    store : FrameStore
+        A frame store consistent with the current contents of `stash_file`.
+    """
+    if directory is None:
+        directory = "{0}.frames".format(os.path.splitext(stash_file)[0])
+
+    index_file = os.path.join(directory, INDEX_FILE)
+    if os.path.exists(index_file):
+        store = FrameStore(directory)
+        if (store.source == _stash_fingerprint(stash_file) and
+                set(fields).issubset(store.fields)):
+            return store
+
+    return create_framestore(biggie.Stash(stash_file), directory, fields,
+                             source=stash_file, **kwargs)
+
+
+class FrameStore(object):
+    """Read-only, dict-like view of a frame store.
+
+    Implements the `keys()` / `get()` interface of a biggie.Stash, and so
+    stands in for one in the samplers; the numerical arrays of the returned
+    entities are views into the memory-mapped fields, while label fields are
+    decoded to arrays of strings.
+
+    Parameters
+    ----------
+    directory : str
+        Path to a frame store on disk.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE)) as fp:
+            index = json.load(fp)
+        self._keys = [str(k) for k in index['keys']]
+        self._offsets = dict(zip(self._keys, [tuple(_)
+                                              for _ in index['offsets']]))
+        self._frame_axes = dict([(k, v['frame_axis'])
+                                 for k, v in index['fields'].items()])
+        self._labels = dict([(k, np.array([str(y) for y in v['labels']]))
+                             for k, v in index['fields'].items()
+                             if 'labels' in v])
+        self.source = index.get('source')
+        self._arrays = dict()
+
+    def __getstate__(self):
+        return dict(directory=self.directory)
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'])
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._offsets
+
+    @property
+    def fields(self):
+        return list(self._frame_axes.keys())
+
+    def keys(self):
+        return list(self._keys)
+
+    def offsets(self, key):
+        """Return the (start, stop) frame offsets of `key`."""
+        return self._offsets[key]
+
+    def num_frames(self, key):
+        """Return the number of frames stored under `key`."""
+        start, stop = self._offsets[key]
+        return stop - start
+
+    def array(self, name):
+        """Return the full, frame-major memory-mapped array for a field."""
+        if name not in self._arrays:
+            self._arrays[name] = np.load(
+                os.path.join(self.directory, FILE_FMT.format(name)),
+                mmap_mode='r')
+        return self._arrays[name]
+
+    def label_table(self, name):
+        """Return the unique labels of a label field, indexed by code."""
+        return self._labels[name]
+
+    def get_codes(self, key, name):
+        """Return a view of the label codes of one field of an entity."""
+        if name not in self._labels:
+            raise ValueError("Field '{0}' is not a label field.".format(name))
+        start, stop = self._offsets[key]
+        value = self.array(name)[start:stop]
+        return np.rollaxis(value, 0, self._frame_axes[name] + 1)
+
+    def get_field(self, key, name):
+        """Return one field of an entity, in its original layout; a view for
+        numerical fields, and decoded strings for label fields."""
+        if name in self._labels:
+            return self._labels[name][self.get_codes(key, name)]
+        start, stop = self._offsets[key]
+        value = self.array(name)[start:stop]
+        return np.rollaxis(value, 0, self._frame_axes[name] + 1)
+
+    def get(self, key):
+        """Return an entity as a biggie.Entity of memory-mapped views."""
+        return biggie.Entity(**dict([(name, self.get_field(key, name))
+                                     for name in self._frame_axes]))
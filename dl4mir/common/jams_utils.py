@@ -4,8 +4,13 @@ https://github.com/marl/jams/releases/tag/v0.1
 """
 
 import json
+import numpy as np
+import os
 import pyjams
 
+PACKED_EXT = "jamz"
+STREAM_EXT = "jamsl"
+
 
 def load_jamset(filepath):
     """Load a collection of keyed JAMS (a JAMSet) into memory.
@@ -43,3 +48,300 @@ def save_jamset(jamset, filepath):
 
     with open(filepath, 'w') as fp:
         json.dump(output_data, fp)
+
+
+def _pack_items(items, filepath):
+    """Write an iterable of (key, JAMS) pairs as a packed JAMSet."""
+    keys, intervals, labels, confidence, metadata = [], [], [], [], []
+    offsets = [0]
+    with pyjams.JSONSupport():
+        for key, jam in items:
+            annot = jam.chord[0]
+            keys.append(key)
+            intervals.append(np.asarray(annot.intervals, dtype=float))
+            labels.extend([str(_) for _ in annot.labels.value])
+            confidence.append(
+                np.array([obs.label.confidence for obs in annot.data],
+                         dtype=float))
+            offsets.append(offsets[-1] + len(annot.data))
+            metadata.append(json.dumps(
+                dict(jam=jam.sandbox.__json__,
+                     annotation=annot.sandbox.__json__)))
+
+    label_table, label_codes = np.unique(labels, return_inverse=True)
+    with open(filepath, 'wb') as fp:
+        np.savez(fp,
+                 keys=np.array(keys, dtype=str),
+                 offsets=np.array(offsets, dtype=int),
+                 intervals=np.concatenate(intervals + [np.zeros([0, 2])]),
+                 label_codes=label_codes.astype(np.int32),
+                 label_table=np.array(label_table, dtype=str),
+                 confidence=np.concatenate(confidence + [np.zeros(0)]),
+                 metadata=np.array(metadata, dtype=str))
+
+
+def pack_jamset(jamset, filepath):
+    """Save the chord annotations of a JAMSet as a packed, columnar archive.
+
+    All tracks share flat arrays of intervals, integer label codes (into a
+    table of unique label strings) and confidences, with row offsets per key.
+    Only the first chord annotation of each JAMS object is kept, along with
+    its sandbox and that of the JAMS object.
+
+    Parameters
+    ----------
+    jamset : dict of JAMS
+        Collection of JAMS objects under unique keys.
+    filepath : str
+        Path for the output archive, conventionally with a `.jamz` extension.
+    """
+    _pack_items(((k, jamset[k]) for k in sorted(jamset.keys())), filepath)
+
+
+class PackedJAMSet(object):
+    """Read-only, dict-like access to a packed JAMSet; see `pack_jamset`.
+
+    Arrays are read from disk on first use, and per-key lookups are constant
+    time slices; JAMS objects are only built when explicitly requested.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to a packed JAMSet archive.
+    """
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._archive = np.load(filepath)
+        self._arrays = dict()
+        self._rows = dict([(str(k), n) for n, k in enumerate(self._keys)])
+
+    def __getstate__(self):
+        return dict(filepath=self.filepath)
+
+    def __setstate__(self, state):
+        self.__init__(state['filepath'])
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = self._archive[name]
+        return self._arrays[name]
+
+    @property
+    def _keys(self):
+        return self._array('keys')
+
+    @property
+    def label_table(self):
+        """Array of unique label strings, indexed by label code."""
+        return self._array('label_table')
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+    def keys(self):
+        return [str(k) for k in self._keys]
+
+    def _slice(self, key):
+        row = self._rows[key]
+        offsets = self._array('offsets')
+        return slice(offsets[row], offsets[row + 1])
+
+    def intervals(self, key):
+        """Return the (start, end) times of the chord annotation of `key`."""
+        return self._array('intervals')[self._slice(key)]
+
+    def label_codes(self, key):
+        """Return integer label codes, indexing into `label_table`."""
+        return self._array('label_codes')[self._slice(key)]
+
+    def confidence(self, key):
+        """Return the confidence of each labeled interval of `key`."""
+        return self._array('confidence')[self._slice(key)]
+
+    def labeled_intervals(self, key):
+        """Return the intervals and string labels of `key`."""
+        labels = self.label_table[self.label_codes(key)].tolist()
+        return self.intervals(key), labels
+
+    def get(self, key):
+        """Build a JAMS object with the chord annotation of `key`."""
+        intervals, labels = self.labeled_intervals(key)
+        metadata = json.loads(str(self._array('metadata')[self._rows[key]]))
+        annot = pyjams.RangeAnnotation()
+        pyjams.util.fill_range_annotation_data(
+            intervals[:, 0], intervals[:, 1], labels, annot)
+        for obs, conf in zip(annot.data, self.confidence(key)):
+            obs.label.confidence = float(conf)
+        annot.sandbox.update(**metadata['annotation'])
+        jam = pyjams.JAMS(chord=[annot])
+        jam.sandbox.update(**metadata['jam'])
+        return jam
+
+
+def open_jamset(filepath):
+    """Open a JAMSet, packed or otherwise, based on its file extension.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to a JAMSet, a packed JAMSet with a `.jamz` extension, or a
+        JAMSet stream with a `.jamsl` extension.
+
+    Returns
+    -------
+    jamset : dict of JAMS, or PackedJAMSet
+        Collection of JAMS objects under unique keys.
+    """
+    ext = os.path.splitext(filepath)[-1].strip(".")
+    if ext == PACKED_EXT:
+        return PackedJAMSet(filepath)
+    elif ext == STREAM_EXT:
+        return load_jamset_stream(filepath)
+    return load_jamset(filepath)
+
+
+def chord_labeled_intervals(jamset, key):
+    """Return the intervals and labels of the first chord annotation of a key.
+
+    Parameters
+    ----------
+    jamset : dict of JAMS, or PackedJAMSet
+        Collection of JAMS objects under unique keys.
+    key : str
+        Key of the track of interest.
+
+    Returns
+    -------
+    intervals : np.ndarray, shape=(N, 2)
+        Start and end times, in seconds.
+    labels : list, len=N
+        String labels corresponding to the intervals.
+    """
+    if isinstance(jamset, PackedJAMSet):
+        return jamset.labeled_intervals(key)
+    annot = jamset[key].chord[0]
+    return np.asarray(annot.intervals), annot.labels.value
+
+
+def _truncate_partial_record(filepath):
+    """Drop a trailing, partially written record from a JAMSet stream."""
+    if not os.path.exists(filepath) or not os.path.getsize(filepath):
+        return
+    with open(filepath, 'rb+') as fp:
+        fp.seek(-1, os.SEEK_END)
+        if fp.read(1) == "\n":
+            return
+        fp.seek(0)
+        fp.truncate(fp.read().rfind("\n") + 1)
+
+
+class JAMSetWriter(object):
+    """Append-only writer of a JAMSet stream, one JSON record per line.
+
+    Each record is flushed and fsync'ed as it is added, so everything written
+    before a crash can be recovered with `load_jamset_stream`. Opening an
+    existing stream resumes it, discarding any partially written record.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the stream, conventionally with a `.jamsl` extension.
+    """
+    def __init__(self, filepath):
+        self.filepath = filepath
+        _truncate_partial_record(filepath)
+        self._fp = open(filepath, 'a')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, key, jam):
+        """Append a JAMS object under a key to the stream."""
+        with pyjams.JSONSupport():
+            record = json.dumps(dict(key=key, jams=jam.__json__))
+        self._fp.write(record + "\n")
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+
+    def close(self):
+        if not self._fp.closed:
+            self._fp.close()
+
+
+def iter_jamset_stream(filepath):
+    """Iterate over the complete, valid records of a JAMSet stream.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to a JAMSet stream; a missing file is treated as empty.
+
+    Yields
+    ------
+    key : str
+        Key of the record.
+    data : dict
+        JSON data of the JAMS object.
+    """
+    if not os.path.exists(filepath):
+        return
+    with open(filepath) as fp:
+        for line in fp:
+            # Stop at a partial record, left behind by an interrupted write.
+            if not line.endswith("\n"):
+                break
+            # Skip a corrupt record, such that later ones are still read.
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            yield str(record['key']), record['jams']
+
+
+def jamset_stream_keys(filepath):
+    """Return the set of keys recorded in a JAMSet stream."""
+    return set([key for key, _ in iter_jamset_stream(filepath)])
+
+
+def load_jamset_stream(filepath):
+    """Load a JAMSet stream into memory; later records take precedence.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to a JAMSet stream.
+
+    Returns
+    -------
+    jamset : dict of JAMS
+        Collection of JAMS objects under unique keys.
+    """
+    return dict([(key, pyjams.JAMS(**data))
+                 for key, data in iter_jamset_stream(filepath)])
+
+
+def pack_jamset_stream(stream_file, filepath):
+    """Pack a JAMSet stream, one record at a time; see `pack_jamset`.
+
+    Parameters
+    ----------
+    stream_file : str
+        Path to a JAMSet stream; where a key is repeated, the last record is
+        kept.
+    filepath : str
+        Path for the output archive, conventionally with a `.jamz` extension.
+    """
+    last_record = dict([(key, n) for n, (key, _) in
+                        enumerate(iter_jamset_stream(stream_file))])
+    _pack_items(((key, pyjams.JAMS(**data)) for n, (key, data) in
+                 enumerate(iter_jamset_stream(stream_file))
+                 if last_record[key] == n), filepath)
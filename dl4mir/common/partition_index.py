@@ -0,0 +1,194 @@
+"""Class partitions of a stash, indexed once and persisted alongside it.
+
+`util.partition` maps every entity of a stash to per-frame class indices,
+which `util.index_partition_arrays` then filters by class. For large stashes
+this dominates the start-up time of a training run, so a partition index
+stores the result, per class, as CSR arrays of (key id, frame) positions in
+a sidecar file, rebuilt only when the stash file changes.
+
+Example
+-------
+>>> index = load_or_create("train.hdf5", "strict157", mapper, 157, lexicon)
+>>> chord_index = index.subindex([0, 12, 156])
+"""
+
+import biggie
+import numpy as np
+import os
+
+from dl4mir.common import framestore
+from dl4mir.common import util
+
+FILE_FMT = "{0}.{1}.partition.npz"
+
+
+class PartitionIndex(object):
+    """Frame positions of each class, over the keys of a collection.
+
+    The positions of class `c` are `(key_ids[i], frames[i])` for `i` in
+    `indptr[c]:indptr[c + 1]`, sorted by key id and frame.
+
+    Parameters
+    ----------
+    keys : list, len=n
+        Keys of the collection; key ids index into this list.
+    indptr : np.ndarray, shape=(num_classes + 1,)
+        Offsets of each class into `key_ids` and `frames`.
+    key_ids, frames : np.ndarray, shape=(num_positions,)
+        Key id and frame index of each position.
+    source : list, default=None
+        Fingerprint of the file the index was built from.
+    """
+    def __init__(self, keys, indptr, key_ids, frames, source=None):
+        self.keys = [str(k) for k in keys]
+        self.indptr = np.asarray(indptr, dtype=int)
+        self.key_ids = np.asarray(key_ids, dtype=int)
+        self.frames = np.asarray(frames, dtype=int)
+        self.source = None if source is None else list(source)
+
+    @classmethod
+    def from_labels(cls, partition_labels, num_classes, keys=None,
+                    source=None):
+        """Build an index from partition labels.
+
+        Parameters
+        ----------
+        partition_labels : dict_like
+            Class index of each frame, under each key; see `util.partition`.
+            Frames labeled None, or outside [0, num_classes), are dropped.
+        num_classes : int
+            Number of classes.
+        keys : list, default=None
+            Keys to index, in order; defaults to the sorted keys.
+        source : list, default=None
+            Fingerprint of the file the labels were computed from.
+
+        Returns
+        -------
+        index : PartitionIndex
+        """
+        keys = sorted(partition_labels.keys()) if keys is None else keys
+        classes, key_ids, frames = [], [], []
+        for key_id, key in enumerate(keys):
+            labels = np.array([-1 if y is None else y
+                               for y in partition_labels[key]], dtype=int)
+            valid = (labels >= 0) & (labels < num_classes)
+            classes.append(labels[valid])
+            frames.append(np.flatnonzero(valid))
+            key_ids.append(np.zeros(len(frames[-1]), dtype=int) + key_id)
+
+        classes, key_ids, frames = [np.concatenate(x + [np.zeros(0, int)])
+                                    for x in (classes, key_ids, frames)]
+        # Stable, so positions stay sorted by key and frame within a class.
+        order = np.argsort(classes, kind='mergesort')
+        indptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(classes, minlength=num_classes))])
+        return cls(keys, indptr, key_ids[order], frames[order], source)
+
+    @classmethod
+    def load(cls, filepath):
+        data = np.load(filepath)
+        source = data['source'].tolist() if len(data['source']) else None
+        return cls(data['keys'].tolist(), data['indptr'], data['key_ids'],
+                   data['frames'], source)
+
+    def save(self, filepath):
+        """Write the index to an NPZ archive."""
+        np.savez(filepath, keys=np.array(self.keys, dtype=str),
+                 indptr=self.indptr, key_ids=self.key_ids, frames=self.frames,
+                 source=np.array(self.source or [], dtype=int))
+
+    @property
+    def num_classes(self):
+        return len(self.indptr) - 1
+
+    def counts(self):
+        """Return the number of frames of each class."""
+        return np.diff(self.indptr)
+
+    def positions(self, label_set=None):
+        """Return the (key id, frame, class) of every position in a set of
+        classes.
+
+        Parameters
+        ----------
+        label_set : array_like, default=None
+            Classes to select; defaults to all classes.
+
+        Returns
+        -------
+        key_ids, frames, classes : np.ndarray
+            Flat arrays of positions, in order of `label_set`.
+        """
+        if label_set is None:
+            label_set = np.arange(self.num_classes)
+        label_set = [c for c in label_set if 0 <= c < self.num_classes]
+        slices = [np.arange(self.indptr[c], self.indptr[c + 1])
+                  for c in label_set]
+        idx = np.concatenate(slices + [np.zeros(0, dtype=int)])
+        classes = np.repeat(np.asarray(label_set, dtype=int),
+                            [len(s) for s in slices])
+        return self.key_ids[idx], self.frames[idx], classes
+
+    def subindex(self, label_set):
+        """Index the frames of each key that belong to a set of classes.
+
+        Equivalent to `util.index_partition_arrays`, on the labels the index
+        was built from.
+
+        Parameters
+        ----------
+        label_set : array_like
+            Set of classes for restricting the index.
+
+        Returns
+        -------
+        subset_index : dict
+            Sorted frame indices of each key with at least one match.
+        """
+        key_ids, frames = self.positions(label_set)[:2]
+        order = np.lexsort([frames, key_ids])
+        key_ids, frames = key_ids[order], frames[order]
+        unique_ids, starts = np.unique(key_ids, return_index=True)
+        return dict([(self.keys[k], f) for k, f in zip(
+            unique_ids, np.split(frames, starts[1:]))])
+
+
+def load_or_create(stash_file, tag, mapper, num_classes, *args, **kwargs):
+    """Open the partition index of a stash file, (re)building it if stale.
+
+    Parameters
+    ----------
+    stash_file : str
+        Path to a biggie Stash.
+    tag : str
+        Name of the partition, distinguishing the mapper and its arguments,
+        e.g. a lexicon and vocabulary size.
+    mapper : function
+        Partition labeling function; see `util.partition`.
+    num_classes : int
+        Number of classes produced by `mapper`.
+    *args, **kwargs
+        Additional arguments to pass through to ``mapper()``.
+
+    Returns
+    -------
+    index : PartitionIndex
+        An index consistent with the current contents of `stash_file`.
+    """
+    filepath = FILE_FMT.format(os.path.splitext(stash_file)[0], tag)
+    fingerprint = framestore._stash_fingerprint(stash_file)
+    if os.path.exists(filepath):
+        index = PartitionIndex.load(filepath)
+        if index.source == fingerprint:
+            return index
+
+    partition_labels = util.partition(
+        biggie.Stash(stash_file), mapper, *args, **kwargs)
+    index = PartitionIndex.from_labels(
+        partition_labels, num_classes, source=fingerprint)
+    # Write and rename, so that an interrupted write leaves no index behind.
+    tmp_file = "{0}.tmp.npz".format(os.path.splitext(filepath)[0])
+    index.save(tmp_file)
+    os.rename(tmp_file, filepath)
+    return index
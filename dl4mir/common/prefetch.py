@@ -0,0 +1,260 @@
+"""Multi-process prefetching of minibatches through shared memory.
+
+Sampling, windowing and augmentation otherwise run in the same thread as
+the parameter updates. Here, each of N worker processes builds its own
+stream from a factory and fills batches into a ring of preallocated slots,
+in a memory-mapped file; the consumer receives views of these slots,
+without copying or pickling the data.
+
+The slots are sized from an explicit batch spec, if given; otherwise, the
+first worker reports the spec of its first batch before the ring is
+allocated, such that the calling process never builds a stream itself.
+
+Workers are forked from the calling process, so anything built before
+`prefetch` is called, e.g. a cached stash or a frame bank, is shared
+copy-on-write; open files, like HDF5 stashes, are better opened by the
+factory itself, in each worker.
+
+Example
+-------
+>>> stream = prefetch(D.create_chord_index_stream,
+                      args=(stash, 20, VOCAB), batch_size=50,
+                      num_workers=4, seed=123)
+>>> driver.fit(stream, hyperparams=hyperparams, **DRIVER_ARGS)
+"""
+
+import itertools
+import multiprocessing as mp
+import numpy as np
+import os
+import random
+import tempfile
+import traceback
+
+from dl4mir.common import streams
+
+# Directory of the files backing batch rings; memory-backed where available.
+RING_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+ALIGNMENT = 64
+
+
+def _batch_spec(batch):
+    """Return the {key: (shape, dtype)} of a batch of numerical arrays."""
+    spec = dict()
+    for key, value in batch.items():
+        value = np.asarray(value)
+        if not np.issubdtype(value.dtype, np.number):
+            raise ValueError("Field '{0}' is not numerical ({1}); only "
+                             "numerical batches can be prefetched."
+                             "".format(key, value.dtype))
+        spec[key] = (value.shape, value.dtype)
+    return spec
+
+
+class BatchRing(object):
+    """Ring of preallocated batch slots in a shared, memory-mapped file.
+
+    Rings are pickled by reference to their file, such that a process can
+    attach to a ring allocated after it was started.
+
+    Parameters
+    ----------
+    spec : dict
+        Shape and dtype of each field, as {key: (shape, dtype)}, where the
+        first dimension of the shape is the maximum batch size.
+    num_slots : int
+        Number of batches in the ring.
+    filepath : str, default=None
+        File of an existing ring to attach to; if None, a new one is
+        created in RING_DIR, and removed by `close`.
+    """
+    def __init__(self, spec, num_slots, filepath=None):
+        self.spec = spec
+        self.num_slots = num_slots
+        self.capacity = min([shape[0] for shape, dtype in spec.values()])
+        self._offsets = dict()
+        slot_bytes = 0
+        for key in sorted(spec):
+            shape, dtype = spec[key]
+            self._offsets[key] = slot_bytes
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            slot_bytes += -(-nbytes // ALIGNMENT) * ALIGNMENT
+        self._slot_bytes = slot_bytes
+
+        self._owner = filepath is None
+        if self._owner:
+            fd, filepath = tempfile.mkstemp(suffix=".ring", dir=RING_DIR)
+            os.close(fd)
+        self.filepath = filepath
+        num_bytes = num_slots * (slot_bytes + np.dtype(np.int64).itemsize)
+        self._data = np.memmap(filepath, dtype=np.uint8, shape=(num_bytes,),
+                               mode='w+' if self._owner else 'r+')
+        self._sizes = self._data[num_slots * slot_bytes:].view(np.int64)
+
+    def __getstate__(self):
+        return dict(spec=self.spec, num_slots=self.num_slots,
+                    filepath=self.filepath)
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def close(self):
+        """Remove the file of the ring, if created by this object."""
+        if self._owner and os.path.exists(self.filepath):
+            os.remove(self.filepath)
+
+    def arrays(self, slot):
+        """Return full-size array views of the buffers of a slot."""
+        arrays = dict()
+        for key, (shape, dtype) in self.spec.items():
+            start = slot * self._slot_bytes + self._offsets[key]
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            arrays[key] = self._data[start:start + nbytes].view(
+                dtype).reshape(shape)
+        return arrays
+
+    def put(self, slot, batch):
+        """Copy a batch into a slot."""
+        sizes = set([len(value) for value in batch.values()])
+        if len(sizes) != 1:
+            raise ValueError("Fields have different batch sizes: {0}"
+                             "".format(sizes))
+        size = sizes.pop()
+        if size > self.capacity:
+            raise ValueError("Batch of {0} exceeds the slot size of {1}."
+                             "".format(size, self.capacity))
+        for key, array in self.arrays(slot).items():
+            array[:size] = batch[key]
+        self._sizes[slot] = size
+
+    def get(self, slot):
+        """Return views of the batch in a slot."""
+        size = self._sizes[slot]
+        return dict([(key, array[:size])
+                     for key, array in self.arrays(slot).items()])
+
+
+def _worker(ring, free, full, factory, args, kwargs, batch_size, seed,
+            conn=None):
+    np.random.seed(seed)
+    random.seed(seed)
+    # Until a ring is received, report exhaustion or failure over `conn`.
+    report = full.put if ring is not None else conn.send
+    try:
+        stream = factory(*args, **kwargs)
+        if batch_size:
+            stream = streams.minibatch(stream, batch_size)
+        if ring is None:
+            batch = next(stream)
+            conn.send(_batch_spec(batch))
+            ring = conn.recv()
+            report = full.put
+            stream = itertools.chain([batch], stream)
+        while True:
+            slot = free.get()
+            ring.put(slot, next(stream))
+            full.put(slot)
+    except StopIteration:
+        report(None)
+    except Exception:
+        report(traceback.format_exc())
+
+
+def prefetch(factory, args=(), kwargs=None, batch_size=None, num_workers=2,
+             num_slots=None, seed=None, spec=None):
+    """Stream minibatches sampled by several worker processes.
+
+    Each yielded batch is a set of views into shared memory, and is only
+    valid until the next batch is requested; copy it to keep it longer.
+
+    Parameters
+    ----------
+    factory : callable
+        Function returning a stream, called as `factory(*args, **kwargs)`
+        once per worker.
+    args : tuple
+        Positional arguments for `factory`.
+    kwargs : dict, default=None
+        Keyword arguments for `factory`.
+    batch_size : int, default=None
+        If given, `factory` returns a stream of entities, which are buffered
+        into batches of this size by `streams.minibatch`; otherwise, the
+        stream already yields batches, as dicts of arrays.
+    num_workers : int, default=2
+        Number of sampling processes.
+    num_slots : int, default=None
+        Number of batches in the ring; defaults to twice `num_workers`.
+    seed : int, or list of ints, default=None
+        Seed of each worker's random number generators; an int seeds worker
+        `n` with `seed + n`. Workers are seeded from fresh entropy if None.
+    spec : dict, default=None
+        Shape and dtype of each field of a batch, as {key: (shape, dtype)},
+        where the first dimension of the shape is the maximum batch size;
+        if None, it is taken from the first batch of the first worker.
+
+    Yields
+    ------
+    batch : dict of np.ndarrays
+        Key-value object mapping fields to arrays of data.
+    """
+    kwargs = dict() if kwargs is None else kwargs
+    num_slots = 2 * num_workers if num_slots is None else num_slots
+    if seed is None:
+        seeds = np.random.RandomState().randint(2 ** 31, size=num_workers)
+    elif np.isscalar(seed):
+        seeds = [seed + n for n in range(num_workers)]
+    else:
+        seeds = list(seed)
+    if len(seeds) != num_workers:
+        raise ValueError("Expected {0} seeds, received {1}."
+                         "".format(num_workers, len(seeds)))
+
+    free, full = mp.Queue(), mp.Queue()
+    workers, ring = [], None
+
+    def start_worker(ring, seed, conn=None):
+        proc = mp.Process(target=_worker,
+                          args=(ring, free, full, factory, args, kwargs,
+                                batch_size, seed, conn))
+        proc.daemon = True
+        proc.start()
+        workers.append(proc)
+
+    try:
+        if spec is None:
+            # The first worker sizes the ring from its first batch.
+            conn, worker_conn = mp.Pipe()
+            start_worker(None, seeds[0], worker_conn)
+            spec = conn.recv()
+            if spec is None:
+                return
+            if not isinstance(spec, dict):
+                raise RuntimeError("Prefetch worker failed:\n{0}".format(spec))
+            if batch_size:
+                spec = dict([(key, ((batch_size,) + shape[1:], dtype))
+                             for key, (shape, dtype) in spec.items()])
+
+        ring = BatchRing(spec, num_slots)
+        for slot in range(num_slots):
+            free.put(slot)
+        if workers:
+            conn.send(ring)
+        for s in seeds[len(workers):]:
+            start_worker(ring, s)
+
+        num_active = num_workers
+        while num_active:
+            slot = full.get()
+            if slot is None:
+                num_active -= 1
+                continue
+            if not isinstance(slot, int):
+                raise RuntimeError("Prefetch worker failed:\n{0}".format(slot))
+            yield ring.get(slot)
+            free.put(slot)
+    finally:
+        for proc in workers:
+            proc.terminate()
+            proc.join()
+        if ring is not None:
+            ring.close()
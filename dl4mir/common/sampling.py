@@ -0,0 +1,192 @@
+"""Constant-time sampling from discrete distributions, via alias tables.
+
+Vose's alias method turns a distribution over `n` outcomes into two tables,
+after which each draw costs one uniform integer, one uniform float and one
+comparison, regardless of `n`. Here, draws are vectorized over arrays, and
+tables can be stacked, e.g. one row per conditioning class.
+
+Example
+-------
+>>> prob, alias = alias_table([0.5, 0.25, 0.25])
+>>> np.bincount(alias_draw(prob, alias, size=10000)) / 10000.0
+array([ 0.4994,  0.2508,  0.2498])
+"""
+
+import numpy as np
+
+
+def alias_table(probs):
+    """Build the alias table of a discrete distribution.
+
+    Parameters
+    ----------
+    probs : array_like, shape=(..., n)
+        Unnormalized, non-negative weights of each outcome; leading axes
+        index independent distributions.
+
+    Returns
+    -------
+    prob : np.ndarray, shape=(..., n)
+        Probability of keeping each drawn outcome.
+    alias : np.ndarray of ints, shape=(..., n)
+        Outcome to substitute when a drawn outcome is not kept.
+    """
+    probs = np.asarray(probs, dtype=float)
+    if probs.ndim > 1:
+        tables = [alias_table(p) for p in probs.reshape(-1, probs.shape[-1])]
+        return tuple([np.array(t).reshape(probs.shape) for t in zip(*tables)])
+
+    if (probs < 0).any() or probs.sum() <= 0:
+        raise ValueError("Weights must be non-negative, with a positive sum.")
+    num_outcomes = len(probs)
+    scaled = probs * num_outcomes / probs.sum()
+    prob = np.ones(num_outcomes)
+    alias = np.arange(num_outcomes)
+    small = [n for n in range(num_outcomes) if scaled[n] < 1.0]
+    large = [n for n in range(num_outcomes) if scaled[n] >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less], alias[less] = scaled[less], more
+        scaled[more] += scaled[less] - 1.0
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+    # Whatever remains has a probability of one, up to rounding error.
+    return prob, alias
+
+
+def alias_draw(prob, alias, size=None, rows=None, rng=None):
+    """Draw outcomes from an alias table.
+
+    Parameters
+    ----------
+    prob, alias : np.ndarray, shape=(n,) or (num_rows, n)
+        Alias table, as returned by `alias_table`.
+    size : int or tuple, default=None
+        Number of draws, for a single table.
+    rows : array_like of ints, default=None
+        For stacked tables, the row to draw from, once per element.
+    rng : np.random.RandomState, default=None
+        Random number generator; defaults to the global numpy state.
+
+    Returns
+    -------
+    outcomes : int, or np.ndarray of ints
+        Outcome indices, shaped `size`, or like `rows`.
+    """
+    rng = np.random if rng is None else rng
+    if rows is None:
+        outcomes = rng.randint(prob.shape[-1], size=size)
+        keep = rng.uniform(size=size) < prob[outcomes]
+        return np.where(keep, outcomes, alias[outcomes])
+
+    rows = np.asarray(rows, dtype=int)
+    outcomes = rng.randint(prob.shape[-1], size=rows.shape)
+    keep = rng.uniform(size=rows.shape) < prob[rows, outcomes]
+    return np.where(keep, outcomes, alias[rows, outcomes])
+
+
+class ClassSampler(object):
+    """Class-balanced sampler over the positions of a partition index.
+
+    Draws a class from a target distribution with an alias table, then a
+    key uniformly among those with frames of that class, then one of these
+    frames uniformly; every draw is constant-time and vectorized.
+
+    Parameters
+    ----------
+    partition_index : partition_index.PartitionIndex
+        Frame positions of each class.
+    label_set : array_like, default=None
+        Classes to sample from; defaults to all classes. Classes without any
+        frames are skipped.
+    class_probs : array_like, shape=(num_classes,), default=None
+        Target distribution over classes, renormalized over the sampled
+        classes; uniform if None.
+    balance_keys : bool, default=True
+        If True, draw keys uniformly within a class, as a mux over per-key
+        streams does; otherwise, draw frames uniformly within a class.
+    """
+    def __init__(self, partition_index, label_set=None, class_probs=None,
+                 balance_keys=True):
+        if label_set is None:
+            label_set = range(partition_index.num_classes)
+        key_ids, frames, classes = partition_index.positions(
+            np.unique(label_set))
+        if not len(classes):
+            raise ValueError("No frames to sample in the given classes.")
+        self.keys = partition_index.keys
+        self.key_ids, self.frames = key_ids, frames
+
+        # Positions are sorted by class, key and frame; split them into
+        #   groups, of one class (and key), to draw from uniformly.
+        new_group = np.concatenate([[True], classes[1:] != classes[:-1]])
+        if balance_keys:
+            new_group[1:] |= key_ids[1:] != key_ids[:-1]
+        self._group_starts = np.flatnonzero(new_group)
+        self._group_sizes = np.diff(
+            np.concatenate([self._group_starts, [len(classes)]]))
+        group_classes = classes[self._group_starts]
+        self.classes, self._class_starts = np.unique(group_classes,
+                                                     return_index=True)
+        self._class_sizes = np.diff(
+            np.concatenate([self._class_starts, [len(group_classes)]]))
+
+        if class_probs is None:
+            probs = np.ones(len(self.classes))
+        else:
+            probs = np.asarray(class_probs, dtype=float)[self.classes]
+        self.class_probs = probs / probs.sum()
+        self._prob, self._alias = alias_table(self.class_probs)
+
+    def sample(self, size=None, rng=None):
+        """Draw positions.
+
+        Parameters
+        ----------
+        size : int, default=None
+            Number of draws; a single draw if None.
+        rng : np.random.RandomState, default=None
+            Random number generator; defaults to the global numpy state.
+
+        Returns
+        -------
+        key_ids, frames, classes : ints, or np.ndarrays of ints
+            Key id (into `keys`), frame index and class of each draw.
+        """
+        rng = np.random if rng is None else rng
+        class_pos = alias_draw(self._prob, self._alias, size, rng=rng)
+        key_ids, frames = self._sample_positions(class_pos, rng)
+        return key_ids, frames, self.classes[class_pos]
+
+    def sample_classes(self, classes, rng=None):
+        """Draw positions of given classes.
+
+        Parameters
+        ----------
+        classes : array_like of ints
+            Class of each draw; must be one of `self.classes`.
+        rng : np.random.RandomState, default=None
+            Random number generator; defaults to the global numpy state.
+
+        Returns
+        -------
+        key_ids, frames : np.ndarrays of ints
+            Key id (into `keys`) and frame index of each draw.
+        """
+        rng = np.random if rng is None else rng
+        classes = np.asarray(classes, dtype=int)
+        class_pos = np.searchsorted(self.classes, classes)
+        if (self.classes[np.minimum(class_pos, len(self.classes) - 1)] !=
+                classes).any():
+            raise ValueError("Cannot sample classes without frames.")
+        return self._sample_positions(class_pos, rng)
+
+    def _sample_positions(self, class_pos, rng):
+        size = np.shape(class_pos) or None
+        groups = self._class_starts[class_pos] + np.floor(
+            rng.uniform(size=size) * self._class_sizes[class_pos]).astype(int)
+        pos = self._group_starts[groups] + np.floor(
+            rng.uniform(size=size) * self._group_sizes[groups]).astype(int)
+        return self.key_ids[pos], self.frames[pos]
@@ -0,0 +1,193 @@
+"""Vectorized run-length and segment operations over framewise sequences.
+
+Sequences are reduced to integer codes, such that change points can be found
+with a single `np.diff`, and segments are pooled with ufunc `reduceat` calls
+rather than per-segment Python loops.
+"""
+
+import numpy as np
+
+
+def label_codes(seq):
+    """Map a sequence of items to integer codes, equal items sharing a code.
+
+    Numerical arrays are returned as-is, since they can be compared directly.
+
+    Parameters
+    ----------
+    seq : array_like, shape=(N, ...)
+        Sequence of items, e.g. string labels or class indices.
+
+    Returns
+    -------
+    codes : np.ndarray, shape=(N, ...)
+        Integer (or numerical) codes for the items of `seq`.
+    """
+    seq = np.asarray(seq)
+    if seq.dtype.kind in 'biuf':
+        return seq
+    return np.unique(seq, return_inverse=True)[1]
+
+
+def run_starts(seq):
+    """Find the index at which each run of equal items begins.
+
+    Parameters
+    ----------
+    seq : array_like, shape=(N, ...)
+        Sequence of items; multidimensional numerical arrays are compared
+        along the first axis.
+
+    Returns
+    -------
+    starts : np.ndarray, shape=(num_runs,)
+        Start index of each run, beginning with 0 for a non-empty sequence.
+    """
+    codes = label_codes(seq)
+    if len(codes) == 0:
+        return np.zeros(0, dtype=int)
+    changes = np.diff(codes, axis=0) != 0
+    if changes.ndim > 1:
+        changes = changes.reshape(len(changes), -1).any(axis=1)
+    return np.concatenate([[0], np.flatnonzero(changes) + 1])
+
+
+def runs(seq):
+    """Run-length encode a sequence as (start, length) arrays.
+
+    Parameters
+    ----------
+    seq : array_like, shape=(N, ...)
+        Sequence to compress.
+
+    Returns
+    -------
+    starts : np.ndarray, shape=(num_runs,)
+        Start index of each run.
+    counts : np.ndarray, shape=(num_runs,)
+        Number of items in each run.
+    """
+    starts = run_starts(seq)
+    return starts, np.diff(np.append(starts, len(seq)))
+
+
+def compress_samples_to_intervals(labels, time_points):
+    """Compress a set of time-aligned labels via run-length encoding.
+
+    Parameters
+    ----------
+    labels : array_like
+        Set of labels of a given type.
+    time_points : array_like
+        Points in time corresponding to the given labels.
+
+    Returns
+    -------
+    intervals : np.ndarray, shape=(N, 2)
+        Start and end times, in seconds.
+    labels : list, len=N
+        String labels corresponding to the returned intervals.
+    """
+    assert len(labels) == len(time_points)
+    time_points = np.asarray(time_points)
+    if len(labels) == 0:
+        return np.zeros([0, 2], dtype=time_points.dtype), []
+    starts = run_starts(labels)
+    # Each run ends where the next begins, clipped to the last time point.
+    stops = np.minimum(np.append(starts[1:], len(labels)), len(labels) - 1)
+    intervals = np.array([time_points[starts], time_points[stops]]).T
+    return intervals.reshape(-1, 2), [labels[idx] for idx in starts]
+
+
+def compress_labeled_intervals(intervals, labels):
+    """Collapse repeated labels and the corresponding intervals.
+
+    Parameters
+    ----------
+    intervals : np.ndarray, shape=(N, 2)
+        Intervals in time, should be monotonically increasing.
+    labels : list, len=N
+        Labels corresponding to the given time intervals.
+
+    Returns
+    -------
+    intervals : np.ndarray, shape=(M, 2)
+        Merged intervals, spanning each run of repeated labels.
+    labels : list, len=M
+        Labels corresponding to the merged intervals.
+    """
+    intervals = np.asarray(intervals)
+    starts = run_starts(labels)
+    ends = np.append(starts[1:], len(labels)) - 1
+    new_intervals = np.array([intervals[starts, 0], intervals[ends, 1]]).T
+    return new_intervals.reshape(-1, 2), [labels[idx] for idx in starts]
+
+
+def _mode(x_in, axis=0):
+    """Return the most frequent sub-array of `x_in`, first seen on ties."""
+    rows = np.ascontiguousarray(x_in).reshape(len(x_in), -1)
+    view = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1])))
+    _, first, inverse = np.unique(
+        view.ravel(), return_index=True, return_inverse=True)
+    counts = np.bincount(inverse)
+    winners = np.flatnonzero(counts == counts.max())
+    return x_in[first[winners].min()]
+
+
+def boundary_pool(x_in, index_edges, axis=0, pool_func='mean'):
+    """Pool the values of an array, bounded by a set of edges.
+
+    Mean and max pooling are computed for all segments at once; median and
+    mode pooling fall back to one reduction per segment. An empty segment
+    (repeated edge) takes the value at its edge.
+
+    Parameters
+    ----------
+    x_in : np.ndarray, shape=(n_points, ...)
+        Array to pool.
+    index_edges : array_like, shape=(n_edges,)
+        Boundary indices for pooling the array.
+    axis : int, default=0
+        Axis along which to pool.
+    pool_func : str
+        Name of pooling function to use; one of {`mean`, `median`, `max`,
+        `mode`}.
+
+    Returns
+    -------
+    z_out : np.ndarray, shape=(n_edges-1, ...)
+        Pooled output array, of the same dtype as `x_in`.
+    """
+    fxs = dict(mean=None, max=None, median=np.median, mode=_mode)
+    assert pool_func in fxs, \
+        "Function '%s' unsupported. Expected one of {%s}" % (pool_func,
+                                                             fxs.keys())
+    index_edges = np.asarray(index_edges, dtype=int)
+    deltas = np.diff(index_edges)
+    if (deltas < 0).any():
+        raise ValueError("`index_edges` must be monotonically increasing.")
+
+    x_in = np.asarray(x_in)
+    axis = axis % x_in.ndim
+    x_in = np.rollaxis(x_in, axis, 0)
+    if len(deltas) == 0:
+        z_out = np.empty([0] + list(x_in.shape[1:]), dtype=x_in.dtype)
+    elif pool_func in ('mean', 'max'):
+        # Truncate the input so that the last segment ends at the last edge;
+        #   reduceat yields the value at the edge for empty segments.
+        x_trunc = x_in[:max(index_edges[-1], index_edges[-2] + 1)]
+        starts = index_edges[:-1]
+        if pool_func == 'max':
+            z_out = np.maximum.reduceat(x_trunc, starts, axis=0)
+        else:
+            counts = np.maximum(deltas, 1).reshape(
+                [-1] + [1] * (x_in.ndim - 1))
+            z_out = np.add.reduceat(
+                x_trunc, starts, axis=0, dtype=np.float64) / counts
+    else:
+        pool = fxs[pool_func]
+        z_out = np.array([pool(x_in[start:stop], axis=0) if stop > start
+                          else x_in[start]
+                          for start, stop in zip(index_edges[:-1],
+                                                 index_edges[1:])])
+    return np.rollaxis(z_out.astype(x_in.dtype), 0, axis + 1)
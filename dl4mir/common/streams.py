@@ -1,5 +1,7 @@
 from biggie import util
+import json
 import numpy as np
+import os
 import pescador
 
 
@@ -38,6 +40,96 @@ def minibatch(stream, batch_size, functions=None):
                                       filter_nulls=True)
 
 
+def stop_on_file(stream, stop_file, check_freq=50):
+    """Pass a stream through until a stop file appears.
+
+    Parameters
+    ----------
+    stream : iterator
+        Any stream, e.g. of minibatches.
+    stop_file : str
+        Path to check for; the stream ends once it exists.
+    check_freq : int, default=50
+        Number of items to yield between checks of the filesystem.
+
+    Yields
+    ------
+    value : obj
+        Values of the input stream.
+    """
+    count = 0
+    while True:
+        if count % check_freq == 0 and os.path.exists(stop_file):
+            break
+        yield next(stream)
+        count += 1
+
+
+def get_rng_state(rng=None):
+    """Return the state of a random number generator, as a JSON object.
+
+    Parameters
+    ----------
+    rng : np.random.RandomState, default=None
+        Generator to query; defaults to the global numpy generator.
+
+    Returns
+    -------
+    state : dict
+        Serializable state; see `set_rng_state`.
+    """
+    name, keys, pos, has_gauss, cached_gaussian = (
+        np.random if rng is None else rng).get_state()
+    return dict(name=name, keys=keys.tolist(), pos=int(pos),
+                has_gauss=int(has_gauss),
+                cached_gaussian=float(cached_gaussian))
+
+
+def set_rng_state(state, rng=None):
+    """Restore the state of a random number generator.
+
+    Parameters
+    ----------
+    state : dict
+        State returned by `get_rng_state`.
+    rng : np.random.RandomState, default=None
+        Generator to restore; defaults to the global numpy generator.
+    """
+    (np.random if rng is None else rng).set_state(
+        (str(state['name']), np.asarray(state['keys'], dtype=np.uint32),
+         state['pos'], state['has_gauss'], state['cached_gaussian']))
+
+
+def save_state(stream, get_state, filepath_fmt, save_freq):
+    """Pass a stream through, saving its state every so many items.
+
+    Parameters
+    ----------
+    stream : iterator
+        Any stream, e.g. of minibatches.
+    get_state : callable
+        Function returning the current state of `stream` as a JSON object.
+    filepath_fmt : str
+        Format string of the output files, given the number of items yielded
+        so far, e.g. "stream_state-{0:07d}.json".
+    save_freq : int
+        Number of items between saves.
+
+    Yields
+    ------
+    value : obj
+        Values of the input stream.
+    """
+    count = 0
+    while True:
+        value = next(stream)
+        count += 1
+        if count % save_freq == 0:
+            with open(filepath_fmt.format(count), 'w') as fp:
+                json.dump(get_state(), fp)
+        yield value
+
+
 def mux(streams, weights):
     """Multiplex multiple streams into one.
 
@@ -0,0 +1,43 @@
+import numpy as np
+import os
+
+import dl4mir.common.checkpoints as C
+import dl4mir.common.fileutil as F
+import dl4mir.common.streams as S
+
+
+def test_CheckpointWatcher():
+    tmp = F.TempDir()
+    scores = [0.1, 0.3, 0.2, 0.25, 0.5]
+    for n in range(len(scores)):
+        np.savez(os.path.join(tmp.path, "params-{0:02}.npz".format(n)))
+
+    def evaluate(param_file):
+        return scores[int(param_file[-6:-4])]
+
+    record_file = os.path.join(tmp.path, "record.json")
+    stop_file = os.path.join(tmp.path, "STOP")
+    watcher = C.CheckpointWatcher(tmp.path, evaluate, record_file,
+                                  patience=2, stop_file=stop_file,
+                                  settle_time=0.0)
+    assert watcher.run(poll_interval=0.0)
+    assert len(watcher.scores) == 4
+    assert watcher.best_param_file.endswith("params-01.npz")
+    assert C.stop_requested(stop_file)
+
+    watcher = C.CheckpointWatcher(tmp.path, evaluate, record_file,
+                                  settle_time=0.0)
+    assert watcher.best_score == 0.3
+    assert len(watcher.update()) == 1
+    assert watcher.best_param_file.endswith("params-04.npz")
+    tmp.close()
+
+
+def test_stop_on_file():
+    tmp = F.TempDir()
+    stop_file = os.path.join(tmp.path, "STOP")
+    stream = S.stop_on_file(iter(range(100)), stop_file, check_freq=5)
+    assert [next(stream) for n in range(7)] == range(7)
+    C.request_stop(stop_file)
+    assert list(stream) == range(7, 10)
+    tmp.close()
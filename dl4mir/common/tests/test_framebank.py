@@ -0,0 +1,70 @@
+import json
+import numpy as np
+import os
+
+import dl4mir.common.fileutil as F
+import dl4mir.common.framebank as FB
+import dl4mir.common.streams as S
+import dl4mir.common.util as U
+
+
+def test_FrameBank():
+    arrays = [np.random.uniform(size=(2, n, 5)) for n in [3, 8, 1]]
+    bank = FB.FrameBank(arrays, win_length=4, frame_axis=1)
+    assert bank.window_shape == (2, 4, 5)
+
+    track_idx = np.array([0, 0, 1, 1, 2])
+    frame_idx = np.array([0, 2, 0, 7, 0])
+    data = bank.gather(bank.rows(track_idx, frame_idx))
+    for x, t, f in zip(data, track_idx, frame_idx):
+        expected = np.array([U.slice_tile(a, f, 4) for a in arrays[t]])
+        np.testing.assert_array_almost_equal(x, expected)
+
+    # Batches are written in place, whatever the layout of the bank.
+    for frame_axis, shape in [(0, (3, 2)), (1, (1, 3, 2)), (1, (2, 3, 2))]:
+        arrays = [np.random.uniform(size=shape) for n in range(2)]
+        bank = FB.FrameBank(arrays, win_length=3, frame_axis=frame_axis)
+        rows = bank.rows([0, 1, 1, 0], [0, 2, 1, 1])
+        out = np.empty((4,) + bank.window_shape, dtype=bank.dtype)
+        assert bank.gather(rows, out=out) is out
+        np.testing.assert_array_equal(out, bank.windows[rows])
+
+
+def test_batch_stream():
+    arrays = [np.arange(n, dtype=float).reshape(1, n, 1) for n in [4, 6]]
+    bank = FB.FrameBank(arrays, win_length=1, frame_axis=1)
+    rows = bank.rows([0, 1, 1], [3, 0, 5])
+    stream = FB.batch_stream(bank, rows, [7, 8, 9], batch_size=10)
+    for n in range(3):
+        batch = next(stream)
+        assert batch['data'].shape == (10, 1, 1, 1)
+        assert batch['data'].dtype == np.float32
+        assert batch['class_idx'].dtype == np.int32
+        values = dict([(3.0, 7), (0.0, 8), (5.0, 9)])
+        for x, y in zip(batch['data'].flatten(), batch['class_idx']):
+            assert values[x] == y
+
+
+def test_BatchStream_resume():
+    arrays = [np.random.uniform(size=(1, n, 3)) for n in [5, 9]]
+    bank = FB.FrameBank(arrays, win_length=3, frame_axis=1)
+    rows = bank.rows([0, 0, 1, 1, 1], [0, 4, 2, 5, 8])
+    stream = FB.batch_stream(bank, rows, range(5), batch_size=4, seed=3)
+    next(stream)
+    state = json.loads(json.dumps(stream.get_state()))
+    expected = [next(stream)['class_idx'].copy() for n in range(3)]
+
+    resumed = FB.batch_stream(bank, rows, range(5), batch_size=4)
+    resumed.set_state(state)
+    for class_idx in expected:
+        np.testing.assert_array_equal(next(resumed)['class_idx'], class_idx)
+    assert resumed.num_batches == stream.num_batches == 4
+
+
+def test_save_state():
+    tmp = F.TempDir()
+    fmt = os.path.join(tmp.path, "state-{0}.json")
+    stream = S.save_state(iter(range(10)), lambda: dict(value=1), fmt, 4)
+    assert list(stream) == range(10)
+    assert sorted(os.listdir(tmp.path)) == ['state-4.json', 'state-8.json']
+    tmp.close()
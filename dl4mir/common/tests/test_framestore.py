@@ -0,0 +1,71 @@
+import biggie
+import numpy as np
+import os
+import pickle
+
+import dl4mir.common.fileutil as futil
+import dl4mir.common.framestore as FS
+
+
+def _create_stash():
+    return dict(
+        a=biggie.Entity(cqt=np.random.normal(size=(2, 5, 3)),
+                        time_points=np.arange(5) / 20.0),
+        b=biggie.Entity(cqt=np.random.normal(size=(2, 7, 3)),
+                        time_points=np.arange(7) / 20.0))
+
+
+def test_create_framestore():
+    stash = _create_stash()
+    tmpdir = futil.TempDir()
+    store = FS.create_framestore(
+        stash, os.path.join(tmpdir.path, "test.frames"),
+        fields=['cqt', 'time_points'], frame_axes=dict(cqt=1),
+        keys=['a', 'b'])
+
+    assert store.keys() == ['a', 'b']
+    assert store.num_frames('b') == 7
+    assert store.offsets('b') == (5, 12)
+    assert store.array('cqt').shape == (12, 2, 3)
+    for key in stash:
+        entity = store.get(key)
+        np.testing.assert_array_equal(entity.cqt, stash[key].cqt)
+        np.testing.assert_array_equal(entity.time_points,
+                                      stash[key].time_points)
+
+
+def test_framestore_pickles_by_path():
+    stash = _create_stash()
+    tmpdir = futil.TempDir()
+    store = FS.create_framestore(
+        stash, os.path.join(tmpdir.path, "test.frames"), fields=['cqt'],
+        frame_axes=dict(cqt=1))
+    store.get('a')
+
+    state = pickle.dumps(store)
+    assert len(state) < 256
+    np.testing.assert_array_equal(pickle.loads(state).get('a').cqt,
+                                  stash['a'].cqt)
+
+
+def test_framestore_label_codes():
+    stash = dict(
+        a=biggie.Entity(cqt=np.random.normal(size=(1, 3, 2)),
+                        chord_labels=np.array(['N', 'C:maj', 'N'])),
+        b=biggie.Entity(cqt=np.random.normal(size=(1, 2, 2)),
+                        chord_labels=np.array(['A:min', 'C:maj'])))
+    tmpdir = futil.TempDir()
+    store = FS.create_framestore(
+        stash, os.path.join(tmpdir.path, "test.frames"),
+        fields=['cqt', 'chord_labels'], frame_axes=dict(cqt=1),
+        dtypes=dict(cqt=np.float32), keys=['a', 'b'])
+
+    assert store.array('cqt').dtype == np.float32
+    assert store.array('chord_labels').dtype == np.int16
+    assert store.label_table('chord_labels').tolist() == [
+        'A:min', 'C:maj', 'N']
+    np.testing.assert_array_equal(store.get_codes('b', 'chord_labels'),
+                                  [0, 1])
+    for key in stash:
+        np.testing.assert_array_equal(store.get(key).chord_labels,
+                                      stash[key].chord_labels)
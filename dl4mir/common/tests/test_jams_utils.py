@@ -0,0 +1,104 @@
+import numpy as np
+import os
+import pickle
+import pyjams
+
+import dl4mir.common.fileutil as futil
+import dl4mir.common.jams_utils as J
+
+
+def _chord_jam(labels, annotator=None, **sandbox):
+    annot = pyjams.RangeAnnotation()
+    if annotator is not None:
+        annot.sandbox.update(annotator=annotator)
+    starts = [float(n) for n in range(len(labels))]
+    pyjams.util.fill_range_annotation_data(
+        starts, [t + 1.0 for t in starts], labels, annot)
+    for n, obs in enumerate(annot.data):
+        obs.label.confidence = n / 10.0
+    jam = pyjams.JAMS(chord=[annot])
+    jam.sandbox.update(**sandbox)
+    return jam
+
+
+def _labels(jam):
+    return [str(l) for l in jam.chord[0].labels.value]
+
+
+def test_jamset_stream_resume():
+    tmpdir = futil.TempDir()
+    stream_file = os.path.join(tmpdir.path, "output.jamsl")
+    with J.JAMSetWriter(stream_file) as writer:
+        writer.add('a', _chord_jam(['N', 'C:maj']))
+        writer.add('b', _chord_jam(['A:min']))
+
+    # A crash mid-write leaves a partial record behind.
+    with open(stream_file, 'a') as fp:
+        fp.write('{"key": "c", "jams": {"chord": [')
+    assert J.jamset_stream_keys(stream_file) == set(['a', 'b'])
+
+    # Resuming drops the partial record; a repeated key supersedes.
+    with J.JAMSetWriter(stream_file) as writer:
+        writer.add('a', _chord_jam(['G:maj']))
+    jamset = J.load_jamset_stream(stream_file)
+    assert set(jamset.keys()) == set(['a', 'b'])
+    assert _labels(jamset['a']) == ['G:maj']
+
+    # Corrupt, complete records are skipped, not the rest of the stream.
+    with open(stream_file, 'a') as fp:
+        fp.write('not a record\n')
+    with J.JAMSetWriter(stream_file) as writer:
+        writer.add('d', _chord_jam(['E:min']))
+    assert J.jamset_stream_keys(stream_file) == set(['a', 'b', 'd'])
+
+    packed_file = os.path.join(tmpdir.path, "output.jamz")
+    J.pack_jamset_stream(stream_file, packed_file)
+    packed = J.PackedJAMSet(packed_file)
+    assert sorted(packed.keys()) == ['a', 'b', 'd']
+    assert packed.labeled_intervals('a')[1] == ['G:maj']
+    assert packed.labeled_intervals('b')[1] == ['A:min']
+    tmpdir.close()
+
+
+def test_pack_jamset():
+    tmpdir = futil.TempDir()
+    jamset = dict(a=_chord_jam(['N', 'C:maj', 'N'], annotator='x', src='1'),
+                  b=_chord_jam(['A:min'], src='2'))
+    packed_file = os.path.join(tmpdir.path, "jamset.jamz")
+    J.pack_jamset(jamset, packed_file)
+    packed = J.open_jamset(packed_file)
+
+    assert isinstance(packed, J.PackedJAMSet)
+    assert packed.keys() == ['a', 'b']
+    assert len(packed) == 2 and 'a' in packed and 'c' not in packed
+    for key, jam in jamset.items():
+        annot = jam.chord[0]
+        np.testing.assert_array_equal(packed.intervals(key),
+                                      np.asarray(annot.intervals))
+        labels = packed.label_table[packed.label_codes(key)].tolist()
+        assert labels == _labels(jam)
+        np.testing.assert_array_almost_equal(
+            packed.confidence(key),
+            [obs.label.confidence for obs in annot.data])
+        assert J.chord_labeled_intervals(packed, key)[1] == _labels(jam)
+
+    # Codes index into a shared table of unique labels.
+    assert sorted(packed.label_table.tolist()) == ['A:min', 'C:maj', 'N']
+    assert len(set(packed.label_codes('a'))) == 2
+
+    jam = packed.get('a')
+    assert _labels(jam) == ['N', 'C:maj', 'N']
+    assert jam.sandbox.src == '1'
+    assert jam.chord[0].sandbox.annotator == 'x'
+    assert packed['b'].sandbox.src == '2'
+
+    unpickled = pickle.loads(pickle.dumps(packed))
+    assert unpickled.filepath == packed_file
+    np.testing.assert_array_equal(unpickled.intervals('b'),
+                                  packed.intervals('b'))
+
+    empty_file = os.path.join(tmpdir.path, "empty.jamz")
+    J.pack_jamset(dict(), empty_file)
+    empty = J.PackedJAMSet(empty_file)
+    assert len(empty) == 0 and empty.keys() == []
+    tmpdir.close()
@@ -0,0 +1,32 @@
+import numpy as np
+
+import dl4mir.common.partition_index as PI
+import dl4mir.common.fileutil as F
+import dl4mir.common.util as U
+
+
+def test_PartitionIndex():
+    partition_labels = dict(a=np.array([0, 2, None, 1, 2], dtype=object),
+                            b=np.array([2, 2, 0]),
+                            c=np.array([None, None], dtype=object))
+    index = PI.PartitionIndex.from_labels(partition_labels, 3)
+    np.testing.assert_array_equal(index.counts(), [2, 1, 4])
+
+    for label_set in [[0], [2], [0, 1], [1, 2, 5]]:
+        expected = U.index_partition_arrays(partition_labels, label_set)
+        actual = index.subindex(label_set)
+        assert sorted(actual.keys()) == sorted(expected.keys())
+        for key in expected:
+            np.testing.assert_array_equal(actual[key], expected[key])
+
+    key_ids, frames, classes = index.positions([2])
+    assert [index.keys[k] for k in key_ids] == ['a', 'a', 'b', 'b']
+    np.testing.assert_array_equal(frames, [1, 4, 0, 1])
+
+    tmp = F.TempFile('.npz')
+    index.source = [10, 20]
+    index.save(tmp.path)
+    index2 = PI.PartitionIndex.load(tmp.path)
+    assert index2.keys == index.keys and index2.source == [10, 20]
+    np.testing.assert_array_equal(index2.frames, index.frames)
+    tmp.close()
@@ -0,0 +1,47 @@
+import numpy as np
+import os
+
+import dl4mir.common.prefetch as P
+
+
+def _batch_stream(num_batches, batch_size, parent_pid=None):
+    # Streams are only ever built in the workers.
+    assert os.getpid() != parent_pid
+    for n in range(num_batches):
+        yield dict(data=np.random.uniform(size=(batch_size, 2, 3)),
+                   class_idx=np.arange(batch_size, dtype=np.int32) + n)
+
+
+def test_prefetch():
+    args = (5, 4, os.getpid())
+    stream = P.prefetch(_batch_stream, args=args, num_workers=2, seed=0)
+    batches = [dict([(k, v.copy()) for k, v in b.items()]) for b in stream]
+    # Five batches from each worker.
+    assert len(batches) == 10
+    for batch in batches:
+        assert batch['data'].shape == (4, 2, 3)
+        assert batch['class_idx'].dtype == np.int32
+
+    # Seeded workers draw the same data, in some order, with or without an
+    #   explicit spec.
+    spec = dict(data=((4, 2, 3), np.float64), class_idx=((4,), np.int32))
+    rerun = [b['data'].sum() for b in P.prefetch(
+        _batch_stream, args=args, num_workers=2, seed=0, spec=spec)]
+    np.testing.assert_array_almost_equal(
+        sorted(rerun), sorted([b['data'].sum() for b in batches]))
+
+    assert not list(P.prefetch(_batch_stream, args=(0, 4), num_workers=2))
+
+
+def test_BatchRing():
+    spec = dict(data=((4, 3), np.float32), class_idx=((4,), np.int16))
+    ring = P.BatchRing(spec, 2)
+    ring.put(1, dict(data=np.ones([2, 3]), class_idx=np.arange(2)))
+    attached = P.BatchRing(**ring.__getstate__())
+    batch = attached.get(1)
+    np.testing.assert_array_equal(batch['data'], np.ones([2, 3]))
+    np.testing.assert_array_equal(batch['class_idx'], np.arange(2))
+    attached.close()
+    assert os.path.exists(ring.filepath)
+    ring.close()
+    assert not os.path.exists(ring.filepath)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from dl4mir.common.partition_index import PartitionIndex
+import dl4mir.common.sampling as S
+
+
+def test_alias_table():
+    probs = np.array([0.5, 0.0, 0.1, 0.4])
+    prob, alias = S.alias_table(probs * 3)
+    # Each outcome's probability is its kept mass plus its aliased mass.
+    recovered = prob / len(probs)
+    for n in range(len(probs)):
+        recovered[alias[n]] += (1.0 - prob[n]) / len(probs)
+    np.testing.assert_array_almost_equal(recovered, probs)
+
+    np.random.seed(12)
+    draws = S.alias_draw(prob, alias, size=20000)
+    np.testing.assert_array_almost_equal(
+        np.bincount(draws, minlength=4) / 20000.0, probs, decimal=2)
+
+
+def test_alias_draw_rows():
+    probs = np.array([[1.0, 0.0, 0.0], [0.0, 0.0, 2.0]])
+    prob, alias = S.alias_table(probs)
+    assert prob.shape == alias.shape == probs.shape
+    rows = np.array([0, 1, 1, 0, 1])
+    np.testing.assert_array_equal(
+        S.alias_draw(prob, alias, rows=rows), [0, 2, 2, 0, 2])
+
+
+def test_ClassSampler():
+    labels = dict(a=[0, 0, 0, 0, 1], b=[1, 2, 2, None], c=[0])
+    index = PartitionIndex.from_labels(labels, num_classes=4)
+    sampler = S.ClassSampler(index)
+    np.testing.assert_array_equal(sampler.classes, [0, 1, 2])
+
+    key_ids, frames, classes = sampler.sample(30000, np.random.RandomState(3))
+    np.testing.assert_array_almost_equal(
+        np.bincount(classes) / 30000.0, [1 / 3.0] * 3, decimal=2)
+    for key_id, frame, y in zip(key_ids, frames, classes):
+        assert labels[sampler.keys[key_id]][frame] == y
+    # Keys are balanced within a class: 'c' has one of five class-0 frames.
+    is_c = key_ids[classes == 0] == sampler.keys.index('c')
+    np.testing.assert_almost_equal(is_c.mean(), 0.5, decimal=1)
+
+    sampler = S.ClassSampler(index, label_set=[0, 2], class_probs=[1, 0, 3, 0],
+                             balance_keys=False)
+    classes = sampler.sample(20000)[2]
+    np.testing.assert_almost_equal((classes == 2).mean(), 0.75, decimal=1)
+
+
+def test_ClassSampler_sample_classes():
+    labels = dict(a=[0, 0, 1, 1, 1], b=[1, 2, 2, None])
+    sampler = S.ClassSampler(PartitionIndex.from_labels(labels, 4))
+    classes = np.array([2, 0, 1, 2, 1] * 20)
+    key_ids, frames = sampler.sample_classes(classes)
+    for key_id, frame, y in zip(key_ids, frames, classes):
+        assert labels[sampler.keys[key_id]][frame] == y
+
+    np.testing.assert_raises(ValueError, sampler.sample_classes, [3])
@@ -0,0 +1,39 @@
+import numpy as np
+
+import dl4mir.common.segment as S
+
+
+def test_runs():
+    starts, counts = S.runs(['a', 'a', 'b', 'a', 'a', 'a'])
+    np.testing.assert_array_equal(starts, [0, 2, 3])
+    np.testing.assert_array_equal(counts, [2, 1, 3])
+
+    starts, counts = S.runs(np.array([[0, 1], [0, 1], [1, 1]]))
+    np.testing.assert_array_equal(starts, [0, 2])
+    np.testing.assert_array_equal(counts, [2, 1])
+    assert len(S.run_starts([])) == 0
+
+
+def test_compress_samples_to_intervals():
+    intervals, labels = S.compress_samples_to_intervals(
+        ['a', 'a', 'b', 'b', 'c'], np.arange(5) / 10.0)
+    np.testing.assert_array_equal(
+        intervals, np.array([[0.0, 0.2], [0.2, 0.4], [0.4, 0.4]]))
+    assert labels == ['a', 'b', 'c']
+
+    intervals, labels = S.compress_samples_to_intervals([], [])
+    assert intervals.shape == (0, 2)
+    assert labels == []
+
+
+def test_boundary_pool():
+    x_in = np.array([[1, 2, 3, 4, 5, 6]], dtype=float).T
+    edges = [0, 2, 2, 6]
+    np.testing.assert_array_equal(
+        S.boundary_pool(x_in, edges, pool_func='mean'), [[1.5], [3], [4.5]])
+    np.testing.assert_array_equal(
+        S.boundary_pool(x_in.T, edges, axis=1, pool_func='max'),
+        [[2, 3, 6]])
+    np.testing.assert_array_equal(
+        S.boundary_pool(np.array([1, 1, 2, 3, 3, 3]), [0, 3, 6], 0, 'mode'),
+        [1, 3])
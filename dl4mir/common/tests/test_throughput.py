@@ -0,0 +1,52 @@
+import json
+import os
+import time
+
+import dl4mir.common.fileutil as futil
+import dl4mir.common.throughput as T
+
+
+def _slow_source():
+    while True:
+        time.sleep(0.002)
+        yield 1
+
+
+def _drop_odd(stream):
+    for n, value in enumerate(stream):
+        yield None if n % 2 else value
+
+
+def test_stage_disabled():
+    os.environ.pop(T.PROFILE_ENV, None)
+    stream = iter(range(3))
+    assert T.source('src', stream) is stream
+    assert list(T.stage('list', list, stream)) == range(3)
+
+
+def test_stage_report():
+    tmpdir = futil.TempDir()
+    os.environ[T.PROFILE_ENV] = os.path.join(tmpdir.path, "stats-{pid}.json")
+    os.environ[T.INTERVAL_ENV] = "0"
+    try:
+        stream = T.source('source', _slow_source())
+        stream = T.stage('drop_odd', _drop_odd, stream)
+        for n in range(20):
+            next(stream)
+        T.report()
+    finally:
+        os.environ.pop(T.PROFILE_ENV)
+        os.environ.pop(T.INTERVAL_ENV)
+        T._STAGES[:] = []
+
+    report_file = os.path.join(tmpdir.path,
+                               "stats-{0}.json".format(os.getpid()))
+    stats = dict([(s['name'], s)
+                  for s in json.load(open(report_file))['stages']])
+    assert stats['drop_odd']['items'] == 10
+    assert stats['drop_odd']['none_rate'] == 0.5
+    # The sleeping happens upstream of the dropping stage.
+    assert stats['drop_odd']['inside_fraction'] < 0.5
+    assert stats['source']['inside_fraction'] == 1.0
+    assert stats['source']['items'] == 20
+    tmpdir.close()
@@ -62,3 +62,25 @@ def test_convolve():
 
     np.testing.assert_equal(z.x_out, np.arange(10))
     np.testing.assert_equal(z.y, y)
+
+
+def test_window_frames():
+    x_in = np.random.uniform(size=(2, 7, 5)).astype(np.float32)
+    for length in [1, 4, 5, 10]:
+        for idx in range(x_in.shape[1]):
+            expected = np.array([U.slice_tile(x, idx, length) for x in x_in])
+            x_win = U.window_frames(x_in, idx, length, axis=1)
+            np.testing.assert_array_equal(x_win, expected)
+            assert x_win.dtype == x_in.dtype
+
+        x_pad = U.pad_frames(x_in, length, axis=1)
+        windows = U.frame_windows(x_pad, length, axis=1)
+        assert len(windows) == x_in.shape[1]
+        np.testing.assert_array_equal(
+            windows[3], U.window_view(x_pad, 3, length, axis=1))
+
+    # In-bounds windows are read-only views of the input.
+    x_win = U.window_frames(x_in, 3, 5, axis=1)
+    assert np.may_share_memory(x_win, x_in)
+    assert not x_win.flags.writeable
+    assert not np.may_share_memory(U.window_frames(x_in, 0, 5, axis=1), x_in)
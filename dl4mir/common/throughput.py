@@ -0,0 +1,159 @@
+"""Per-stage throughput instrumentation of stream pipelines.
+
+Profiling is switched on by setting the environment variable named by
+`PROFILE_ENV`; otherwise, `stage` and `source` return their stream as-is,
+and cost nothing per item. Its value selects the output:
+
+  * "1" prints a report to the console;
+  * any other value is a path, to which each report is (over)written as
+    JSON; "{pid}" in the path is replaced by the process id, e.g. to keep
+    apart the reports of prefetching workers.
+
+Reports are made at most every `INTERVAL_ENV` seconds (default 30), and
+list, for every stage: items per second, the time spent inside the stage
+versus waiting on its upstream stream, and the rate of None items (dropped
+samples) among its outputs.
+
+Example
+-------
+$ DL4MIR_PROFILE_STREAMS=/tmp/streams-{pid}.json python driver.py ...
+
+>>> stream = throughput.source('mux', pescador.mux(pool, None, 50, lam=25))
+>>> stream = throughput.stage('map_to_class_index', FX.map_to_class_index,
+                              stream, index_mapper, lexicon)
+"""
+
+from __future__ import print_function
+import atexit
+import json
+import os
+import time
+
+PROFILE_ENV = "DL4MIR_PROFILE_STREAMS"
+INTERVAL_ENV = "DL4MIR_PROFILE_INTERVAL"
+
+_STAGES = []
+_LAST_REPORT = [None]
+_EXIT_REPORT = []
+
+
+def enabled():
+    """Return True if stream profiling is switched on."""
+    return os.environ.get(PROFILE_ENV, '') not in ['', '0']
+
+
+class StageStats(object):
+    """Running counts and timings of a stage."""
+    def __init__(self, name):
+        self.name = name
+        self.num_items = 0
+        self.num_nones = 0
+        self.total_time = 0.0
+        self.upstream_time = 0.0
+        self.start_time = None
+
+    def summary(self):
+        """Return the statistics of the stage so far, as a JSON object."""
+        elapsed = time.time() - self.start_time if self.start_time else 0.0
+        num_outputs = self.num_items + self.num_nones
+        return dict(
+            name=self.name,
+            items=self.num_items,
+            items_per_sec=self.num_items / elapsed if elapsed else 0.0,
+            inside_time=self.total_time - self.upstream_time,
+            upstream_time=self.upstream_time,
+            inside_fraction=(1.0 - self.upstream_time / self.total_time
+                             if self.total_time else 0.0),
+            none_rate=(self.num_nones / float(num_outputs)
+                       if num_outputs else 0.0))
+
+
+def report():
+    """Write (or print) the statistics of all stages of this process."""
+    if not enabled() or not _STAGES:
+        return
+    stats = [s.summary() for s in _STAGES]
+    output = os.environ.get(PROFILE_ENV, '')
+    if output == '1':
+        print("[{0}] Stream throughput".format(time.asctime()))
+        for s in stats:
+            print("  {name:>24}: {items:>10d} items, {items_per_sec:10.1f}/s,"
+                  " {inside_fraction:6.1%} inside, {none_rate:6.1%} None"
+                  "".format(**s))
+        return
+    filepath = output.replace("{pid}", str(os.getpid()))
+    with open(filepath + ".tmp", 'w') as fp:
+        json.dump(dict(time=time.time(), stages=stats), fp, indent=2)
+    os.rename(filepath + ".tmp", filepath)
+
+
+def _maybe_report(now):
+    if _LAST_REPORT[0] is None:
+        _LAST_REPORT[0] = now
+    elif now - _LAST_REPORT[0] >= float(os.environ.get(INTERVAL_ENV, 30)):
+        _LAST_REPORT[0] = now
+        report()
+
+
+def _timed_upstream(stream, stats):
+    """Pass a stream through, adding the time spent in it to `stats`."""
+    while True:
+        start = time.time()
+        value = next(stream)
+        stats.upstream_time += time.time() - start
+        yield value
+
+
+def _profiled(stream, stats):
+    """Pass a stream through, counting and timing its items."""
+    if not _EXIT_REPORT:
+        _EXIT_REPORT.append(atexit.register(report))
+    _STAGES.append(stats)
+    while True:
+        start = time.time()
+        if stats.start_time is None:
+            stats.start_time = start
+        value = next(stream)
+        now = time.time()
+        stats.total_time += now - start
+        if value is None:
+            stats.num_nones += 1
+        else:
+            stats.num_items += 1
+        _maybe_report(now)
+        yield value
+
+
+def stage(name, stage_func, stream, *args, **kwargs):
+    """Apply a stream stage, instrumented if profiling is enabled.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage, for reports.
+    stage_func : callable
+        Stream stage, called as `stage_func(stream, *args, **kwargs)`, e.g.
+        `pipefxs.map_to_class_index` or `streams.minibatch`.
+    stream : iterator
+        Input stream of the stage.
+    *args, **kwargs
+        Further arguments passed through to ``stage_func()``.
+
+    Returns
+    -------
+    stream : iterator
+        Output stream of the stage.
+    """
+    if not enabled():
+        return stage_func(stream, *args, **kwargs)
+    stats = StageStats(name)
+    return _profiled(stage_func(_timed_upstream(stream, stats),
+                                *args, **kwargs), stats)
+
+
+def source(name, stream):
+    """Instrument a stream without an upstream, e.g. a mux, if profiling is
+    enabled; all of its time counts as inside the stage."""
+    if not enabled():
+        return stream
+    return _profiled(stream, StageStats(name))
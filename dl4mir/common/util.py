@@ -1,6 +1,5 @@
 from __future__ import print_function
 import biggie
-from itertools import groupby
 import numpy as np
 import optimus
 import os
@@ -9,6 +8,10 @@ import shutil
 from sklearn.cross_validation import KFold
 import time
 
+from dl4mir.common import segment
+
+CODE_SUFFIX = "_codes"
+
 
 def hwr(x):
     return x * (x > 0.0)
@@ -119,34 +122,19 @@ def boundary_pool(x_in, index_edges, axis=0, pool_func='mean'):
     index_edges : array_like, shape=(n_edges,)
         Boundary indices for pooling the array.
     pool_func : str
-        Name of pooling function to use; one of {`mean`, `median`, `max`}.
+        Name of pooling function to use; one of {`mean`, `median`, `max`,
+        `mode`}.
 
     Returns
     -------
     z_out : np.ndarray, shape=(n_edges-1, ...)
         Pooled output array.
+
+    See Also
+    --------
+    dl4mir.common.segment.boundary_pool
     """
-    fxs = dict(mean=np.mean, max=np.max, median=np.median, mode=mode2)
-    assert pool_func in fxs, \
-        "Function '%s' unsupported. Expected one of {%s}" % (pool_func,
-                                                             fxs.keys())
-    pool = fxs[pool_func]
-    num_points = len(index_edges) - 1
-    axes_order = range(x_in.ndim)
-    axes_order.insert(0, axes_order.pop(axis))
-    axes_reorder = np.array(axes_order).argsort()
-    x_in = x_in.transpose(axes_order)
-
-    z_out = np.empty([num_points] + list(x_in.shape[1:]), dtype=x_in.dtype)
-    for idx, delta in enumerate(np.diff(index_edges)):
-        if delta > 0:
-            z = pool(x_in[index_edges[idx]:index_edges[idx + 1]], axis=0)
-        elif delta == 0:
-            z = x_in[index_edges[idx]]
-        else:
-            raise ValueError("`index_edges` must be monotonically increasing.")
-        z_out[idx, ...] = z
-    return z_out.transpose(axes_reorder)
+    return segment.boundary_pool(x_in, index_edges, axis, pool_func)
 
 
 def normalize(x, axis=None):
@@ -300,7 +288,8 @@ def run_length_encode(seq):
     comp_seq : list
         Compressed sequence containing (item, count) tuples.
     """
-    return [(obj, len(list(group))) for obj, group in groupby(seq)]
+    starts, counts = segment.runs(seq)
+    return [(seq[idx], count) for idx, count in zip(starts, counts.tolist())]
 
 
 def run_length_decode(comp_seq):
@@ -353,6 +342,129 @@ def slice_tile(x_in, idx, length):
     return tile
 
 
+def pad_frames(x_in, length, axis=0):
+    """Zero-pad an array such that every centered window of `length` frames
+    is in bounds.
+
+    Frame `idx` of the input is the first frame of its window in the output;
+    windows match those of `slice_tile`, without the cost of padding for
+    every slice.
+
+    Parameters
+    ----------
+    x_in : np.ndarray
+        Array to pad.
+    length : int
+        Length of the windows to take.
+    axis : int, default=0
+        Axis along which frames are indexed.
+
+    Returns
+    -------
+    x_pad : np.ndarray
+        Padded copy of `x_in`, with `length - 1` more frames.
+    """
+    pad_width = [(0, 0)] * x_in.ndim
+    pad_width[axis] = (length / 2, length - length / 2 - 1)
+    return np.pad(x_in, pad_width, mode='constant')
+
+
+def window_view(x_pad, idx, length, axis=0):
+    """Return a window of a padded array as a view, without copying.
+
+    Parameters
+    ----------
+    x_pad : np.ndarray
+        Array padded by `pad_frames`.
+    idx : int
+        Centered frame index of the window, in the unpadded array.
+    length : int
+        Length of the window; must match the padding.
+    axis : int, default=0
+        Axis along which frames are indexed.
+
+    Returns
+    -------
+    x_win : np.ndarray
+        View of the window, with `length` frames along `axis`.
+    """
+    index = [slice(None)] * x_pad.ndim
+    index[axis] = slice(idx, idx + length)
+    return x_pad[tuple(index)]
+
+
+def frame_windows(x_pad, length, axis=0):
+    """Return every window of a padded array as one strided view.
+
+    Indexing the result with an array of frame indices gathers a batch of
+    windows with a single copy.
+
+    Parameters
+    ----------
+    x_pad : np.ndarray
+        Array padded by `pad_frames`.
+    length : int
+        Length of the windows; must match the padding.
+    axis : int, default=0
+        Axis along which frames are indexed.
+
+    Returns
+    -------
+    windows : np.ndarray, shape=(num_frames,) + window_shape
+        Read-only view, where `windows[idx]` is `window_view(x_pad, idx,
+        length, axis)`.
+    """
+    shape = list(x_pad.shape)
+    shape[axis] = length
+    shape = [x_pad.shape[axis] - length + 1] + shape
+    strides = [x_pad.strides[axis]] + list(x_pad.strides)
+    windows = np.lib.stride_tricks.as_strided(x_pad, shape, strides)
+    windows.flags.writeable = False
+    return windows
+
+
+def window_frames(x_in, idx, length, axis=0):
+    """Extract a centered, zero-padded window from an array.
+
+    Equivalent in value to `slice_tile` (along `axis`), but nothing is padded
+    unless the window runs over an edge: in-bounds windows are read-only
+    views of `x_in`, and only edge windows are copied into zeros.
+
+    Parameters
+    ----------
+    x_in : np.ndarray
+        Array to window.
+    idx : int
+        Centered frame index of the window.
+    length : int
+        Length of the window.
+    axis : int, default=0
+        Axis along which frames are indexed.
+
+    Returns
+    -------
+    x_win : np.ndarray
+        Window, with `length` frames along `axis`.
+    """
+    start_idx = idx - length / 2
+    end_idx = start_idx + length
+    num_frames = x_in.shape[axis]
+    index = [slice(None)] * x_in.ndim
+    index[axis] = slice(max(start_idx, 0), min(end_idx, num_frames))
+    x_win = x_in[tuple(index)]
+    if start_idx >= 0 and end_idx <= num_frames:
+        x_win.flags.writeable = False
+        return x_win
+
+    shape = list(x_in.shape)
+    shape[axis] = length
+    tile = np.zeros(shape, dtype=x_in.dtype)
+    index[axis] = slice(max(-start_idx, 0),
+                        max(-start_idx, 0) + x_win.shape[axis])
+    tile[tuple(index)] = x_win
+    return tile
+
+
 def stratify(items, num_folds, valid_ratio=0.1):
     """Stratify a collection of items `num_folds` times into partitions for
     train, validation, and test.
@@ -516,8 +628,32 @@ def slice_cqt_entity(entity, length, idx=None):
         The windowed chord observation.
     """
     idx = np.random.randint(entity.cqt.shape[1]) if idx is None else idx
-    cqt = np.array([slice_tile(x, idx, length) for x in entity.cqt])
-    return biggie.Entity(cqt=cqt, chord_label=entity.chord_labels[idx])
+    cqt = window_frames(entity.cqt, idx, length, axis=1)
+    return biggie.Entity(cqt=cqt, chord_label=entity.chord_labels[idx],
+                         **slice_codes(entity, idx))
+
+
+def slice_codes(entity, idx):
+    """Return one frame of every integer code field of an Entity.
+
+    Code fields, named '*_codes', hold precomputed per-frame encodings of the
+    labels, e.g. those of `dl4mir.chords.label_codes`; slicing functions pass
+    them through to samples under the same names.
+
+    Parameters
+    ----------
+    entity : biggie.Entity
+        Entity to slice.
+    idx : int
+        Frame index.
+
+    Returns
+    -------
+    codes : dict
+        The code of each code field at `idx`.
+    """
+    return dict([(key, value[idx]) for key, value in entity.values().items()
+                 if key.endswith(CODE_SUFFIX)])
 
 
 def compress_samples_to_intervals(labels, time_points):
@@ -537,16 +673,7 @@ def compress_samples_to_intervals(labels, time_points):
     labels : list, len=N
         String labels corresponding to the returned intervals.
     """
-    assert len(labels) == len(time_points)
-    intervals, new_labels = [], []
-    idx = 0
-    for label, count in run_length_encode(labels):
-        start = time_points[idx]
-        end = time_points[min([idx + count, len(labels) - 1])]
-        idx += count
-        intervals += [(start, end)]
-        new_labels += [label]
-    return np.array(intervals), new_labels
+    return segment.compress_samples_to_intervals(labels, time_points)
 
 
 def convolve(entity, graph, input_key, axis=1, chunk_size=250):
@@ -1,6 +1,7 @@
 import numpy as np
 import sys
 import pyjams
+from dl4mir.common import segment
 from dl4mir.common import util
 
 
@@ -66,7 +67,7 @@ def decode_fretboard(entity, penalty, label_map, **viterbi_args):
     frets_pred[np.equal(frets_pred, num_frets - 1)] = -1
     labels = [label_map(frets.tolist()) for frets in frets_pred]
 
-    intervals, labels = util.compress_samples_to_intervals(
+    intervals, labels = segment.compress_samples_to_intervals(
         labels, entity.time_points)
 
     annot = pyjams.RangeAnnotation()
@@ -18,6 +18,8 @@ import numpy as np
 import biggie
 import music21
 
+from dl4mir.chords import label_codes
+
 #       Strings    E2  A2  D3  G3  B3  E4
 STANDARD_TUNING = [40, 45, 50, 55, 59, 64]
 OFF_CHAR = 'X'
@@ -157,7 +159,9 @@ def fretboard_mapper(stream, vocab, targets):
     for entity in stream:
         if entity is None:
             yield entity
-        idx = vocab.label_to_index(entity.chord_label)
+        idx = label_codes.lexicon_codes(entity, vocab)
+        if idx is None:
+            idx = vocab.label_to_index(entity.chord_label)
         if idx is None:
             yield None
         else:
@@ -6,6 +6,10 @@ import numpy as np
 import pescador
 import time
 
+from dl4mir.common import framebank as FB
+from dl4mir.common.partition_index import PartitionIndex
+from dl4mir.common import sampling
+from dl4mir.common import streams
 from dl4mir.common import util
 from dl4mir.common import fileutil as futil
 
@@ -53,7 +57,7 @@ def slice_cqt_entity(entity, length, idx=None):
         The windowed observation.
     """
     idx = np.random.randint(entity.cqt.shape[1]) if idx is None else idx
-    cqt = np.array([util.slice_tile(x, idx, length) for x in entity.cqt])
+    cqt = util.window_frames(entity.cqt, idx, length, axis=1)
     return biggie.Entity(cqt=cqt, label=entity.icode)
 
 
@@ -236,6 +240,152 @@ def _unpack_triples(stream):
                             score=float(x1.label == z.label))
 
 
+def instrument_index(stash, threshold=0.05):
+    """Index the (non-silent) frames of each instrument in a stash.
+
+    Parameters
+    ----------
+    stash : biggie.Stash
+        A collection of timbre entities, keyed as "{icode}_{...}".
+    threshold : scalar, default=0.05
+        If not None, only index frames with a maximum frequency magnitude
+        over the threshold (eliminate silence), as in `cqt_sampler`.
+
+    Returns
+    -------
+    index : PartitionIndex
+        Frame positions of each instrument, with class `n` for the `n`-th
+        instrument code.
+    icodes : list of str
+        Sorted instrument codes.
+    """
+    keys = sorted(stash.keys())
+    icodes = sorted(set([k.split("_")[0] for k in keys]))
+    icode_ids = dict([(icode, n) for n, icode in enumerate(icodes)])
+    frame_labels = dict()
+    for key in keys:
+        entity = stash.get(key)
+        labels = np.zeros(entity.cqt.shape[1], dtype=int)
+        labels += icode_ids[key.split("_")[0]]
+        if threshold is not None:
+            valid_idx = entity.cqt.mean(axis=0).max(axis=-1) > threshold
+            labels[np.logical_not(valid_idx)] = -1
+        frame_labels[key] = labels
+
+    index = PartitionIndex.from_labels(frame_labels, len(icodes), keys=keys)
+    return index, icodes
+
+
+class PairBatchStream(object):
+    """Stream of minibatches of pairs, with equal positive and negative
+    examples.
+
+    Each triple draws an instrument, two of its frames and a frame of
+    another instrument from a class sampler; the windows of all are gathered
+    from one frame bank. Sampling is driven by a private random number
+    generator, so the stream can be checkpointed with `get_state` and
+    resumed with `set_state`, as `framebank.BatchStream`.
+
+    Parameters
+    ----------
+    bank : framebank.FrameBank
+        Frame bank over the keys of the sampler.
+    sampler : sampling.ClassSampler
+        Sampler of frame positions by instrument, over at least two
+        instruments.
+    batch_size : int
+        Number of pairs per batch.
+    seed : int, default=None
+        Seed for the random number generator.
+    """
+    def __init__(self, bank, sampler, batch_size, seed=None):
+        if len(sampler.classes) < 2:
+            raise ValueError("At least two instruments are required.")
+        self.bank = bank
+        self.sampler = sampler
+        self.batch_size = batch_size
+        self.rng = np.random.RandomState(seed)
+        self.num_batches = 0
+        num_triples = (batch_size + 1) / 2
+        self._score = np.array([1.0, 0.0] * num_triples)[:batch_size]
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        sampler, rng = self.sampler, self.rng
+        num_inst = len(sampler.classes)
+        num_triples = (self.batch_size + 1) / 2
+        x1_ids, x1_frames, inst = sampler.sample(num_triples, rng)
+        x2_ids, x2_frames = sampler.sample_classes(inst, rng)
+        # Any other instrument, uniformly.
+        inst_pos = np.searchsorted(sampler.classes, inst)
+        neg_inst = sampler.classes[
+            (inst_pos + rng.randint(1, num_inst, size=num_triples)) % num_inst]
+        z_ids, z_frames = sampler.sample_classes(neg_inst, rng)
+
+        rows = self.bank.rows(x1_ids, x1_frames)
+        rows_2 = np.array([self.bank.rows(x2_ids, x2_frames),
+                           self.bank.rows(z_ids, z_frames)]).T.flatten()
+        self.num_batches += 1
+        return dict(cqt=self.bank.gather(np.repeat(rows, 2)[:self.batch_size]),
+                    cqt_2=self.bank.gather(rows_2[:self.batch_size]),
+                    score=self._score.copy())
+
+    __next__ = next
+
+    def get_state(self):
+        """Return the sampling state of the stream, as a JSON object."""
+        return dict(rng=streams.get_rng_state(self.rng),
+                    num_batches=self.num_batches)
+
+    def set_state(self, state):
+        """Resume sampling from a state returned by `get_state`."""
+        streams.set_rng_state(state['rng'], self.rng)
+        self.num_batches = state['num_batches']
+
+
+def create_pairwise_batch_stream(stash, win_length, batch_size,
+                                 threshold=0.05, index=None, seed=None):
+    """Return a stream of minibatches of pairs, with equal positive and
+    negative examples.
+
+    A vectorized alternative to `create_pairwise_stream` followed by
+    `streams.minibatch`: each triple draws an instrument uniformly, two of
+    its frames (over keys uniformly, then frames), and a frame of another
+    instrument, and the windows of all are gathered from one frame bank.
+
+    Parameters
+    ----------
+    stash : biggie.Stash
+        A collection of timbre entities.
+    win_length : int
+        Length of a given tile slice.
+    batch_size : int
+        Number of pairs per batch.
+    threshold : scalar, default=0.05
+        Threshold under which to suppress frames, as the default of
+        `cqt_sampler`; ignored if `index` is given.
+    index : PartitionIndex, default=None
+        Prebuilt instrument index; see `instrument_index`.
+    seed : int, default=None
+        Seed for sampling; see `PairBatchStream` for resuming.
+
+    Returns
+    -------
+    stream : PairBatchStream
+        Data stream of {cqt, cqt_2, score} minibatches, alternating positive
+        (score=1) and negative (score=0) pairs.
+    """
+    if index is None:
+        index = instrument_index(stash, threshold)[0]
+
+    sampler = sampling.ClassSampler(index)
+    bank = FB.FrameBank.from_stash(stash, 'cqt', win_length, index.keys,
+                                   frame_axis=1)
+    return PairBatchStream(bank, sampler, batch_size, seed=seed)
+
+
 def pairwise_filter(stream, filt_func, filt_key='pw_cost', **kwargs):
     for entity in stream:
         if entity is None:
@@ -0,0 +1,55 @@
+import unittest
+import biggie
+import numpy as np
+import numpy.testing as nptest
+import dl4mir.timbre.data as D
+
+
+class DataTests(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_instrument_index(self):
+        cqt = np.ones([1, 4, 2])
+        cqt[:, 0] = 0.0
+        stash = dict(vln_60_0=biggie.Entity(cqt=cqt),
+                     flt_60_0=biggie.Entity(cqt=cqt))
+        index, icodes = D.instrument_index(stash)
+        self.assertEqual(icodes, ['flt', 'vln'])
+        nptest.assert_array_equal(index.counts(), [3, 3])
+        index, icodes = D.instrument_index(stash, threshold=None)
+        nptest.assert_array_equal(index.counts(), [4, 4])
+
+    def test_create_pairwise_batch_stream(self):
+        # Frame values encode the instrument (hundreds) and frame index;
+        #   the first frame of every note is silent.
+        stash = dict()
+        for inst, key in enumerate(['flt_60_0', 'tpt_60_0', 'vln_60_0']):
+            cqt = np.arange(6.).reshape(1, 6, 1) + 100 * (inst + 1)
+            cqt[:, 0] = 0.0
+            stash[key] = biggie.Entity(cqt=cqt)
+        stream = D.create_pairwise_batch_stream(stash, 1, batch_size=99,
+                                                seed=4)
+        batch = next(stream)
+
+        self.assertEqual(batch['cqt'].shape, (99, 1, 1, 1))
+        self.assertEqual(batch['cqt_2'].shape, (99, 1, 1, 1))
+        nptest.assert_array_equal(batch['score'][:4], [1, 0, 1, 0])
+        # Each anchor is shared by a positive and a negative pair.
+        values, values_2 = batch['cqt'].flatten(), batch['cqt_2'].flatten()
+        nptest.assert_array_equal(values[1::2], values[:-1:2])
+        inst, inst_2 = np.floor(values / 100), np.floor(values_2 / 100)
+        positive = batch['score'] == 1
+        nptest.assert_array_equal(inst[positive], inst_2[positive])
+        self.assertFalse((inst[~positive] == inst_2[~positive]).any())
+        self.assertEqual(set(inst), set([1, 2, 3]))
+        # Silent frames are never drawn.
+        self.assertTrue((values > 0).all() and (values_2 > 0).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 import argparse
 import biggie
+import json
 import optimus
 import os
 
@@ -20,6 +21,7 @@ def main(args):
     transform = optimus.load(args.transform_file)
     stash = biggie.Stash(args.validation_file, cache=True)
     output_dir = futils.create_directory(args.output_dir)
+    scores = dict()
 
     for fidx, param_file in enumerate(param_files):
         transform.load_param_values(param_file)
@@ -29,8 +31,32 @@ def main(args):
             os.remove(output_file)
 
         output = biggie.Stash(output_file)
-        util.process_stash(stash, transform, output,
-                           args.field, verbose=args.verbose)
+        try:
+            util.process_stash(stash, transform, output,
+                               args.field, verbose=args.verbose)
+        finally:
+            output.close()
+        if args.score_file:
+            scores[param_file] = score_output(output_file)
+            print("{0}: {1}".format(param_file, scores[param_file]['micro']))
+
+    if args.score_file:
+        with open(args.score_file, 'w') as fp:
+            json.dump(scores, fp, indent=2)
+
+
+def score_output(output_file):
+    """Frame-wise chord scores of a posterior stash, decoded by argmax."""
+    # Only chord models can be scored this way, so import lazily.
+    import dl4mir.chords.evaluate as EVAL
+    from dl4mir.chords.lexicon import Strict
+    from dl4mir.chords.score_posteriors import score_posteriors, summarize
+    output = biggie.Stash(output_file)
+    try:
+        keys, scores, supports = score_posteriors(output, Strict(157))
+    finally:
+        output.close()
+    return summarize(scores, supports, EVAL.FRAME_METRICS)
 
 
 if __name__ == "__main__":
@@ -59,6 +85,10 @@ if __name__ == "__main__":
     parser.add_argument("--stride",
                         metavar="--stride", type=int, default=1,
                         help="Parameter stride.")
+    parser.add_argument("--score_file",
+                        metavar="--score_file", type=str, default='',
+                        help="Optional JSON file for frame-wise chord scores "
+                        "of each parameter file.")
     parser.add_argument("--verbose",
                         action="store_true",
                         help="Provide console output.")
@@ -0,0 +1,127 @@
+"""Validate parameter checkpoints as training writes them.
+
+Each new archive in the model directory is applied to a fixed validation
+stash, scored frame-wise (see `dl4mir.chords.score_posteriors`), and the best
+checkpoint so far recorded as JSON. Once `patience` checkpoints pass without
+improvement, a stop file is written; pass the same path to the driver as
+`--stop_file` to end training there.
+
+Example Call:
+
+$ python experiments/0-common/watch_validation.py \
+valid.hdf5 models/0/transform.json models/0 outputs/0/valid \
+models/0/best_checkpoint.json --patience=10 --stop_file=models/0/STOP
+"""
+
+import argparse
+import biggie
+import numpy as np
+import optimus
+import os
+
+import dl4mir.chords.evaluate as EVAL
+from dl4mir.chords.lexicon import Strict
+from dl4mir.chords.score_posteriors import score_posteriors, summarize
+from dl4mir.common.checkpoints import CheckpointWatcher
+import dl4mir.common.fileutil as futils
+from dl4mir.common import util
+
+
+def params_to_output_file(param_file, output_dir):
+    fbase = futils.filebase(param_file)
+    return os.path.join(output_dir, "{0}.hdf5".format(fbase))
+
+
+def validation_score(stats):
+    """Geometric mean over statistics and metrics, as in `select_best`."""
+    scores = np.array([stats[s][m] for s in sorted(stats)
+                       for m in sorted(stats[s])])
+    return float(np.exp(np.log(np.maximum(scores, 1e-10)).mean()))
+
+
+def main(args):
+    transform = optimus.load(args.transform_file)
+    stash = biggie.Stash(args.validation_file, cache=True)
+    output_dir = futils.create_directory(args.output_dir)
+    vocab = Strict(157)
+
+    def evaluate(param_file):
+        transform.load_param_values(param_file)
+        output_file = params_to_output_file(param_file, output_dir)
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        writer = biggie.Stash(output_file)
+        try:
+            util.process_stash(stash, transform, writer, args.field)
+        finally:
+            writer.close()
+        output = biggie.Stash(output_file)
+        try:
+            keys, scores, supports = score_posteriors(output, vocab)
+        finally:
+            output.close()
+        if not args.keep_outputs:
+            os.remove(output_file)
+        return validation_score(summarize(scores, supports,
+                                          EVAL.FRAME_METRICS))
+
+    patience = args.patience if args.patience > 0 else None
+    watcher = CheckpointWatcher(
+        args.param_dir, evaluate, args.record_file, pattern=args.pattern,
+        patience=patience, min_delta=args.min_delta,
+        stop_file=args.stop_file or None)
+    max_idle = args.max_idle if args.max_idle > 0 else None
+    stalled = watcher.run(args.poll_interval, max_idle, verbose=True)
+    print "Stopped ({0}); best checkpoint: {1} ({2})".format(
+        "stalled" if stalled else "idle", watcher.best_param_file,
+        watcher.best_score)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="")
+
+    # Inputs
+    parser.add_argument("validation_file",
+                        metavar="validation_file", type=str,
+                        help="Path to a Stash file for validation.")
+    parser.add_argument("transform_file",
+                        metavar="transform_file", type=str,
+                        help="Validator graph definition.")
+    parser.add_argument("param_dir",
+                        metavar="param_dir", type=str,
+                        help="Directory to which the trainer saves params.")
+    # Outputs
+    parser.add_argument("output_dir",
+                        metavar="output_dir", type=str,
+                        help="Path for saving validation posteriors.")
+    parser.add_argument("record_file",
+                        metavar="record_file", type=str,
+                        help="JSON file for the scores and best checkpoint.")
+    parser.add_argument("--pattern",
+                        metavar="--pattern", type=str, default='*.npz',
+                        help="Glob pattern of parameter archives.")
+    parser.add_argument("--field",
+                        metavar="--field", type=str, default='cqt',
+                        help="Field of each entity to use as the input.")
+    parser.add_argument("--patience",
+                        metavar="--patience", type=int, default=0,
+                        help="Checkpoints without improvement before "
+                        "stopping; never stops if 0.")
+    parser.add_argument("--min_delta",
+                        metavar="--min_delta", type=float, default=0.0,
+                        help="Minimum score increase counted as improvement.")
+    parser.add_argument("--stop_file",
+                        metavar="--stop_file", type=str, default='',
+                        help="Path of the stop file to write once stalled.")
+    parser.add_argument("--poll_interval",
+                        metavar="--poll_interval", type=float, default=30.0,
+                        help="Seconds between polls for new checkpoints.")
+    parser.add_argument("--max_idle",
+                        metavar="--max_idle", type=float, default=0.0,
+                        help="Seconds without new checkpoints before giving "
+                        "up; waits forever if 0.")
+    parser.add_argument("--keep_outputs",
+                        action="store_true",
+                        help="Keep the validation posteriors of each "
+                        "checkpoint.")
+    main(parser.parse_args())
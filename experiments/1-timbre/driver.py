@@ -3,10 +3,13 @@
 from __future__ import print_function
 import argparse
 import biggie
+import json
+import numpy as np
 import optimus
 from os import path
 
 import dl4mir.common.fileutil as futil
+from dl4mir.common import framestore
 import dl4mir.common.streams as S
 import dl4mir.timbre.data as D
 from dl4mir.timbre import models
@@ -19,6 +22,19 @@ DRIVER_ARGS = dict(
 LEARNING_RATE = 0.02
 BATCH_SIZE = 100
 RADIUS = 12 ** 0.5
+# Sample-wise streams also need the per-entity `icode`, which a frame store
+#   cannot hold; the vectorized stream only reads windows of the CQT.
+FRAMESTORE_FIELDS = ['cqt']
+
+
+def open_stash(training_file, use_framestore=False):
+    """Open a training stash, or the memory-mapped frame store mirroring it,
+    which concurrent training processes share through the page cache."""
+    if use_framestore:
+        return framestore.load_or_create(
+            training_file, FRAMESTORE_FIELDS, frame_axes=dict(cqt=1),
+            dtypes=dict(cqt=np.float32))
+    return biggie.Stash(training_file, cache=True)
 
 
 def main(args):
@@ -30,12 +46,31 @@ def main(args):
         print("Loading parameters: {0}".format(args.init_param_file))
         trainer.load_param_values(args.init_param_file)
 
+    if args.framestore and not args.vectorized:
+        raise ValueError("--framestore requires --vectorized.")
     print("Opening {0}".format(args.training_file))
-    stash = biggie.Stash(args.training_file, cache=True)
-    stream = S.minibatch(
-        D.create_pairwise_stream(stash, time_dim,
-                                 working_size=100, threshold=0.05),
-        batch_size=BATCH_SIZE)
+    stash = open_stash(args.training_file, args.framestore)
+    output_directory = futil.create_directory(args.output_directory)
+    if args.vectorized:
+        stream = D.create_pairwise_batch_stream(
+            stash, time_dim, batch_size=BATCH_SIZE, threshold=0.05)
+        if args.init_stream_state:
+            print("Loading stream state: {0}".format(args.init_stream_state))
+            stream.set_state(json.load(open(args.init_stream_state)))
+        state_fmt = path.join(output_directory,
+                              "{0}-stream_state-{{0:07d}}.json"
+                              "".format(args.trial_name))
+        stream = S.save_state(stream, stream.get_state, state_fmt,
+                              DRIVER_ARGS['save_freq'])
+    else:
+        if args.init_stream_state:
+            raise ValueError("Stream state can only be restored with "
+                             "--vectorized.")
+        print("Stream state is only saved with --vectorized.")
+        stream = S.minibatch(
+            D.create_pairwise_stream(stash, time_dim,
+                                     working_size=100, threshold=0.05),
+            batch_size=BATCH_SIZE)
 
     stream = D.batch_filter(
         stream, zerofilter, threshold=2.0**-16, min_batch=1,
@@ -45,7 +80,7 @@ def main(args):
     driver = optimus.Driver(
         graph=trainer,
         name=args.trial_name,
-        output_directory=futil.create_directory(args.output_directory))
+        output_directory=output_directory)
 
     hyperparams = dict(
         learning_rate=LEARNING_RATE,
@@ -81,4 +116,18 @@ if __name__ == "__main__":
                         metavar="--init_param_file", type=str, default='',
                         help="Path to a NPZ archive for initialization the "
                         "parameters of the graph.")
+    parser.add_argument("--init_stream_state",
+                        metavar="--init_stream_state", type=str, default='',
+                        help="Path to a JSON stream state saved alongside a "
+                        "parameter checkpoint, for resuming training; "
+                        "requires --vectorized.")
+    parser.add_argument("--vectorized",
+                        action="store_true",
+                        help="Draw minibatches from an in-memory frame bank, "
+                        "rather than sample by sample.")
+    parser.add_argument("--framestore",
+                        action="store_true",
+                        help="Read the training data from a memory-mapped "
+                        "frame store next to the training file, built on "
+                        "first use; requires --vectorized.")
     main(parser.parse_args())
@@ -124,7 +124,7 @@ then
         echo "Collecting estimations."
         python ${SRC}/common/collect_files.py \
 ${ESTIMATIONS}/${CONFIG}/${idx}/valid/ \
-"*/*.jamset" \
+"*/*.jamz" \
 ${ESTIMATIONS}/${CONFIG}/${idx}/valid/${PARAM_TEXTLIST}
 
         python ${SRC}/chords/score_jamset_textlist.py \
@@ -132,7 +132,8 @@ ${REFERENCES} \
 ${ESTIMATIONS}/${CONFIG}/${idx}/valid/${PARAM_TEXTLIST} \
 ${RESULTS}/${CONFIG}/${idx}/valid.json \
 --min_support=60.0 \
---num_cpus=1
+--num_cpus=1 \
+--cache_file=${RESULTS}/score_cache.sqlite
     done
 fi
 
@@ -195,7 +196,7 @@ then
             echo "Collecting estimations."
             python ${SRC}/common/collect_files.py \
 ${ESTIMATIONS}/${CONFIG}/${idx}/${split}/ \
-"best/*.jamset" \
+"best/*.jamz" \
 ${ESTIMATIONS}/${CONFIG}/${idx}/${split}/${PARAM_TEXTLIST}
 
             python ${SRC}/chords/score_jamset_textlist.py \
@@ -203,7 +204,8 @@ ${REFERENCES} \
 ${ESTIMATIONS}/${CONFIG}/${idx}/${split}/${PARAM_TEXTLIST} \
 ${RESULTS}/${CONFIG}/${idx}/final/${split}.json \
 --min_support=60.0 \
---num_cpus=1
+--num_cpus=1 \
+--cache_file=${RESULTS}/score_cache.sqlite
         done
     done
 fi
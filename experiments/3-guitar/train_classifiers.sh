@@ -129,7 +129,7 @@ then
         echo "Collecting estimations."
         python ${SRC}/common/collect_files.py \
 ${ESTIMATIONS}/${CONFIG}/${idx}/valid/ \
-"*/*.jamset" \
+"*/*.jamz" \
 ${ESTIMATIONS}/${CONFIG}/${idx}/valid/${PARAM_TEXTLIST}
 
         python ${SRC}/chords/score_jamset_textlist.py \
@@ -137,7 +137,8 @@ ${REFERENCES} \
 ${ESTIMATIONS}/${CONFIG}/${idx}/valid/${PARAM_TEXTLIST} \
 ${RESULTS}/${CONFIG}/${idx}/valid.json \
 --min_support=60.0 \
---num_cpus=1
+--num_cpus=1 \
+--cache_file=${RESULTS}/score_cache.sqlite
     done
 fi
 
@@ -218,7 +219,7 @@ then
             echo "Collecting estimations."
             python ${SRC}/common/collect_files.py \
 ${ESTIMATIONS}/${CONFIG}/${idx}/${split}/chords/ \
-"*.jamset" \
+"*.jamz" \
 ${ESTIMATIONS}/${CONFIG}/${idx}/${split}/${PARAM_TEXTLIST}
             cat ${ESTIMATIONS}/${CONFIG}/${idx}/${split}/${PARAM_TEXTLIST}
             python ${SRC}/chords/score_jamset_textlist.py \
@@ -226,7 +227,8 @@ ${REFERENCES} \
 ${ESTIMATIONS}/${CONFIG}/${idx}/${split}/${PARAM_TEXTLIST} \
 ${RESULTS}/${CONFIG}/${idx}/chords/${split}.json \
 --min_support=60.0 \
---num_cpus=1
+--num_cpus=1 \
+--cache_file=${RESULTS}/score_cache.sqlite
         done
     done
 fi